@@ -0,0 +1,87 @@
+"""
+Memory per session: the dataset served through st.cache_data (a pickled copy per
+call) vs st.cache_resource (one shared read-only object, what load_dataset uses).
+
+    python -m benchmarks.bench_session_memory songs_normalize.csv --sessions 20 --repeat 10
+
+Each "session" calls the loader once and keeps the result alive, like concurrent
+reruns do; the extra memory held and the time per call are reported for both.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model import datasets as ds  # noqa: E402
+
+
+@st.cache_data(show_spinner=False)
+def _load_dataset_copied(handle: ds.DatasetHandle) -> pd.DataFrame:
+    """The previous loader: every call returns a fresh unpickled copy."""
+    return ds.read_dataset(handle)
+
+
+def _tiled_csv(csv_path: str, repeat: int, folder: str) -> str:
+    if repeat <= 1:
+        return csv_path
+    df = pd.read_csv(csv_path)
+    path = os.path.join(folder, f"tiled_x{repeat}.csv")
+    pd.concat([df] * repeat, ignore_index=True).to_csv(path, index=False)
+    return path
+
+
+def measure(loader, handle, sessions: int) -> dict:
+    loader(handle)  # warm: the first call parses/loads and fills the cache
+
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    held, times = [], []
+    for _ in range(sessions):
+        t0 = time.perf_counter()
+        held.append(loader(handle))
+        times.append(time.perf_counter() - t0)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    first, last = held[0], held[-1]
+    shared = first is last or np.shares_memory(first["year"].to_numpy(), last["year"].to_numpy())
+    return {
+        "per_session_bytes": (current - base) / sessions,
+        "median_call_s": statistics.median(times),
+        "shared": bool(shared),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv", nargs="?", default="songs_normalize.csv")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=1, help="tile the CSV rows this many times")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        handle = ds.open_dataset(_tiled_csv(args.csv, args.repeat, tmp))
+        frame = ds.read_dataset(handle)
+        frame_mb = frame.memory_usage(deep=True).sum() / 1e6
+        print(f"{len(frame):,} exploded rows, {frame_mb:.1f} MB in memory; {args.sessions} sessions")
+
+        for label, loader in (("cache_data (copy)", _load_dataset_copied), ("cache_resource (shared)", ds.load_dataset)):
+            r = measure(loader, handle, args.sessions)
+            print(
+                f"{label:<24} {r['per_session_bytes'] / 1e6:9.2f} MB/session"
+                f"  {r['median_call_s'] * 1e3:9.3f} ms/call  shared={r['shared']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
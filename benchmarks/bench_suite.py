@@ -0,0 +1,182 @@
+"""
+Micro-benchmarks for the hot data-path functions, over synthetic datasets, with a baseline gate.
+
+    python -m benchmarks.bench_suite --save-baseline          # once per machine, before gating
+    python -m benchmarks.bench_suite                          # quick grid, compare to baseline
+    python -m benchmarks.bench_suite --full --save-baseline   # 2k..10M rows x 10..2000 genres
+    python -m benchmarks.bench_suite --rows 100000 --genres 200 --threshold 0.5
+    python -m benchmarks.bench_suite --no-gate                # just print timings
+
+Measured per (rows, genres), uncached every time (Streamlit-cached loaders are
+.clear()-ed first, bounded-cache builders are called through __wrapped__):
+  load_dataset        CSV parse + explode (no sidecar)
+  load_dataset_warm   the same from the Parquet sidecar
+  load_genre_list     cube sidecar -> genre list (warm restart)
+  build_heatmap_matrix, build_treemap_nodes, build_treemap_figure
+                      full year range with all genres, and with a 5-genre filter
+
+Results are keyed "<bench>|rows=<n>|genres=<g>" (seconds, median of --repeat).
+Any benchmark slower than baseline * (1 + threshold) (and by more than
+--min-delta-ms) is reported and the run exits with status 1.
+
+The baseline (benchmarks/baseline.json, not committed) is per machine: timings
+from another CPU, OS or Python are not comparable, so generate it with
+--save-baseline on the machine that runs the gate before relying on it. With no
+baseline the run exits with status 2 rather than passing; --no-gate reports
+timings (and any regressions) but always exits 0.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic_data import cached_songs_csv  # noqa: E402
+from model import datasets as ds  # noqa: E402
+from view import heatmap, treemap  # noqa: E402
+
+QUICK_ROWS = [2_000, 100_000, 1_000_000]
+FULL_ROWS = [2_000, 100_000, 1_000_000, 10_000_000]
+GENRES = [10, 200, 2_000]
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / ".data"
+SLOW_CALL_S = 2.0  # fewer repeats for calls slower than this
+
+
+def _time(fn, repeat: int, setup=None) -> float:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if samples[-1] > SLOW_CALL_S:
+            break
+    return statistics.median(samples)
+
+
+def _remove_sidecars(handle: ds.DatasetHandle, suffix: str) -> None:
+    p = Path(handle.path)
+    for sidecar in p.parent.glob(f".{p.stem}.v*{suffix}"):
+        sidecar.unlink()
+
+
+def bench_dataset(csv_path: str, repeat: int) -> dict:
+    handle = ds.open_dataset(csv_path)
+    out = {}
+
+    def cold_parse():
+        ds.load_dataset.clear()
+        _remove_sidecars(handle, ".parquet")
+
+    out["load_dataset"] = _time(lambda: ds.load_dataset(handle), repeat, setup=cold_parse)
+    out["load_dataset_warm"] = _time(lambda: ds.load_dataset(handle), repeat, setup=ds.load_dataset.clear)
+
+    ds.load_cube(handle)  # make sure the cube sidecar exists
+
+    def cold_genres():
+        ds.load_genre_list.clear()
+        ds.load_cube.clear()
+
+    out["load_genre_list"] = _time(lambda: ds.load_genre_list(handle), repeat, setup=cold_genres)
+
+    genres = ds.load_genre_list(handle)
+    first, last = ds.load_cube(handle).first_year, int(ds.load_cube(handle).years[-1])
+    for label, selection in (("", ()), ("_5genres", tuple(genres[:: max(len(genres) // 5, 1)][:5]))):
+        out[f"build_heatmap_matrix{label}"] = _time(
+            lambda: heatmap.build_heatmap_matrix.__wrapped__(handle, first, last, selection), repeat
+        )
+        out[f"build_treemap_nodes{label}"] = _time(
+            lambda: treemap.build_treemap_nodes.__wrapped__(handle, first, last, selection), repeat
+        )
+        nodes = treemap.build_treemap_nodes.__wrapped__(handle, first, last, selection)
+        out[f"build_treemap_figure{label}"] = _time(
+            lambda: treemap.build_treemap_figure(nodes, 16, 16, "sans-serif"), repeat
+        )
+
+    ds.invalidate_caches()
+    return out
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_s: float) -> list:
+    """(key, baseline_s, current_s) for every regression past the threshold."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current > base * (1 + threshold) and current - base > min_delta_s:
+            regressions.append((key, base, current))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", help=f"default {QUICK_ROWS} ({FULL_ROWS} with --full)")
+    parser.add_argument("--genres", type=int, nargs="+", default=GENRES)
+    parser.add_argument("--full", action="store_true", help="include 10M rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tags-mean", type=float, default=1.8)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR), help="where generated CSVs are kept")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--no-gate", action="store_true", help="never fail: report timings/regressions only")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = +25%%")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    rows = args.rows or (FULL_ROWS if args.full else QUICK_ROWS)
+    results = {}
+    print(f"{'rows':>10} {'genres':>7}  {'benchmark':<30} {'ms':>10}")
+    for n_rows in rows:
+        for n_genres in args.genres:
+            csv_path = cached_songs_csv(
+                args.data_dir, n_rows, n_genres, seed=args.seed, tags_mean=args.tags_mean, skew=args.skew
+            )
+            for name, seconds in bench_dataset(csv_path, args.repeat).items():
+                results[f"{name}|rows={n_rows}|genres={n_genres}"] = seconds
+                print(f"{n_rows:>10} {n_genres:>7}  {name:<30} {seconds * 1e3:>10.2f}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {"results": {}}
+        baseline["results"].update(results)
+        baseline["meta"] = {
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "tags_mean": args.tags_mean,
+            "skew": args.skew,
+        }
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"baseline saved: {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path} (run with --save-baseline on this machine first)")
+        return 0 if args.no_gate else 2
+
+    regressions = compare(
+        results, json.loads(baseline_path.read_text())["results"], args.threshold, args.min_delta_ms / 1000
+    )
+    for key, base, current in regressions:
+        print(f"REGRESSION {key}: {base * 1e3:.2f} ms -> {current * 1e3:.2f} ms ({current / base - 1:+.0%})")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+        return 0 if args.no_gate else 1
+    print(f"no regressions past {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Treemap node construction: legacy iterrows builder vs the array-based builder.
+
+    python -m benchmarks.bench_treemap_nodes --years 23 50 100 --genres 20 200 2000
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model.cube import GenreYearCube  # noqa: E402
+from view.treemap import nodes_from_cube  # noqa: E402
+
+
+def synthetic_cube(n_years: int, n_genres: int, seed: int = 0) -> GenreYearCube:
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 40, size=(n_genres, n_years))
+    sums = counts * rng.uniform(0, 100, size=(n_genres, n_years))
+    return GenreYearCube(
+        genres=tuple(f"genre {i:04d}" for i in range(n_genres)),
+        first_year=1998,
+        sums=sums,
+        counts=counts.astype(np.int64),
+    )
+
+
+def legacy_nodes(yg):
+    """The original per-year rescan + iterrows builder (ids/labels/parents/values + colours)."""
+    years_sorted = sorted(yg["year"].unique().tolist())
+    year_totals = yg.groupby("year", as_index=False)["popularity"].sum()
+    year_totals_layout = year_totals.sort_values("popularity", ascending=False)
+
+    labels, parents, values, ids = [], [], [], []
+    ROOT_ID = "root"
+    ids.append(ROOT_ID)
+    labels.append(f"All Years ({years_sorted[0]}–{years_sorted[-1]})")
+    parents.append("")
+    values.append(float(year_totals["popularity"].sum()))
+
+    for _, r in year_totals_layout.iterrows():
+        y = int(r["year"])
+        ids.append(f"year:{y}")
+        labels.append(str(y))
+        parents.append(ROOT_ID)
+        values.append(float(r["popularity"]))
+
+    for y in year_totals_layout["year"].astype(int).tolist():
+        yg_y = yg[yg["year"] == y].sort_values("popularity", ascending=False)
+        for _, r in yg_y.iterrows():
+            g = str(r["genre"])
+            ids.append(f"year:{y}|genre:{g}")
+            labels.append(g)
+            parents.append(f"year:{y}")
+            values.append(float(r["popularity"]))
+
+    palette = ["a", "b", "c", "d", "e", "f", "g", "h"]
+    year_to_color = {str(y): palette[i % len(palette)] for i, y in enumerate(years_sorted)}
+    node_colors, line_colors, text_colors = [], [], []
+    for node_id, p, lbl in zip(ids, parents, labels):
+        if node_id == ROOT_ID:
+            node_colors.append("root")
+        elif p == ROOT_ID:
+            node_colors.append(year_to_color.get(str(lbl)))
+        else:
+            node_colors.append(year_to_color.get(p.replace("year:", "")))
+    for node_id, p in zip(ids, parents):
+        line_colors.append("w" if node_id == ROOT_ID else ("y" if p == ROOT_ID else "g"))
+    for node_id, p in zip(ids, parents):
+        text_colors.append("w" if node_id == ROOT_ID else ("y" if p == ROOT_ID else "g"))
+    return ids, labels, parents, values
+
+
+def _best_of(fn, repeat: int) -> float:
+    number = 1
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, nargs="+", default=[23, 50])
+    parser.add_argument("--genres", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'years':>6} {'genres':>7} {'nodes':>8} {'legacy ms':>10} {'array ms':>9} {'speedup':>8}")
+    for n_years in args.years:
+        for n_genres in args.genres:
+            cube = synthetic_cube(n_years, n_genres)
+            first, last = cube.first_year, cube.first_year + n_years - 1
+            yg = cube.mean_long(first, last, ())
+            nodes = nodes_from_cube(cube, first, last, ())
+
+            # Legacy timing includes building the long frame it consumes.
+            legacy = _best_of(lambda: legacy_nodes(cube.mean_long(first, last, ())), args.repeat)
+            array = _best_of(lambda: nodes_from_cube(cube, first, last, ()), args.repeat)
+
+            assert len(nodes["ids"]) == 1 + n_years + len(yg)
+            print(
+                f"{n_years:>6} {n_genres:>7} {len(nodes['ids']):>8} "
+                f"{legacy * 1e3:>10.1f} {array * 1e3:>9.2f} {legacy / array:>7.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Per-trial journaling overhead: one trial_journal.record_trial append (flush, and flush + fsync).
+
+    python -m benchmarks.bench_trial_journal --trials 20 --runs 200
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model import trial_journal  # noqa: E402
+
+
+def _trial(i: int) -> dict:
+    return {
+        "question_index": i,
+        "elapsed": 4.2 + i * 0.01,
+        "error": i % 2,
+        "choice": i % 4,
+        "timing": {"client_rt": 3.9, "server_render": 0.01, "to_browser": 0.12, "click_to_server": 0.04},
+        "stamps": [time.time() - 4.2, time.time()],
+    }
+
+
+def time_appends(n_trials: int, n_runs: int, fsync: bool) -> list:
+    """Seconds per record_trial call, over n_runs journals of n_trials each."""
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(1, n_runs + 1):
+            path = trial_journal.run_path(tmp, "heatmap", run)
+            trial_journal.start_run(path, {"participant_id": run, "chart_type": "heatmap"})
+            for i in range(n_trials):
+                t0 = time.perf_counter()
+                trial_journal.record_trial(path, _trial(i), fsync=fsync)
+                samples.append(time.perf_counter() - t0)
+            trial_journal.finish_run(path)
+    return samples
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--trial-seconds", type=float, default=4.0, help="typical participant response time")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':>12} {'median us':>10} {'p99 us':>8} {'max us':>8} {'% of trial':>11}")
+    for label, fsync in (("flush", False), ("flush+fsync", True)):
+        samples = sorted(time_appends(args.trials, args.runs, fsync))
+        median = statistics.median(samples)
+        p99 = samples[min(len(samples) - 1, int(0.99 * len(samples)))]
+        print(
+            f"{label:>12} {median * 1e6:>10.1f} {p99 * 1e6:>8.1f} {samples[-1] * 1e6:>8.1f} "
+            f"{100 * median / args.trial_seconds:>10.4f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Concurrent-session load harness: N simulated participants driving main.py at once.
+
+    python -m benchmarks.load_harness songs_normalize.csv --sessions 1,5,10,20
+
+Every session is a Streamlit AppTest on its own thread, all inside this one
+process and sharing one runtime, like one server serving N browsers. Per
+session count, a fresh app folder is used: one session uploads the CSV through
+the settings uploader, then N participants each go through the whole flow:
+first load, a few filter changes, then Start -> practice -> get ready -> the
+timed questions. Every rerun is timed; the harness reports rerun latency
+p50/p95/p99, CPU use and RSS.
+
+The get-ready countdown and the timed choice buttons are JS components, which
+do not run headless: the countdown's "finished" event is applied directly and
+questions are answered through the quiz's st.button fallback
+(quiz_client_timing=False). Results go to a temporary results folder.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from unittest.mock import MagicMock  # noqa: E402
+
+from streamlit.components.v2.component_manager import BidiComponentManager  # noqa: E402
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager  # noqa: E402
+from streamlit.runtime.dataframe_source_manager import DataframeSourceManager  # noqa: E402
+from streamlit.runtime.media_file_manager import MediaFileManager  # noqa: E402
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1 import app_test as _app_test  # noqa: E402
+
+from model import results_writer, trial_journal  # noqa: E402
+from view import quiz  # noqa: E402
+
+try:  # POSIX only
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+try:  # optional: current RSS where there is no /proc (Windows, macOS)
+    import psutil
+except ImportError:  # pragma: no cover - depends on the environment
+    psutil = None
+
+RERUN_TIMEOUT_S = 120
+
+
+# -----------------------------
+# Process metrics
+# RSS: Linux /proc, then psutil, then resource (peak, not current); 0 when none
+# is available. CPU: resource, else time.process_time() (works on Windows).
+# -----------------------------
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # peak, not current
+    return 0
+
+
+def cpu_seconds() -> float:
+    if resource is None:
+        return time.process_time()
+    r = resource.getrusage(resource.RUSAGE_SELF)
+    return r.ru_utime + r.ru_stime
+
+
+# -----------------------------
+# Setup
+# -----------------------------
+class _PerTestRuntime(Runtime):
+    """
+    AppTest installs a mock Runtime singleton for each run and clears it when the
+    run ends, which breaks runs on other threads. Pointing AppTest at this
+    subclass makes those writes land here, while every session uses the one
+    shared runtime installed on Runtime itself (as on a real server).
+    """
+
+
+def install_shared_runtime() -> None:
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    components = BidiComponentManager()
+    components.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = components
+    Runtime._instance = runtime
+    _app_test.Runtime = _PerTestRuntime
+
+
+def prepare_app(workdir: str) -> str:
+    """Copy main.py into workdir: the uploaded dataset is persisted beside it."""
+    script = os.path.join(workdir, "main.py")
+    shutil.copyfile(REPO_ROOT / "main.py", script)
+    quiz.RESULTS_DIR = os.path.join(workdir, "results")
+    return script
+
+
+def upload_dataset(script: str, csv_path: str) -> float:
+    """Upload the CSV through the no-data page's uploader; seconds until the charts render."""
+    at = AppTest.from_file(script, default_timeout=RERUN_TIMEOUT_S)
+    at.run()
+    with open(csv_path, "rb") as f:
+        data = f.read()
+    t0 = time.perf_counter()
+    at.file_uploader(key="dataset_file_uploader").set_value((os.path.basename(csv_path), data, "text/csv")).run()
+    for _ in range(int(RERUN_TIMEOUT_S / 0.1)):
+        if at.exception:
+            raise RuntimeError(f"upload: {at.exception[0].value}")
+        if "quiz_phase" in at.session_state:
+            return time.perf_counter() - t0
+        time.sleep(0.1)
+        at.run()
+    raise RuntimeError("dataset never finished loading")
+
+
+# -----------------------------
+# One simulated participant
+# -----------------------------
+class Session:
+    def __init__(self, script: str, index: int, filter_changes: int):
+        self.at = AppTest.from_file(script, default_timeout=RERUN_TIMEOUT_S)
+        self.index = index
+        self.filter_changes = filter_changes
+        self.rng = np.random.default_rng(index)
+        self.latencies = []   # (step, seconds)
+        self.error = None
+
+    def _timed(self, step: str, action) -> None:
+        t0 = time.perf_counter()
+        action()
+        self.latencies.append((step, time.perf_counter() - t0))
+        if self.at.exception:
+            raise RuntimeError(f"{step}: {self.at.exception[0].value}")
+
+    def run(self) -> None:
+        try:
+            self._load()
+            self._filters()
+            self._quiz()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    def _load(self) -> None:
+        self._timed("load", self.at.run)
+        if "quiz_phase" not in self.at.session_state:  # set once the main page (with the quiz) rendered
+            raise RuntimeError("main page did not render")
+
+    def _filters(self) -> None:
+        at = self.at
+        genre_boxes = [c for c in at.checkbox if c.key and c.key.startswith("genre_")]
+        for i in range(self.filter_changes):
+            if genre_boxes and i % 2 == 0:
+                box = at.checkbox(key=genre_boxes[self.rng.integers(len(genre_boxes))].key)
+                self._timed("filter", (box.uncheck() if box.value else box.check()).run)
+            else:
+                chart = at.radio(key="chart_type_radio")
+                other = [o for o in chart.options if o != chart.value][0]
+                self._timed("filter", chart.set_value(other).run)
+
+    def _quiz(self) -> None:
+        at = self.at
+        at.session_state["quiz_client_timing"] = False
+        self._timed("start", at.button(key="quiz_start").click().run)
+
+        for _ in range(quiz.PRACTICE_TOTAL + 2):
+            buttons = [b for b in at.button if b.key and b.key.startswith("practice_choice_")]
+            if not buttons:
+                break
+            self._timed("practice", buttons[0].click().run)
+        if at.session_state["quiz_phase"] != "get_ready":
+            raise RuntimeError(f"expected get_ready, got {at.session_state['quiz_phase']}")
+
+        # What the countdown component's "finished" event triggers.
+        at.session_state["quiz_phase"] = "quiz"
+        if at.session_state["run_journal_path"]:
+            trial_journal.record_phase(at.session_state["run_journal_path"], "quiz")
+        self._timed("get_ready", at.run)
+
+        for _ in range(quiz.TOTAL_QUESTIONS + 2):
+            buttons = [b for b in at.button if b.key and b.key.startswith("quiz_choice_")]
+            if not buttons:
+                break
+            self._timed("question", buttons[self.rng.integers(len(buttons))].click().run)
+        if at.session_state["quiz_q_idx"] < quiz.TOTAL_QUESTIONS:
+            raise RuntimeError(f"stopped at question {at.session_state['quiz_q_idx']}")
+
+
+# -----------------------------
+# Runs
+# -----------------------------
+def run_level(csv_path: str, n_sessions: int, filter_changes: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        script = prepare_app(workdir)
+        upload_s = upload_dataset(script, csv_path)
+        result = _run_sessions(script, n_sessions, filter_changes)
+        results_writer.flush_all(timeout=30)
+    return dict(result, upload_s=upload_s)
+
+
+def _run_sessions(script: str, n_sessions: int, filter_changes: int) -> dict:
+    sessions = [Session(script, i, filter_changes) for i in range(n_sessions)]
+    threads = [threading.Thread(target=s.run, name=f"session-{s.index}") for s in sessions]
+
+    rss_before, cpu_before, t0 = rss_bytes(), cpu_seconds(), time.perf_counter()
+    peak_rss = rss_before
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        peak_rss = max(peak_rss, rss_bytes())
+        time.sleep(0.05)
+    wall = time.perf_counter() - t0
+    cpu = cpu_seconds() - cpu_before
+
+    latencies = np.array([s for sess in sessions for _, s in sess.latencies]) * 1000
+    per_step = {}
+    for sess in sessions:
+        for step, s in sess.latencies:
+            per_step.setdefault(step, []).append(s * 1000)
+
+    return {
+        "sessions": n_sessions,
+        "errors": [s.error for s in sessions if s.error],
+        "reruns": len(latencies),
+        "p50": float(np.percentile(latencies, 50)) if len(latencies) else float("nan"),
+        "p95": float(np.percentile(latencies, 95)) if len(latencies) else float("nan"),
+        "p99": float(np.percentile(latencies, 99)) if len(latencies) else float("nan"),
+        "per_step_p50": {k: statistics.median(v) for k, v in per_step.items()},
+        "wall_s": wall,
+        "cpu_pct": 100.0 * cpu / wall if wall else 0.0,
+        "rss_mb": rss_bytes() / 1e6,
+        "peak_rss_mb": peak_rss / 1e6,
+        "rss_per_session_mb": (peak_rss - rss_before) / 1e6 / n_sessions,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv", nargs="?", default=str(REPO_ROOT / "songs_normalize.csv"))
+    parser.add_argument("--sessions", default="1,5,10", help="comma-separated session counts")
+    parser.add_argument("--filters", type=int, default=4, help="filter changes per session")
+    args = parser.parse_args(argv)
+
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    install_shared_runtime()
+    print(f"{args.csv}: {', '.join(map(str, levels))} concurrent sessions, one process (CPUs: {os.cpu_count()})")
+    if rss_bytes() == 0:
+        print("RSS not available on this platform (install psutil); RSS columns read 0")
+    print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'wall s':>7} {'CPU %':>6} {'RSS MB':>7} {'MB/sess':>8}")
+    for n in levels:
+        r = run_level(args.csv, n, args.filters)
+        print(
+            f"{r['sessions']:>8} {r['reruns']:>7} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f}"
+            f" {r['wall_s']:>7.1f} {r['cpu_pct']:>6.0f} {r['peak_rss_mb']:>7.0f} {r['rss_per_session_mb']:>8.1f}"
+        )
+        steps = ", ".join(f"{k} {v:.0f}" for k, v in r["per_step_p50"].items())
+        print(f"{'':>8} upload {r['upload_s']:.1f}s; p50 by step (ms): {steps}")
+        for err in r["errors"]:
+            print(f"{'':>8} ERROR {err}")
+
+
+if __name__ == "__main__":
+    main()
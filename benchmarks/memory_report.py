@@ -0,0 +1,42 @@
+"""
+Memory report: legacy exploded frame vs the compact frame produced by load_dataset.
+
+    python -m benchmarks.memory_report songs_normalize.csv
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model import datasets as ds  # noqa: E402
+
+
+def legacy_parse(file_name: str) -> pd.DataFrame:
+    """The original object/int64 ingestion, kept here as the comparison point."""
+    df = pd.read_csv(file_name)
+    df["genre"] = df["genre"].astype(str).str.split(",")
+    df = df.explode("genre")
+    df["genre"] = df["genre"].astype(str).str.strip()
+    df["year"] = pd.to_numeric(df["year"], errors="coerce").astype("Int64")
+    df = df.dropna(subset=["year"])
+    df["year"] = df["year"].astype(int)
+    return df
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv", nargs="?", default="songs_normalize.csv")
+    args = parser.parse_args(argv)
+
+    before = legacy_parse(args.csv)
+    after = ds._parse_csv(args.csv)
+
+    print(f"{args.csv}: {len(before):,} exploded rows")
+    print(ds.memory_report(before, after).to_string())
+
+
+if __name__ == "__main__":
+    main()
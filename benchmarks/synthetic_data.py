@@ -0,0 +1,105 @@
+"""
+Seeded synthetic songs CSV in the songs_normalize.csv schema (artist,song,year,popularity,genre).
+
+    python -m benchmarks.synthetic_data out.csv --rows 1000000 --genres 200 --tags-mean 1.8 --skew 1.1
+
+Each song gets 1 + Poisson(tags_mean - 1) genre tags (at most max_tags,
+duplicates dropped), drawn from a Zipf-like distribution over the genres
+(weight 1 / rank**skew): skew 0 = uniform, larger = a few dominant genres,
+like the real data where "pop" is on most songs. Rows are generated and
+written in chunks, so 10M-row files never sit in memory. The same arguments
+always give byte-identical files.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 500_000
+FIRST_YEAR, LAST_YEAR = 1998, 2020
+
+
+def genre_names(n_genres: int) -> np.ndarray:
+    return np.array([f"genre{i:04d}" for i in range(n_genres)], dtype=object)
+
+
+def genre_weights(n_genres: int, skew: float) -> np.ndarray:
+    w = 1.0 / np.arange(1, n_genres + 1, dtype=float) ** skew
+    return w / w.sum()
+
+
+def _chunk(rng, start: int, n: int, names, weights, tags_mean: float, max_tags: int) -> pd.DataFrame:
+    n_tags = np.minimum(1 + rng.poisson(max(tags_mean - 1.0, 0.0), size=n), min(max_tags, len(names)))
+    codes = rng.choice(len(names), size=(n, int(n_tags.max())), p=weights)
+    used = np.arange(codes.shape[1])[None, :] < n_tags[:, None]
+
+    genre = names[codes[:, 0]]
+    for j in range(1, codes.shape[1]):
+        # Keep tag j only if it is in range and not already on this song.
+        keep = used[:, j] & ~(codes[:, :j] == codes[:, j:j + 1]).any(axis=1)
+        genre = np.where(keep, genre + ", " + names[codes[:, j]], genre)
+
+    ids = np.arange(start, start + n)
+    return pd.DataFrame({
+        "artist": pd.Series(ids // 8).map("Artist {}".format),  # ~8 songs per artist
+        "song": pd.Series(ids).map("Song {}".format),
+        "year": rng.integers(FIRST_YEAR, LAST_YEAR + 1, size=n),
+        "popularity": rng.integers(0, 90, size=n),
+        "genre": genre,
+    })
+
+
+def write_songs_csv(
+    path: str,
+    n_rows: int,
+    n_genres: int,
+    seed: int = 0,
+    tags_mean: float = 1.8,
+    skew: float = 1.1,
+    max_tags: int = 4,
+) -> str:
+    """Write the CSV atomically and return its path."""
+    names, weights = genre_names(n_genres), genre_weights(n_genres, skew)
+    streams = np.random.SeedSequence(seed).spawn((n_rows + CHUNK_ROWS - 1) // CHUNK_ROWS)
+
+    tmp_path = path + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        for i, stream in enumerate(streams):
+            start = i * CHUNK_ROWS
+            n = min(CHUNK_ROWS, n_rows - start)
+            chunk = _chunk(np.random.default_rng(stream), start, n, names, weights, tags_mean, max_tags)
+            chunk.to_csv(f, index=False, header=(i == 0))
+        if not streams:
+            pd.DataFrame(columns=["artist", "song", "year", "popularity", "genre"]).to_csv(f, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def cached_songs_csv(folder: str, n_rows: int, n_genres: int, seed: int = 0, **kwargs) -> str:
+    """Generate once per parameter set; later calls reuse the file."""
+    extra = "".join(f"_{k}{v}" for k, v in sorted(kwargs.items()))
+    path = os.path.join(folder, f"songs_r{n_rows}_g{n_genres}_s{seed}{extra}.csv")
+    if not os.path.exists(path):
+        write_songs_csv(path, n_rows, n_genres, seed=seed, **kwargs)
+    return path
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--genres", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tags-mean", type=float, default=1.8, help="mean genre tags per song")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of genre popularity")
+    parser.add_argument("--max-tags", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    write_songs_csv(args.out, args.rows, args.genres, args.seed, args.tags_mean, args.skew, args.max_tags)
+    print(f"{args.out}: {args.rows:,} songs, {args.genres} genres, {os.path.getsize(args.out) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,27 @@
 from view import ui, heatmap, treemap
 from controller import state_controller as sc
+from controller import prefetch
 import streamlit as st
-import pandas as pd
 
-def run_app(df: pd.DataFrame, genre_list: list):
+from model import instrumentation
+from model.datasets import DatasetHandle
+
+def run_app(dataset: DatasetHandle, genre_list: list):
     # ✅ Load persisted state (survives F5 refresh)
-    sc._load_state_from_url()
+    with instrumentation.phase("url_hydration"):
+        sc._load_state_from_url()
+
+    # Warm every quiz question's chart in the background (no-op once queued for this dataset)
+    with instrumentation.phase("prefetch"):
+        prefetch.warm_question_charts(dataset)
 
-    # Render selected chart
-    if st.session_state.chart_type_radio == "Heatmap":
-        fig = heatmap.render(df, st.session_state.year_range, st.session_state.genres)
-    else:
-        fig = treemap.render(df, st.session_state.year_range, st.session_state.genres)
+    # Selected chart, built inside the filters/chart fragment (after its widgets ran)
+    def build_figure():
+        if st.session_state.chart_type_radio == "Heatmap":
+            return heatmap.render(dataset, st.session_state.year_range, st.session_state.genres)
+        return treemap.render(dataset, st.session_state.year_range, st.session_state.genres)
 
-    ui.render_page(fig, on_change_func=sc._save_state_to_url, genre_list=genre_list)
+    ui.render_page(build_figure, on_change_func=sc._save_state_to_url, genre_list=genre_list, dataset=dataset)
 
 # if __name__ == "__main__":
 #     run_app()
\ No newline at end of file
@@ -1,6 +1,7 @@
 from controller.main_controller import run_app
 from model import datasets as ds
-from view import ui
+from model import instrumentation, prebuild
+from view import debug_panel, ui
 import streamlit as st
 
 import os
@@ -16,6 +17,22 @@ def _app_dir() -> Path:
 
 
 def main():
+    # Results analytics (?page=analytics, TREEMAP_ANALYTICS=1 only): needs no dataset
+    if st.query_params.get("page") == "analytics" and os.environ.get("TREEMAP_ANALYTICS") == "1":
+        from view.analytics_page import render_analytics_page
+        render_analytics_page()
+        return
+
+    # Opt-in rerun timing (?debug=1 or TREEMAP_PERF=1) and profiling
+    # (?profile=K or TREEMAP_PROFILE=K), written beside the app
+    debug_panel.configure(str(_app_dir() / "perf"))
+    debug_panel.sync_from_url()
+    with debug_panel.profiled("page"), debug_panel.rerun("page"):
+        _render_app()
+    debug_panel.render()
+
+
+def _render_app():
     # Persist the uploaded CSV beside the app
     persist_path = _app_dir() / "uploaded_dataset.csv"
     st.session_state["dataset_persist_path"] = str(persist_path)
@@ -25,16 +42,29 @@ def main():
         ui.render_no_data_page()
         return
 
-    # Load dataset
-    df = ds.load_dataset(str(persist_path))
-    genre_list = ds.load_genre_list(df)
+    # Load dataset (the handle is a cheap cache key; data lives behind it)
+    with instrumentation.phase("dataset"):
+        dataset = ds.open_dataset(str(persist_path))
+
+    # A new upload is still being parsed/aggregated in the background
+    job = prebuild.get_job(dataset.fingerprint)
+    if job is not None and not job.done:
+        ui.render_dataset_loading_page(job)
+        return
+    if job is not None and job.error is not None:
+        # Don't retry the failed build synchronously on the script thread
+        ui.render_dataset_failed_page(job)
+        return
+
+    with instrumentation.phase("dataset"):
+        genre_list = ds.load_genre_list(dataset)
 
     # Keep a valid default year range
     yr = st.session_state.get("year_range", (1998, 2020))
     if not yr or yr[0] is None or yr[1] is None:
         st.session_state.year_range = (1998, 2020)
 
-    run_app(df, genre_list)
+    run_app(dataset, genre_list)
 
 
 if __name__ == "__main__":
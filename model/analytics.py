@@ -0,0 +1,303 @@
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from model import results_store
+
+try:  # optional: exact Welch p-values
+    from scipy import stats as _scipy_stats
+except ImportError:  # pragma: no cover - depends on the environment
+    _scipy_stats = None
+
+
+# -----------------------------
+# Results analytics (heatmap vs treemap)
+# Trials are read from the SQLite results store into one vectorized frame and
+# kept per database. A file fingerprint (db + WAL size/mtime) short-circuits
+# unchanged reloads; when it changes, only rows past the last seen rowid are
+# fetched and merged (replaced trials keep their newest version), so new
+# participants cost O(new rows), not a rescan. A chart type whose wide CSV was
+# never imported into the store (no quiz run since the upgrade) is read from
+# performance_<chart>.csv instead, cached by that file's size/mtime.
+# Summaries are memoized per combined fingerprint.
+# Two timing measures are kept apart: `elapsed` (server-measured) exists for
+# every trial, including participants imported from the old CSVs, so it is the
+# one heatmap and treemap are compared on. `client_rt` (browser-measured) only
+# exists for newer runs; it gets its own test over the participants that have it.
+# -----------------------------
+CHART_TYPES = ("heatmap", "treemap")
+PERCENTILES = (25, 75, 90)
+PERMUTATIONS = 10_000
+
+_TRIAL_COLUMNS = [
+    "chart_type", "participant_id", "question_index", "chosen_option", "correct",
+    "elapsed", "client_rt", "server_render", "to_browser", "click_to_server", "shown_at", "answered_at",
+]
+_KEY = ["chart_type", "participant_id", "question_index"]
+
+_cache = {}       # db_path -> dict(fingerprint, max_rowid, trials, migrated)
+_csv_cache = {}   # csv_path -> (fingerprint, trials)
+_summaries = {}   # results_dir -> (fingerprint, summary)
+_cache_lock = threading.Lock()
+
+
+def fingerprint(*paths: str) -> tuple:
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append((st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            parts.append(None)
+    return tuple(parts)
+
+
+def _empty_trials() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype="float64") for c in _TRIAL_COLUMNS}).assign(
+        chart_type=pd.Series(dtype="object")
+    )
+
+
+def csv_path_for(results_dir: str, chart_type: str) -> str:
+    return os.path.join(results_dir, f"performance_{chart_type}.csv")
+
+
+def _fetch_since(db_path: str, rowid: int):
+    cols = ", ".join(f"t.{c}" for c in _TRIAL_COLUMNS)
+    with closing(results_store.connect(db_path)) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT t.rowid, {cols}
+            FROM trials t
+            JOIN participants p USING (chart_type, participant_id)
+            WHERE t.rowid > ?
+            ORDER BY t.rowid
+            """,
+            (int(rowid),),
+        ).fetchall()
+        migrated = {
+            key.split(":", 1)[1]
+            for (key,) in conn.execute("SELECT key FROM meta WHERE key LIKE 'migrated:%'")
+        }
+    if not rows:
+        return rowid, None, migrated
+    frame = pd.DataFrame(rows, columns=["rowid"] + _TRIAL_COLUMNS)
+    return int(frame["rowid"].max()), frame.drop(columns="rowid"), migrated
+
+
+def _refresh_db(db_path: str) -> dict:
+    fp = fingerprint(db_path, db_path + "-wal")
+    with _cache_lock:
+        entry = _cache.get(db_path)
+        if entry is not None and entry["fingerprint"] == fp:
+            return entry
+        if entry is None or fp[0] is None:
+            entry = {"fingerprint": None, "max_rowid": 0, "trials": _with_error(_empty_trials()), "migrated": set()}
+
+    if fp[0] is None:  # no database yet
+        entry = dict(entry, fingerprint=fp)
+    else:
+        try:
+            max_rowid, new, migrated = _fetch_since(db_path, entry["max_rowid"])
+        except sqlite3.DatabaseError:
+            return entry
+        trials = entry["trials"]
+        if new is not None:
+            # INSERT OR REPLACE gives replaced trials a new rowid: keep the newest copy.
+            trials = pd.concat([trials, _with_error(new)], ignore_index=True) if len(trials) else _with_error(new)
+            trials = trials.drop_duplicates(_KEY, keep="last").reset_index(drop=True)
+        entry = {"fingerprint": fp, "max_rowid": max_rowid, "trials": trials, "migrated": migrated}
+
+    with _cache_lock:
+        _cache[db_path] = entry
+    return entry
+
+
+_TIME_COL = re.compile(r"^Trial (\d+) Time$")
+
+
+def _load_wide_csv(csv_path: str, chart_type: str) -> pd.DataFrame:
+    """Wide per-participant CSV -> long trials frame (no Python loop over rows)."""
+    wide = pd.read_csv(csv_path)
+    if wide.empty:
+        return _with_error(_empty_trials())
+    pids = pd.to_numeric(wide.iloc[:, 0], errors="coerce").to_numpy()
+    trial_numbers = sorted(int(m.group(1)) for c in wide.columns if (m := _TIME_COL.match(str(c))))
+
+    def block(label):
+        cols = [f"Trial {i} {label}" for i in trial_numbers]
+        present = wide.reindex(columns=cols)
+        return present.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+    times, errors = block("Time"), block("Errors")
+    n_rows, n_trials = times.shape
+    frame = pd.DataFrame({
+        "chart_type": chart_type,
+        "participant_id": np.repeat(pids, n_trials),
+        "question_index": np.tile(np.asarray(trial_numbers) - 1, n_rows),
+        "chosen_option": np.nan,
+        "correct": np.where(np.nan_to_num(errors.ravel()) > 0, 0, 1),
+        "elapsed": times.ravel(),
+    })
+    for field, label in results_store.TIMING_FIELDS:
+        frame[field] = block(label).ravel()
+    frame["shown_at"] = np.nan
+    frame["answered_at"] = np.nan
+    frame = frame[~np.isnan(frame["participant_id"]) & ~(np.isnan(times.ravel()) & np.isnan(errors.ravel()))]
+    return _with_error(frame.reset_index(drop=True))
+
+
+def _refresh_csv(csv_path: str, chart_type: str):
+    fp = fingerprint(csv_path)
+    with _cache_lock:
+        cached = _csv_cache.get(csv_path)
+    if cached is not None and cached[0] == fp:
+        return cached
+    trials = _load_wide_csv(csv_path, chart_type) if fp[0] is not None else None
+    with _cache_lock:
+        _csv_cache[csv_path] = (fp, trials)
+    return fp, trials
+
+
+def load_trials(results_dir: str):
+    """
+    (fingerprint, trials) for both chart types, one row per trial. Store rows are
+    refreshed incrementally; CSVs are only read for charts not yet in the store.
+    """
+    db = _refresh_db(results_store.db_path(results_dir))
+    fp, frames = [db["fingerprint"]], [db["trials"]]
+    for chart_type in CHART_TYPES:
+        if chart_type in db["migrated"]:
+            continue
+        csv_fp, csv_trials = _refresh_csv(csv_path_for(results_dir, chart_type), chart_type)
+        fp.append(csv_fp)
+        if csv_trials is not None and len(csv_trials):
+            frames.append(csv_trials)
+    frames = [f for f in frames if len(f)]
+    trials = pd.concat(frames, ignore_index=True) if len(frames) > 1 else (frames[0] if frames else db["trials"])
+    return tuple(fp), trials
+
+
+def _with_error(trials: pd.DataFrame) -> pd.DataFrame:
+    trials = trials.copy()
+    for c in ("elapsed", "client_rt", "correct"):
+        trials[c] = pd.to_numeric(trials[c], errors="coerce")
+    trials["error"] = 1 - trials["correct"]
+    return trials
+
+
+# -----------------------------
+# Statistics
+# -----------------------------
+def _describe(grouped, column: str) -> pd.DataFrame:
+    out = grouped[column].agg(n="count", mean="mean", median="median", std="std")
+    for p in PERCENTILES:
+        out[f"p{p}"] = grouped[column].quantile(p / 100)
+    return out
+
+
+def per_trial_stats(trials: pd.DataFrame) -> pd.DataFrame:
+    """Per chart type × question: server-time distribution, browser RT and error rate."""
+    g = trials.groupby(["chart_type", "question_index"])
+    out = _describe(g, "elapsed")
+    out["client_rt_n"] = g["client_rt"].count()
+    out["client_rt_mean"] = g["client_rt"].mean()
+    out["error_rate"] = g["error"].mean()
+    return out.reset_index()
+
+
+def per_participant(trials: pd.DataFrame) -> pd.DataFrame:
+    """One row per participant: server time, browser RT (where recorded) and error rate."""
+    g = trials.groupby(["chart_type", "participant_id"])
+    return g.agg(
+        trials=("elapsed", "size"),
+        mean_time=("elapsed", "mean"),
+        median_time=("elapsed", "median"),
+        client_trials=("client_rt", "count"),
+        mean_client_rt=("client_rt", "mean"),
+        error_rate=("error", "mean"),
+    ).reset_index()
+
+
+def per_chart_stats(participants: pd.DataFrame) -> pd.DataFrame:
+    """Per chart type, across participants (each participant weighted once)."""
+    g = participants.groupby("chart_type")
+    out = _describe(g, "mean_time").rename(columns={"n": "participants"})
+    out["participants_client_rt"] = g["mean_client_rt"].count()
+    out["mean_client_rt"] = g["mean_client_rt"].mean()
+    out["error_rate"] = g["error_rate"].mean()
+    return out.reset_index()
+
+
+def welch_test(a, b, permutations: int = PERMUTATIONS, seed: int = 0) -> dict:
+    """
+    Welch's t-test (unequal variances) on two samples. p-value from scipy when
+    installed, otherwise from a two-sided permutation test on the same statistic.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    a, b = a[~np.isnan(a)], b[~np.isnan(b)]
+    if len(a) < 2 or len(b) < 2:
+        return {"t": np.nan, "p": np.nan, "df": np.nan, "method": "insufficient data", "n": (len(a), len(b))}
+
+    def t_stat(x, y):
+        vx, vy = x.var(ddof=1) / len(x), y.var(ddof=1) / len(y)
+        se = np.sqrt(vx + vy)
+        return (x.mean() - y.mean()) / se if se > 0 else 0.0
+
+    va, vb = a.var(ddof=1) / len(a), b.var(ddof=1) / len(b)
+    denom = (va ** 2) / (len(a) - 1) + (vb ** 2) / (len(b) - 1)
+    df = (va + vb) ** 2 / denom if denom > 0 else np.nan
+    t = t_stat(a, b)
+
+    if _scipy_stats is not None:
+        res = _scipy_stats.ttest_ind(a, b, equal_var=False)
+        return {"t": float(res.statistic), "p": float(res.pvalue), "df": float(df), "method": "Welch t-test", "n": (len(a), len(b))}
+
+    rng = np.random.default_rng(seed)
+    pooled = np.concatenate([a, b])
+    # Vectorized: one permutation per row.
+    idx = np.argsort(rng.random((permutations, len(pooled))), axis=1)
+    perm = pooled[idx]
+    x, y = perm[:, : len(a)], perm[:, len(a):]
+    se = np.sqrt(x.var(axis=1, ddof=1) / len(a) + y.var(axis=1, ddof=1) / len(b))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_perm = np.where(se > 0, (x.mean(axis=1) - y.mean(axis=1)) / se, 0.0)
+    p = (np.sum(np.abs(t_perm) >= abs(t)) + 1) / (permutations + 1)
+    return {"t": float(t), "p": float(p), "df": float(df), "method": "Welch t (permutation p)", "n": (len(a), len(b))}
+
+
+def summarize(results_dir: str) -> dict:
+    """Everything the analytics page shows; memoized until the results change."""
+    fp, trials = load_trials(results_dir)
+    with _cache_lock:
+        cached = _summaries.get(results_dir)
+    if cached is not None and cached[0] == fp:
+        return cached[1]
+
+    participants = per_participant(trials) if len(trials) else pd.DataFrame(
+        columns=[
+            "chart_type", "participant_id", "trials", "mean_time", "median_time",
+            "client_trials", "mean_client_rt", "error_rate",
+        ]
+    )
+    by_chart = {c: participants[participants["chart_type"] == c] for c in CHART_TYPES}
+
+    summary = {
+        "trials": trials,
+        "per_trial": per_trial_stats(trials) if len(trials) else pd.DataFrame(),
+        "participants": participants,
+        "per_chart": per_chart_stats(participants) if len(participants) else pd.DataFrame(),
+        "time_test": welch_test(by_chart["heatmap"]["mean_time"], by_chart["treemap"]["mean_time"]),
+        "client_rt_test": welch_test(by_chart["heatmap"]["mean_client_rt"], by_chart["treemap"]["mean_client_rt"]),
+        "error_test": welch_test(by_chart["heatmap"]["error_rate"], by_chart["treemap"]["error_rate"]),
+    }
+
+    with _cache_lock:
+        _summaries[results_dir] = (fp, summary)
+    return summary
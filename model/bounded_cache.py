@@ -0,0 +1,174 @@
+import dataclasses
+import functools
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from model.instrumentation import note_cache
+
+
+# -----------------------------
+# Bounded, size-aware LRU cache for chart builders
+# st.cache_data keeps every distinct filter combination forever. This cache is
+# process-wide (shared by all sessions), evicts least-recently-used entries once
+# either the entry count or the estimated byte budget is exceeded, and keeps
+# hit/miss/eviction counters that can be inspected with cache_stats().
+# Cached values are shared, not copied: numpy arrays are frozen read-only, and
+# pandas objects are handed out as shallow copies (no data is copied). Under
+# copy-on-write, anything a caller does to its copy (setting cells, adding,
+# renaming or dropping columns, in-place sorts) leaves the cached one intact.
+# -----------------------------
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def estimate_nbytes(value) -> int:
+    """Best-effort deep size of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return int(value.nbytes + sum(sys.getsizeof(v) for v in value.ravel()))
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    if hasattr(value, "to_plotly_json"):
+        # Plotly figure: size its data/layout dict (arrays included)
+        return estimate_nbytes(value.to_plotly_json())
+    return sys.getsizeof(value)
+
+
+def freeze(value):
+    """Mark every numpy array reachable from value read-only (in place); returns value."""
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (pd.DataFrame, pd.Series)):
+        for block in value._mgr.blocks:
+            if isinstance(block.values, np.ndarray):
+                block.values.setflags(write=False)
+    elif isinstance(value, dict):
+        for v in value.values():
+            freeze(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            freeze(v)
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        for f in dataclasses.fields(value):
+            freeze(getattr(value, f.name))
+    return value
+
+
+def _hand_out(value):
+    """What a caller gets for a cached value: pandas objects as a shallow copy."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    return value
+
+
+class BoundedCache:
+    def __init__(self, name: str, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+        note_cache(self.name, hit)
+        if hit:
+            return _hand_out(entry[0])
+
+        # Compute outside the lock so a slow build never blocks other sessions' hits.
+        value = freeze(compute())
+        nbytes = estimate_nbytes(value)
+
+        with self._lock:
+            if key in self._entries:
+                return _hand_out(self._entries[key][0])
+            if nbytes > self.max_bytes:
+                # Too big to keep: hand it out but don't let it flush the cache.
+                return value
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, old_bytes) = self._entries.popitem(last=False)
+                self._bytes -= old_bytes
+                self.evictions += 1
+        return _hand_out(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+            }
+
+
+def bounded_cache(max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, key=None):
+    """
+    Decorator. `key` (optional) maps the call arguments to the cache key, e.g. to
+    canonicalize a genre selection; by default the positional/keyword args are used.
+    """
+    def decorator(fn):
+        cache = BoundedCache(f"{fn.__module__}.{fn.__qualname__}", max_entries, max_bytes)
+        with _registry_lock:
+            _registry.append(cache)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return cache.get_or_compute(k, lambda: fn(*args, **kwargs))
+
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+def cache_stats() -> list:
+    """Counters for every bounded cache in this process."""
+    with _registry_lock:
+        caches = list(_registry)
+    return [c.stats() for c in caches]
+
+
+def clear_all() -> None:
+    """Empty every bounded cache in this process (counters are kept)."""
+    with _registry_lock:
+        caches = list(_registry)
+    for c in caches:
+        c.clear()
@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from model.genre_index import SongGenreIndex
+
+
+# -----------------------------
+# Genre × year aggregate cube
+# Built once per dataset. Chart builders slice it and divide sums by counts
+# instead of filtering + grouping the full song frame on every filter change.
+# -----------------------------
+@dataclass(frozen=True)
+class GenreYearCube:
+    genres: tuple           # genre label per row (sorted like DataFrame.groupby)
+    first_year: int         # year of column 0
+    sums: np.ndarray        # float64 [n_genres, n_years] popularity sums
+    counts: np.ndarray      # int64   [n_genres, n_years] non-null popularity counts
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.first_year, self.first_year + self.sums.shape[1])
+
+    @property
+    def empty(self) -> bool:
+        return self.sums.size == 0
+
+    def _slice(self, start_year: int, end_year: int, selected_genres_tuple: tuple):
+        if self.empty:
+            return np.array([], dtype=int), self.years[:0], self.sums[:0, :0], self.counts[:0, :0]
+
+        lo = max(int(start_year) - self.first_year, 0)
+        hi = min(int(end_year) - self.first_year + 1, self.sums.shape[1])
+        hi = max(hi, lo)
+
+        if selected_genres_tuple:
+            wanted = set(selected_genres_tuple)
+            rows = np.array([i for i, g in enumerate(self.genres) if g in wanted], dtype=int)
+        else:
+            rows = np.arange(len(self.genres))
+
+        return rows, self.years[lo:hi], self.sums[rows, lo:hi], self.counts[rows, lo:hi]
+
+    def mean_matrix(self, start_year: int, end_year: int, selected_genres_tuple: tuple) -> pd.DataFrame:
+        """genre × year (str) mean popularity, shaped like the old groupby + pivot."""
+        rows, years, sums, counts = self._slice(start_year, end_year, selected_genres_tuple)
+
+        keep_rows = counts.any(axis=1)
+        keep_cols = counts.any(axis=0)
+        sums = sums[keep_rows][:, keep_cols]
+        counts = counts[keep_rows][:, keep_cols]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+        return pd.DataFrame(
+            means,
+            index=pd.Index([self.genres[i] for i in rows[keep_rows]], name="genre"),
+            columns=pd.Index([str(y) for y in years[keep_cols]], name="year"),
+        )
+
+    def mean_cells(self, start_year: int, end_year: int, selected_genres_tuple: tuple):
+        """(years, genres, means) arrays for every non-empty cell, year-major then genre."""
+        rows, years, sums, counts = self._slice(start_year, end_year, selected_genres_tuple)
+
+        # Transpose so np.nonzero walks year-major, matching groupby(["year", "genre"]).
+        yi, gi = np.nonzero(counts.T > 0)
+        labels = np.asarray(self.genres, dtype=object)
+        return years[yi].astype(int), labels[rows[gi]], sums[gi, yi] / counts[gi, yi]
+
+    def mean_long(self, start_year: int, end_year: int, selected_genres_tuple: tuple) -> pd.DataFrame:
+        """Long (year, genre, popularity) means for every non-empty cell, sorted by year then genre."""
+        years, genres, means = self.mean_cells(start_year, end_year, selected_genres_tuple)
+        return pd.DataFrame({"year": years, "genre": genres, "popularity": means})
+
+def build_cube(df: pd.DataFrame) -> GenreYearCube:
+    """Aggregate an exploded (artist, song, year, popularity, genre) frame into a cube."""
+    if df.empty:
+        empty = np.zeros((0, 0))
+        return GenreYearCube((), 0, empty, empty.astype(np.int64))
+
+    genre = df["genre"]
+    if not isinstance(genre.dtype, pd.CategoricalDtype):
+        genre = genre.astype(str).astype("category")
+    genre_codes = genre.cat.codes.to_numpy(dtype=np.int64)
+    genres = genre.cat.categories
+    years = df["year"].to_numpy(dtype=np.int64)
+    first_year = int(years.min())
+    n_years = int(years.max()) - first_year + 1
+    n_genres = len(genres)
+
+    popularity = pd.to_numeric(df["popularity"], errors="coerce").to_numpy(dtype=np.float64)
+    valid = ~np.isnan(popularity) & (genre_codes >= 0)
+    cell = genre_codes * n_years + (years - first_year)
+
+    sums = np.bincount(cell[valid], weights=popularity[valid], minlength=n_genres * n_years)
+    counts = np.bincount(cell[valid], minlength=n_genres * n_years)
+
+    return GenreYearCube(
+        genres=tuple(str(g) for g in genres),
+        first_year=first_year,
+        sums=sums.reshape(n_genres, n_years),
+        counts=counts.astype(np.int64).reshape(n_genres, n_years),
+    )
+
+
+def build_cube_from_index(index: SongGenreIndex) -> GenreYearCube:
+    """Same cube as build_cube, straight from the song→genre CSR incidence (no exploded frame)."""
+    if index.n_songs == 0:
+        empty = np.zeros((0, 0))
+        return GenreYearCube((), 0, empty, empty.astype(np.int64))
+
+    years = index.year.astype(np.int64)
+    first_year = int(years.min())
+    n_years = int(years.max()) - first_year + 1
+    n_genres = len(index.genres)
+
+    tags_per_song = np.diff(index.indptr)
+    tag_year = np.repeat(years - first_year, tags_per_song)
+    tag_pop = np.repeat(index.popularity.astype(np.float64), tags_per_song)
+    valid = ~np.isnan(tag_pop)
+    cell = index.indices.astype(np.int64) * n_years + tag_year
+
+    sums = np.bincount(cell[valid], weights=tag_pop[valid], minlength=n_genres * n_years)
+    counts = np.bincount(cell[valid], minlength=n_genres * n_years)
+
+    return GenreYearCube(
+        genres=index.genres,
+        first_year=first_year,
+        sums=sums.reshape(n_genres, n_years),
+        counts=counts.astype(np.int64).reshape(n_genres, n_years),
+    )
+
+
+def cube_from_cells(genres, years, sums, counts) -> GenreYearCube:
+    """Dense cube from sparse (genre, year, sum, count) cells, e.g. streamed partial aggregates."""
+    genre_codes, labels = pd.factorize(pd.Index(genres, dtype=object), sort=True)
+    years = np.asarray(years, dtype=np.int64)
+    if len(years) == 0:
+        return build_cube(pd.DataFrame(columns=["year", "popularity", "genre"]))
+
+    first_year = int(years.min())
+    n_years = int(years.max()) - first_year + 1
+    n_genres = len(labels)
+    cell = genre_codes * n_years + (years - first_year)
+
+    dense_sums = np.bincount(cell, weights=np.asarray(sums, dtype=np.float64), minlength=n_genres * n_years)
+    dense_counts = np.bincount(cell, weights=np.asarray(counts, dtype=np.float64), minlength=n_genres * n_years)
+
+    return GenreYearCube(
+        genres=tuple(str(g) for g in labels),
+        first_year=first_year,
+        sums=dense_sums.reshape(n_genres, n_years),
+        counts=np.rint(dense_counts).astype(np.int64).reshape(n_genres, n_years),
+    )
@@ -3,6 +3,9 @@ import sys
 import csv
 from typing import List, Optional
 
+from model import participant_ids
+
+
 class FilePathConfig:
     @staticmethod
     def _set_file_path(strip_count) -> str:
@@ -49,26 +52,11 @@ def ensure_workbook(file_path: str, total_trials: int):
 
 
 def get_next_participant_id(file_path: str) -> int:
-    file_path = _resolve_path(file_path)
     """
-    Reads CSV and returns max participant_id + 1
+    Next participant_id from the shared allocator (seeded once from the CSV's max id)
     """
     file_path = _resolve_path(file_path)
-    if not os.path.exists(file_path):
-        return 1
-
-    ids = []
-    with open(file_path, "r", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        next(reader, None)  # skip header
-        for row in reader:
-            if row and row[0]:
-                try:
-                    ids.append(int(row[0]))
-                except Exception:
-                    pass
-
-    return max(ids) + 1 if ids else 1
+    return participant_ids.next_participant_id(file_path)
 
 
 def append_participant_result(
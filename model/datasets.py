@@ -1,20 +1,415 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
 import streamlit as st
 
-@st.cache_data(show_spinner=False)
-def load_dataset(file_name: str) -> pd.DataFrame:
-    df = pd.read_csv(file_name)
-    df["genre"] = df["genre"].astype(str).str.split(",")
-    df = df.explode("genre")
-    df["genre"] = df["genre"].astype(str).str.strip()
-    df["year"] = pd.to_numeric(df["year"], errors="coerce").astype("Int64")
+from model.bounded_cache import clear_all as clear_bounded_caches
+from model.bounded_cache import freeze
+from model.cube import GenreYearCube, build_cube, build_cube_from_index, cube_from_cells
+from model.genre_index import SongGenreIndex, build_genre_index
+from model.instrumentation import cache_miss, track_cache
+
+# -----------------------------
+# Binary sidecar cache
+# The exploded, typed frame is written next to the CSV as Parquet, keyed by the
+# CSV content hash, so a cold start can skip the CSV parse + explode entirely.
+# The genre × year cube gets its own (tiny) .cube.npz sidecar, which is all the
+# charts need, so a warm restart never has to touch the song rows at all.
+# Bump SIDECAR_VERSION whenever the shape/dtypes produced by _parse_csv change.
+# -----------------------------
+SIDECAR_VERSION = 3
+_HASH_CHUNK_BYTES = 1 << 20
+
+# -----------------------------
+# Streaming ingestion
+# CSVs at or above STREAMING_THRESHOLD_BYTES are never materialized: they are
+# read CSV_CHUNK_ROWS rows at a time and each chunk is folded straight into the
+# genre × year sums/counts.
+# -----------------------------
+STREAMING_THRESHOLD_BYTES = int(os.environ.get("TREEMAP_STREAMING_THRESHOLD_MB", "256")) * 1024 * 1024
+CSV_CHUNK_ROWS = 250_000
+
+# -----------------------------
+# Storage mode
+#   "exploded": one row per (song, genre) — the classic DataFrame layout
+#   "csr":      one row per song (year/popularity/genre only) + CSR song→genre
+#               index (no row blow-up); only used to build the cube, which is
+#               then persisted as a sidecar, so the index itself is never
+#               cached or written to disk. "bitmask" is accepted as an alias.
+#   "streaming": never hold the songs, only the cube (see stream_cube)
+# -----------------------------
+_STORAGE_MODE_ALIASES = {"bitmask": "csr"}
+STORAGE_MODE = os.environ.get("TREEMAP_DATASET_STORAGE", "exploded").strip().lower()
+STORAGE_MODE = _STORAGE_MODE_ALIASES.get(STORAGE_MODE, STORAGE_MODE)
+
+
+def file_sha256(file_name: str) -> str:
+    """Content hash of a file, read in chunks so large CSVs never sit in RAM."""
+    h = hashlib.sha256()
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# -----------------------------
+# Dataset handle
+# A tiny immutable key (path + content fingerprint) that cached functions take
+# instead of the DataFrame itself, so st.cache_data hashes two short strings per
+# lookup instead of the whole frame. Fingerprints are memoized per file stat, so
+# the CSV is only re-hashed when it actually changes on disk.
+# -----------------------------
+@dataclass(frozen=True)
+class DatasetHandle:
+    path: str
+    fingerprint: str
+
+
+_fingerprint_registry: dict = {}
+_fingerprint_lock = threading.Lock()
+
+
+def open_dataset(file_name: str) -> DatasetHandle:
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+
+    with _fingerprint_lock:
+        digest = _fingerprint_registry.get(key)
+    if digest is None:
+        digest = file_sha256(path)
+        with _fingerprint_lock:
+            # Drop fingerprints of older versions of this same file.
+            for old in [k for k in _fingerprint_registry if k[0] == path]:
+                del _fingerprint_registry[old]
+            _fingerprint_registry[key] = digest
+
+    return DatasetHandle(path=path, fingerprint=digest)
+
+
+def register_fingerprint(file_name: str, digest: str) -> DatasetHandle:
+    """Record a digest computed elsewhere (e.g. while streaming an upload) so it isn't re-hashed."""
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    with _fingerprint_lock:
+        for old in [k for k in _fingerprint_registry if k[0] == path]:
+            del _fingerprint_registry[old]
+        _fingerprint_registry[(path, stat.st_size, stat.st_mtime_ns)] = digest
+    return DatasetHandle(path=path, fingerprint=digest)
+
+
+_invalidation_hooks = []
+
+
+def on_invalidate(hook) -> None:
+    """Register hook() to run whenever invalidate_caches() is called."""
+    _invalidation_hooks.append(hook)
+
+
+def invalidate_caches() -> None:
+    """Drop every in-memory cache derived from a dataset (call after replacing the file)."""
+    for loader in (load_dataset, load_cube, load_genre_list):
+        loader.clear()
+    clear_bounded_caches()
+    for hook in list(_invalidation_hooks):
+        hook()
+
+
+def _sidecar_path(file_name: str, digest: str, suffix: str = ".parquet") -> Path:
+    p = Path(file_name)
+    return p.with_name(f".{p.stem}.v{SIDECAR_VERSION}.{digest[:16]}{suffix}")
+
+
+def _remove_stale_sidecars(file_name: str, keep: Path, suffix: str = ".parquet") -> None:
+    p = Path(file_name)
+    for old in p.parent.glob(f".{p.stem}.v*{suffix}"):
+        if old != keep:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def _read_sidecar(path: Path):
+    if not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        # Corrupt/partial sidecar (or no parquet engine): fall back to the CSV.
+        return None
+
+
+def _write_atomic(path: Path, write) -> bool:
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+        return True
+    except Exception:
+        # Sidecars are only accelerators; never fail the load because of one.
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        return False
+
+
+def _write_sidecar(df: pd.DataFrame, path: Path, file_name: str) -> None:
+    if _write_atomic(path, df.to_parquet):
+        _remove_stale_sidecars(file_name, keep=path)
+
+
+def _read_cube_sidecar(path: Path):
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            return GenreYearCube(
+                genres=tuple(str(g) for g in z["genres"]),
+                first_year=int(z["first_year"]),
+                sums=z["sums"].astype(np.float64, copy=False),
+                counts=z["counts"],
+            )
+    except Exception:
+        return None
+
+
+def _write_cube_sidecar(cube: GenreYearCube, path: Path, file_name: str) -> None:
+    def write(f):
+        np.savez(
+            f,
+            genres=np.array(cube.genres, dtype=str),
+            first_year=np.int64(cube.first_year),
+            sums=np.asarray(cube.sums, dtype=np.float64),
+            counts=cube.counts,
+        )
+
+    if _write_atomic(path, write):
+        _remove_stale_sidecars(file_name, keep=path, suffix=".cube.npz")
+
+
+def _compact_popularity(popularity: pd.Series) -> pd.Series:
+    """uint8 when every value is a whole 0..255; otherwise float64 (exact sums for the cube means)."""
+    pop = pd.to_numeric(popularity, errors="coerce")
+    if pop.notna().all() and pop.between(0, 255).all() and (pop % 1 == 0).all():
+        return pop.astype(np.uint8)
+    return pop.astype(np.float64)
+
+
+def _narrow_year_popularity(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop rows without a year; year → int16, popularity → uint8/float64."""
+    df["year"] = pd.to_numeric(df["year"], errors="coerce")
     df = df.dropna(subset=["year"])
-    df["year"] = df["year"].astype(int)
+    df["year"] = df["year"].astype(np.int16)
+    df["popularity"] = _compact_popularity(df["popularity"])
     return df
 
-@st.cache_data(show_spinner=False)
-def load_genre_list(df: pd.DataFrame) -> list:
-    genre_col = df["genre"].astype(str).str.split(",").tolist()
-    genre_list = [g.strip() for genre_set in genre_col for g in genre_set]
-    return sorted(dict.fromkeys(genre_list), key=str.lower)
\ No newline at end of file
+
+def _read_songs(file_name: str) -> pd.DataFrame:
+    """One row per song, compact dtypes, genre still the raw comma-separated string."""
+    # Narrow year/popularity BEFORE the explode so every repeated genre row
+    # copies 2 + 1 bytes instead of two int64s.
+    df = _narrow_year_popularity(pd.read_csv(file_name))
+
+    # Artist/song become dictionary codes: each string is stored once, no matter
+    # how many genre rows the song is exploded into.
+    for col in ("artist", "song"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _parse_csv(file_name: str) -> pd.DataFrame:
+    df = _read_songs(file_name)
+    df["genre"] = df["genre"].astype(str).str.split(",")
+    df = df.explode("genre", ignore_index=True)
+    df["genre"] = df["genre"].astype(str).str.strip().astype("category")
+    return df
+
+
+def stream_cube(file_name: str, chunksize: int = CSV_CHUNK_ROWS, progress=None) -> GenreYearCube:
+    """
+    Fold the CSV into a genre × year cube chunk by chunk (bounded memory).
+    `progress(fraction_of_bytes_read)` is called after each chunk, if given.
+    """
+    totals = None
+    total_bytes = max(os.path.getsize(file_name), 1)
+    with open(file_name, "rb") as f:
+        reader = pd.read_csv(f, usecols=["year", "popularity", "genre"], chunksize=chunksize)
+        for chunk in reader:
+            totals = _fold_chunk(totals, chunk)
+            if progress:
+                progress(min(f.tell() / total_bytes, 1.0))
+
+    if totals is None:
+        return build_cube(pd.DataFrame(columns=["year", "popularity", "genre"]))
+
+    totals = totals[totals["count"] > 0]
+    return cube_from_cells(
+        totals.index.get_level_values("genre").astype(str),
+        totals.index.get_level_values("year").to_numpy(dtype=np.int64),
+        totals["sum"].to_numpy(dtype=np.float64),
+        totals["count"].to_numpy(dtype=np.int64),
+    )
+
+
+def _fold_chunk(totals, chunk: pd.DataFrame):
+    chunk["year"] = pd.to_numeric(chunk["year"], errors="coerce")
+    chunk = chunk.dropna(subset=["year"])
+    if chunk.empty:
+        return totals
+
+    # Only this chunk's (row, genre) pairs are exploded, never the whole file.
+    tags = chunk["genre"].astype(str).str.split(",").explode().str.strip()
+    cells = pd.DataFrame(
+        {
+            "genre": tags.to_numpy(),
+            "year": chunk["year"].astype(np.int64).reindex(tags.index).to_numpy(),
+            "popularity": pd.to_numeric(chunk["popularity"], errors="coerce").reindex(tags.index).to_numpy(),
+        }
+    )
+    part = cells.groupby(["genre", "year"])["popularity"].agg(["sum", "count"])
+    return part if totals is None else totals.add(part, fill_value=0)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Per-column deep memory usage (bytes) of two frames, plus a total row."""
+    report = pd.DataFrame(
+        {
+            "before_bytes": before.memory_usage(deep=True),
+            "after_bytes": after.memory_usage(deep=True),
+        }
+    ).fillna(0).astype(np.int64)
+    report.loc["TOTAL"] = report.sum()
+    report["ratio"] = (report["after_bytes"] / report["before_bytes"].where(report["before_bytes"] > 0)).round(3)
+    return report
+
+
+# -----------------------------
+# Builders (plain functions, safe to call from background threads)
+# -----------------------------
+def read_dataset(handle: DatasetHandle) -> pd.DataFrame:
+    sidecar = _sidecar_path(handle.path, handle.fingerprint)
+
+    df = _read_sidecar(sidecar)
+    if df is not None:
+        return df
+
+    df = _parse_csv(handle.path)
+    _write_sidecar(df, sidecar, handle.path)
+    return df
+
+
+def read_genre_index(handle: DatasetHandle) -> SongGenreIndex:
+    # Only the cube's inputs are parsed; artist/song would be discarded anyway.
+    df = pd.read_csv(handle.path, usecols=["year", "popularity", "genre"])
+    return build_genre_index(_narrow_year_popularity(df))
+
+
+def _use_streaming(handle: DatasetHandle) -> bool:
+    if STORAGE_MODE == "streaming":
+        return True
+    try:
+        return os.path.getsize(handle.path) >= STREAMING_THRESHOLD_BYTES
+    except OSError:
+        return False
+
+
+def build_dataset_cube(handle: DatasetHandle, progress=None) -> GenreYearCube:
+    """
+    Genre × year sum/count cube for a dataset, persisted as a sidecar.
+    `progress(fraction, message)` is called as the build advances, if given.
+    """
+    report = progress or (lambda fraction, message: None)
+
+    sidecar = _sidecar_path(handle.path, handle.fingerprint, suffix=".cube.npz")
+    cube = _read_cube_sidecar(sidecar)
+    if cube is not None:
+        report(1.0, "Loaded cached aggregates")
+        return cube
+
+    if _use_streaming(handle):
+        cube = stream_cube(handle.path, progress=lambda f: report(0.95 * f, "Reading CSV"))
+    elif STORAGE_MODE == "csr":
+        report(0.1, "Indexing songs")
+        cube = build_cube_from_index(read_genre_index(handle))
+    else:
+        report(0.1, "Parsing CSV")
+        df = read_dataset(handle)
+        report(0.8, "Aggregating")
+        cube = build_cube(df)
+
+    _write_cube_sidecar(cube, sidecar, handle.path)
+    report(1.0, "Ready")
+    return cube
+
+
+# -----------------------------
+# Cached loaders (script thread)
+# One shared, read-only object per dataset for the whole process: every session
+# and every rerun gets the SAME object (st.cache_resource), never a pickled
+# copy (st.cache_data). numpy buffers are frozen, so a stray in-place write
+# raises instead of leaking into other sessions; shared DataFrames rely on
+# pandas copy-on-write (the default since pandas 3.0), so derived frames copy
+# before they modify anything. Treat every value returned here as immutable.
+# -----------------------------
+def _share(value):
+    if isinstance(value, pd.DataFrame):
+        # Public numpy views of a copy-on-write frame are already read-only.
+        return value
+    return freeze(value)
+
+
+@track_cache("datasets.load_dataset")
+@st.cache_resource(show_spinner=False)
+def load_dataset(handle: DatasetHandle) -> pd.DataFrame:
+    cache_miss()
+    return _share(read_dataset(handle))
+
+
+@track_cache("datasets.load_cube")
+@st.cache_resource(show_spinner=False)
+def load_cube(handle: DatasetHandle) -> GenreYearCube:
+    """Genre × year sum/count cube, built once per dataset (and persisted as a sidecar)."""
+    cache_miss()
+    return _share(build_dataset_cube(handle))
+
+
+@track_cache("datasets.load_genre_list")
+@st.cache_resource(show_spinner=False)
+def load_genre_list(handle: DatasetHandle) -> tuple:
+    """Sorted genre labels (a tuple: it is shared by every session)."""
+    cache_miss()
+    genre_list = [str(g).strip() for g in load_cube(handle).genres]
+    return tuple(sorted(dict.fromkeys(genre_list), key=str.lower))
+
+
+def canonical_genres(handle: DatasetHandle, selected_genres) -> tuple:
+    """
+    Order-free key for a genre selection: sorted, de-duplicated, unknown genres
+    dropped, and "every genre selected" folded into () (= no genre filter).
+    """
+    selected = set(selected_genres or ())
+    if not selected:
+        return ()
+    all_genres = set(load_genre_list(handle))
+    known = selected & all_genres
+    if not known:
+        # Nothing matches; keep the raw selection so the result stays "empty".
+        return tuple(sorted(selected))
+    if known == all_genres:
+        return ()
+    return tuple(sorted(known))
+
+
+def filter_cache_key(handle: DatasetHandle, start_year: int, end_year: int, selected_genres_tuple: tuple) -> tuple:
+    """Cache key shared by the chart builders (see model.bounded_cache)."""
+    return handle, int(start_year), int(end_year), canonical_genres(handle, selected_genres_tuple)
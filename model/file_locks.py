@@ -0,0 +1,45 @@
+import os
+
+
+def is_file_locked(path: str) -> bool:
+    """
+    Returns True if the file exists and is likely open/locked (e.g. an XLSX open in Excel).
+    Cross-platform best-effort:
+      - Windows: try opening + exclusive byte-range lock via msvcrt
+      - Unix: try flock exclusive non-blocking
+    """
+    if not path or not os.path.exists(path):
+        return False
+
+    try:
+        # If the OS denies opening for write at all, it's locked.
+        f = open(path, "a")
+    except PermissionError:
+        return True
+    except Exception:
+        # Unknown edge case; assume not locked to avoid false positives.
+        return False
+
+    try:
+        if os.name == "nt":
+            import msvcrt
+            try:
+                # lock 1 byte non-blocking
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                return False
+            except OSError:
+                return True
+        else:
+            import fcntl
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                return False
+            except (BlockingIOError, OSError):
+                return True
+    finally:
+        try:
+            f.close()
+        except Exception:
+            pass
@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+# -----------------------------
+# Song → genre index (no row explosion)
+# Each song is stored once; its genres are a CSR song→genre incidence
+# (indptr/indices), so per-genre aggregation is a sparse matrix–vector product
+# (done with np.bincount, no scipy needed). This only feeds the genre × year
+# cube (model.cube.build_cube_from_index): the charts slice the cube, so no
+# per-song genre filtering is ever needed at request time.
+# -----------------------------
+@dataclass(frozen=True)
+class SongGenreIndex:
+    genres: tuple           # genre label per CSR column (sorted)
+    year: np.ndarray        # int16  [n_songs]
+    popularity: np.ndarray  # uint8 or float64 [n_songs]
+    indptr: np.ndarray      # int64  [n_songs + 1]
+    indices: np.ndarray     # int32  [nnz] genre code per (song, tag)
+
+    @property
+    def n_songs(self) -> int:
+        return len(self.year)
+
+
+def build_genre_index(df: pd.DataFrame) -> SongGenreIndex:
+    """Index a raw (one row per song, comma-separated genre) frame without exploding it."""
+    # Only the (song position, genre) pairs are exploded — two small integer
+    # arrays — never the artist/song/year/popularity columns. Songs with a
+    # missing genre get no tags (build_cube drops them the same way).
+    genre = df["genre"].reset_index(drop=True)
+    tags = genre.dropna().astype(str).str.split(",").explode()
+    song_pos = tags.index.to_numpy(dtype=np.int64)
+    tag_cat = tags.astype(str).str.strip().astype("category")
+    codes = tag_cat.cat.codes.to_numpy(dtype=np.int32)
+    genres = tuple(str(g) for g in tag_cat.cat.categories)
+
+    counts = np.bincount(song_pos, minlength=len(df))
+    indptr = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    return SongGenreIndex(
+        genres=genres,
+        year=df["year"].to_numpy(),
+        popularity=df["popularity"].to_numpy(),
+        indptr=indptr,
+        indices=codes,
+    )
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# -----------------------------
+# Per-rerun phase timing (opt-in)
+# A rerun record is opened by rerun() on the script thread: the whole page run,
+# or a fragment rerun (a rerun() nested inside an open record is just a phase).
+# phase() adds wall time to the open record; value() attaches a number (e.g. a
+# serialized figure size); cache lookups made during the rerun are attributed
+# to it. Finished records go to a bounded in-memory ring (all sessions) and are
+# appended as one JSON line each to the log file. With no open record every
+# hook is a thread-local lookup, so disabled instrumentation costs ~nothing.
+# -----------------------------
+RING_SIZE = 500
+LOG_FILE_NAME = "perf_log.jsonl"
+LOG_MAX_BYTES = 20 * 1024 * 1024  # rotated to .1 beyond this
+
+_local = threading.local()
+_ring = deque(maxlen=RING_SIZE)
+_ring_lock = threading.Lock()
+_log_lock = threading.Lock()
+_log_dir = None
+
+_cache_counts = {}   # name -> [lookups, misses] for Streamlit-cached loaders
+_cache_lock = threading.Lock()
+
+_NULL = nullcontext()
+
+
+def configure(log_dir: str) -> None:
+    """Folder for the JSONL log (created on first write)."""
+    global _log_dir
+    _log_dir = log_dir
+
+
+def log_path():
+    return os.path.join(_log_dir, LOG_FILE_NAME) if _log_dir else None
+
+
+def _current():
+    return getattr(_local, "record", None)
+
+
+def active() -> bool:
+    return _current() is not None
+
+
+@contextmanager
+def rerun(kind: str, enabled: bool, **meta):
+    """Open a rerun record (if enabled and none is open on this thread)."""
+    outer = _current()
+    if outer is not None:
+        with phase(kind):
+            yield outer
+        return
+    if not enabled:
+        yield None
+        return
+
+    record = {"kind": kind, "ts": time.time(), "phases": {}, "values": {}, "cache": {}, **meta}
+    _local.record = record
+    t0 = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["total_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        _local.record = None
+        _finish(record)
+
+
+def phase(name: str):
+    """Time a block into the open rerun record (no-op without one)."""
+    record = _current()
+    if record is None:
+        return _NULL
+    return _phase(record, name)
+
+
+@contextmanager
+def _phase(record: dict, name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        record["phases"][name] = round(record["phases"].get(name, 0.0) + ms, 3)
+
+
+def value(name: str, v) -> None:
+    record = _current()
+    if record is not None:
+        record["values"][name] = v
+
+
+# -----------------------------
+# Cache hit/miss tracking
+# bounded_cache reports its own lookups through note_cache(). Streamlit-cached
+# loaders are wrapped with track_cache(): the wrapper counts lookups, the
+# cached body calls cache_miss() (it only runs on a miss).
+# -----------------------------
+def note_cache(name: str, hit: bool) -> None:
+    record = _current()
+    if record is None:
+        return
+    hits, misses = record["cache"].get(name, (0, 0))
+    record["cache"][name] = (hits + int(hit), misses + int(not hit))
+
+
+def cache_miss() -> None:
+    stack = getattr(_local, "lookups", None)
+    if stack:
+        stack[-1][0] = True
+
+
+class _TrackedCache:
+    def __init__(self, name: str, fn):
+        self._name = name
+        self._fn = fn
+        self.__wrapped__ = fn
+
+    def __call__(self, *args, **kwargs):
+        stack = getattr(_local, "lookups", None)
+        if stack is None:
+            stack = _local.lookups = []
+        frame = [False]
+        stack.append(frame)
+        try:
+            return self._fn(*args, **kwargs)
+        finally:
+            stack.pop()
+            missed = frame[0]
+            with _cache_lock:
+                counts = _cache_counts.setdefault(self._name, [0, 0])
+                counts[0] += 1
+                counts[1] += int(missed)
+            note_cache(self._name, not missed)
+
+    def __getattr__(self, attr):
+        # .clear() etc. go to the Streamlit cached function.
+        return getattr(self._fn, attr)
+
+
+def track_cache(name: str):
+    """Decorator for a Streamlit-cached function whose body calls cache_miss()."""
+    return lambda fn: _TrackedCache(name, fn)
+
+
+def tracked_cache_stats() -> list:
+    with _cache_lock:
+        items = sorted(_cache_counts.items())
+    return [
+        {"name": name, "hits": lookups - misses, "misses": misses, "hit_rate": (lookups - misses) / lookups if lookups else None}
+        for name, (lookups, misses) in items
+    ]
+
+
+# -----------------------------
+# Ring buffer + JSONL log
+# -----------------------------
+def _finish(record: dict) -> None:
+    record["cache"] = {k: {"hits": h, "misses": m} for k, (h, m) in record["cache"].items()}
+    with _ring_lock:
+        _ring.append(record)
+    path = log_path()
+    if path:
+        _append_log(path, record)
+
+
+def _append_log(path: str, record: dict) -> None:
+    line = json.dumps(record, default=str) + "\n"
+    with _log_lock:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) > LOG_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass  # diagnostics must never break a rerun
+
+
+def recent(session_id: str = None, limit: int = 50) -> list:
+    """Latest finished records, newest first (optionally only one session's)."""
+    with _ring_lock:
+        records = list(_ring)
+    if session_id is not None:
+        records = [r for r in records if r.get("session") == session_id]
+    return records[::-1][:limit]
@@ -0,0 +1,97 @@
+import csv
+import os
+import threading
+
+
+# -----------------------------
+# Participant-ID allocator
+# One small counter file per results CSV holds the next free ID. Allocation
+# takes an exclusive OS lock on that file (fcntl / msvcrt, like the results
+# lock checks), reads the number and writes number + 1: O(1), and safe across
+# sessions, threads and processes. The counter is seeded ONCE from the CSV
+# (max existing ID + 1) the first time it is needed.
+# IDs handed out to runs that are later abandoned are not reused.
+# -----------------------------
+_thread_lock = threading.Lock()
+
+
+def counter_path(csv_path: str) -> str:
+    folder, name = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(folder, f".{name}.next_id")
+
+
+def _max_id_in_csv(csv_path: str) -> int:
+    if not os.path.exists(csv_path):
+        return 0
+
+    max_id = 0
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        r = csv.reader(f)
+        next(r, None)  # header
+        for row in r:
+            if not row:
+                continue
+            try:
+                max_id = max(max_id, int(row[0]))
+            except Exception:
+                continue
+    return max_id
+
+
+def _lock(fd: int) -> None:
+    if os.name == "nt":
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)  # blocks (retries for ~10s, then OSError)
+    else:
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _unlock(fd: int) -> None:
+    if os.name == "nt":
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _read_counter(fd: int):
+    os.lseek(fd, 0, os.SEEK_SET)
+    raw = os.read(fd, 64).decode("ascii", errors="ignore").strip()
+    try:
+        return int(raw)
+    except ValueError:
+        return None
+
+
+def _write_counter(fd: int, value: int) -> None:
+    data = f"{value}\n".encode("ascii")
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.write(fd, data)
+    os.ftruncate(fd, len(data))
+    os.fsync(fd)
+
+
+def next_participant_id(csv_path: str) -> int:
+    """Allocate and return the next participant ID for this results CSV."""
+    path = counter_path(csv_path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with _thread_lock:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            _lock(fd)
+            try:
+                next_id = _read_counter(fd)
+                if next_id is None:
+                    # First use (or unreadable counter): seed from the CSV once.
+                    next_id = _max_id_in_csv(csv_path) + 1
+                _write_counter(fd, next_id + 1)
+                return next_id
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
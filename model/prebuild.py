@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Optional
+
+from model import datasets as ds
+from model.datasets import DatasetHandle
+
+
+# -----------------------------
+# Background dataset prebuild
+# After an upload the parse + aggregate work runs on a daemon thread, keyed by the
+# content fingerprint, so the Streamlit script thread never blocks on it. The
+# result lands in the on-disk sidecars; the script's cached loaders then read
+# those instead of re-parsing the CSV.
+# -----------------------------
+class PrebuildJob:
+    def __init__(self, handle: DatasetHandle):
+        self.handle = handle
+        self.progress = 0.0
+        self.message = "Queued"
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def update(self, fraction: float, message: str) -> None:
+        with self._lock:
+            self.progress = max(self.progress, min(float(fraction), 1.0))
+            self.message = message
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "progress": self.progress,
+                "message": self.message,
+                "error": self.error,
+                "done": self.done,
+                "elapsed": (self.finished_at or time.time()) - self.started_at,
+            }
+
+    def _run(self) -> None:
+        try:
+            ds.build_dataset_cube(self.handle, progress=self.update)
+        except Exception as e:
+            with self._lock:
+                self.error = f"{type(e).__name__}: {e}"
+                self.message = "Failed"
+        finally:
+            self.finished_at = time.time()
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_prebuild(handle: DatasetHandle) -> PrebuildJob:
+    """Start (or return the already running/finished) prebuild for this content fingerprint."""
+    with _jobs_lock:
+        job = _jobs.get(handle.fingerprint)
+        if job is not None and job.error is None:
+            return job
+        job = PrebuildJob(handle)
+        _jobs[handle.fingerprint] = job
+
+    threading.Thread(target=job._run, name=f"dataset-prebuild-{handle.fingerprint[:8]}", daemon=True).start()
+    return job
+
+
+def get_job(fingerprint: str) -> Optional[PrebuildJob]:
+    with _jobs_lock:
+        return _jobs.get(fingerprint)
@@ -0,0 +1,150 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:  # optional: low-overhead sampling profiler with speedscope export
+    import pyinstrument
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pragma: no cover - depends on the environment
+    pyinstrument = None
+
+
+# -----------------------------
+# On-demand CPU profiling of single reruns
+# profile() wraps one rerun in pyinstrument (sampling; written as speedscope
+# JSON) when it is installed, otherwise in cProfile (written as .prof for
+# pstats/snakeviz). Each profile gets a .json sidecar with the session and
+# interaction metadata, and a top-N hotspot summary is kept in memory for the
+# debug panel. One profile runs at a time per process (the deterministic
+# profiler is process-wide on recent Pythons); reruns that find it busy simply
+# are not profiled. TREEMAP_PROFILE=K profiles the next K reruns of any session.
+# -----------------------------
+PROFILES_FOLDER = "profiles"
+TOP_N = 15
+
+_busy = threading.Lock()
+_summaries = deque(maxlen=50)
+_summaries_lock = threading.Lock()
+
+_env_lock = threading.Lock()
+try:
+    _env_remaining = max(int(os.environ.get("TREEMAP_PROFILE", "0") or 0), 0)
+except ValueError:
+    _env_remaining = 0
+
+
+def profiler_name() -> str:
+    return "pyinstrument" if pyinstrument is not None else "cProfile"
+
+
+def env_pending() -> bool:
+    return _env_remaining > 0
+
+
+def take_env_slot() -> bool:
+    """Consume one of the TREEMAP_PROFILE reruns, if any are left."""
+    global _env_remaining
+    with _env_lock:
+        if _env_remaining <= 0:
+            return False
+        _env_remaining -= 1
+        return True
+
+
+@contextmanager
+def profile(out_dir: str, meta: dict):
+    """Profile the block; yields False (and does nothing) if another profile is running."""
+    if not _busy.acquire(blocking=False):
+        yield False
+        return
+    try:
+        profiler = _start()
+        started_at, t0 = time.time(), time.perf_counter()
+        try:
+            yield True
+        finally:
+            duration = time.perf_counter() - t0
+            _stop_and_save(profiler, out_dir, dict(meta, started_at=started_at, duration_s=round(duration, 6)))
+    finally:
+        _busy.release()
+
+
+def _start():
+    if pyinstrument is not None:
+        p = pyinstrument.Profiler(interval=0.001, async_mode="disabled")
+        p.start()
+    else:
+        p = cProfile.Profile()
+        p.enable()
+    return p
+
+
+def _stop_and_save(profiler, out_dir: str, meta: dict) -> None:
+    os.makedirs(out_dir, exist_ok=True)
+    started_at = meta["started_at"]
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started_at)) + f".{int(started_at * 1000) % 1000:03d}"
+    session = "".join(c for c in str(meta.get("session") or "nosession") if c.isalnum())[:8]
+    base = os.path.join(out_dir, f"{stamp}_{session}_{meta.get('kind', 'rerun')}")
+
+    if pyinstrument is not None:
+        profiler.stop()
+        path = base + ".speedscope.json"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.output(SpeedscopeRenderer()))
+        hotspots = _pyinstrument_hotspots(profiler.last_session)
+    else:
+        profiler.disable()
+        path = base + ".prof"
+        profiler.dump_stats(path)
+        hotspots = _pstats_hotspots(profiler)
+
+    meta = dict(meta, profiler=profiler_name(), file=path, hotspots=hotspots)
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, default=str)
+    with _summaries_lock:
+        _summaries.append(meta)
+
+
+def _where(file_name: str, line: int, func: str) -> str:
+    return f"{func} ({os.path.basename(file_name)}:{line})" if line else func
+
+
+def _pstats_hotspots(profiler) -> list:
+    stats = pstats.Stats(profiler).stats  # (file, line, func) -> (cc, ncalls, self, cumulative, callers)
+    rows = [
+        {"function": _where(*key), "calls": nc, "self_ms": tt * 1000, "total_ms": ct * 1000}
+        for key, (cc, nc, tt, ct, callers) in stats.items()
+    ]
+    rows.sort(key=lambda r: r["self_ms"], reverse=True)
+    return [dict(r, self_ms=round(r["self_ms"], 3), total_ms=round(r["total_ms"], 3)) for r in rows[:TOP_N]]
+
+
+def _pyinstrument_hotspots(session) -> list:
+    totals = {}
+    stack = [session.root_frame()] if session and session.root_frame() else []
+    while stack:
+        frame = stack.pop()
+        key = _where(frame.file_path or "", frame.line_no or 0, frame.function or "?")
+        calls, self_s, total_s = totals.get(key, (0, 0.0, 0.0))
+        totals[key] = (calls + 1, self_s + frame.total_self_time, max(total_s, frame.time))
+        stack.extend(frame.children)
+    rows = [
+        {"function": k, "calls": c, "self_ms": round(s * 1000, 3), "total_ms": round(t * 1000, 3)}
+        for k, (c, s, t) in totals.items()
+    ]
+    rows.sort(key=lambda r: r["self_ms"], reverse=True)
+    return rows[:TOP_N]
+
+
+def recent(session_id: str = None, limit: int = 5) -> list:
+    """Latest profile summaries, newest first (optionally only one session's)."""
+    with _summaries_lock:
+        items = list(_summaries)
+    if session_id is not None:
+        items = [m for m in items if m.get("session") == session_id]
+    return items[::-1][:limit]
@@ -0,0 +1,291 @@
+import csv
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import List, Optional
+
+
+# -----------------------------
+# SQLite results store (WAL)
+# One row per trial, in one database shared by every chart type. WAL mode lets
+# many sessions/processes write concurrently (writers queue on busy_timeout)
+# while readers never block. The wide per-chart CSV/XLSX files are no longer
+# appended to directly: they are regenerated from the store on demand
+# (export_wide_csv), in the same layout as before.
+# -----------------------------
+DB_FILE_NAME = "results.sqlite3"
+BUSY_TIMEOUT_MS = 30_000
+
+# Per-trial latency breakdown (see view.choice_buttons_component.trial_timing).
+# In the wide layout these come AFTER the Time/Errors columns so older rows stay aligned.
+TIMING_FIELDS = [
+    ("client_rt", "Client RT"),
+    ("server_render", "Server Render"),
+    ("to_browser", "To Browser"),
+    ("click_to_server", "Click To Server"),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    chart_type      TEXT    NOT NULL,
+    participant_id  INTEGER NOT NULL,
+    finished_at     REAL,
+    source          TEXT    NOT NULL DEFAULT 'app',
+    PRIMARY KEY (chart_type, participant_id)
+);
+
+CREATE TABLE IF NOT EXISTS trials (
+    chart_type       TEXT    NOT NULL,
+    participant_id   INTEGER NOT NULL,
+    question_index   INTEGER NOT NULL,
+    chosen_option    INTEGER,
+    correct          INTEGER NOT NULL,
+    elapsed          REAL,
+    client_rt        REAL,
+    server_render    REAL,
+    to_browser       REAL,
+    click_to_server  REAL,
+    shown_at         REAL,
+    answered_at      REAL,
+    PRIMARY KEY (chart_type, participant_id, question_index)
+);
+
+CREATE INDEX IF NOT EXISTS trials_by_question ON trials (chart_type, question_index);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  TEXT
+);
+"""
+
+
+def db_path(results_dir: str) -> str:
+    return os.path.join(results_dir, DB_FILE_NAME)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """New connection (one per call/thread); creates the schema on first use."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = FULL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# -----------------------------
+# Writes
+# -----------------------------
+def trial_rows(
+    trial_times: List[Optional[float]],
+    trial_errors: List[int],
+    chosen_options: Optional[List[int]] = None,
+    trial_timings: Optional[List[Optional[dict]]] = None,
+    trial_stamps: Optional[List[tuple]] = None,
+) -> List[dict]:
+    """Per-trial dicts from the quiz's parallel session lists."""
+    rows = []
+    for i, (t, e) in enumerate(zip(trial_times, trial_errors)):
+        timing = (trial_timings[i] if trial_timings and i < len(trial_timings) else None) or {}
+        shown_at, answered_at = (trial_stamps[i] if trial_stamps and i < len(trial_stamps) else (None, None))
+        row = {
+            "question_index": i,
+            "chosen_option": chosen_options[i] if chosen_options and i < len(chosen_options) else None,
+            "correct": 0 if int(e) else 1,
+            "elapsed": None if t is None else float(t),
+            "shown_at": shown_at,
+            "answered_at": answered_at,
+        }
+        for field, _ in TIMING_FIELDS:
+            row[field] = timing.get(field)
+        rows.append(row)
+    return rows
+
+
+def _insert_participant(conn, chart_type: str, participant_id: int, trials: List[dict], source: str, finished_at) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO participants (chart_type, participant_id, finished_at, source) VALUES (?, ?, ?, ?)",
+        (chart_type, int(participant_id), finished_at, source),
+    )
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO trials (
+            chart_type, participant_id, question_index, chosen_option, correct, elapsed,
+            client_rt, server_render, to_browser, click_to_server, shown_at, answered_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                chart_type, int(participant_id), t["question_index"], t.get("chosen_option"), int(t["correct"]),
+                t.get("elapsed"), t.get("client_rt"), t.get("server_render"), t.get("to_browser"),
+                t.get("click_to_server"), t.get("shown_at"), t.get("answered_at"),
+            )
+            for t in trials
+        ],
+    )
+
+
+def record_participant(path: str, chart_type: str, participant_id: int, trials: List[dict]) -> None:
+    """Store one finished participant (all trials) in a single transaction."""
+    record_participants(path, [(chart_type, participant_id, trials, time.time())])
+
+
+def record_participants(path: str, participants: list) -> None:
+    """Store a batch of (chart_type, participant_id, trials, finished_at) in ONE transaction."""
+    with closing(connect(path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for chart_type, participant_id, trials, finished_at in participants:
+                _insert_participant(conn, chart_type, participant_id, trials, "app", finished_at)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def migrate_csv_once(path: str, chart_type: str, csv_path: str) -> int:
+    """
+    Import an existing wide results CSV into the store the first time this chart
+    type is used (chosen options were never recorded there, so they stay NULL).
+    Returns the number of participants imported.
+    """
+    key = f"migrated:{chart_type}"
+    with closing(connect(path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                conn.execute("COMMIT")
+                return 0
+
+            imported = 0
+            if os.path.exists(csv_path):
+                with open(csv_path, "r", encoding="utf-8", newline="") as f:
+                    r = csv.reader(f)
+                    header = next(r, [])
+                    n_trials = sum(1 for c in header if c.endswith(" Errors"))
+                    for row in r:
+                        try:
+                            participant_id = int(row[0])
+                        except (IndexError, ValueError):
+                            continue
+                        trials = _trials_from_wide_row(row, n_trials)
+                        exists = conn.execute(
+                            "SELECT 1 FROM participants WHERE chart_type = ? AND participant_id = ?",
+                            (chart_type, participant_id),
+                        ).fetchone()
+                        if exists:
+                            continue
+                        _insert_participant(conn, chart_type, participant_id, trials, "csv", None)
+                        imported += 1
+
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+            conn.execute("COMMIT")
+            return imported
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _float_or_none(v):
+    try:
+        return float(v) if v not in ("", None) else None
+    except ValueError:
+        return None
+
+
+def _trials_from_wide_row(row: list, n_trials: int) -> List[dict]:
+    trials = []
+    timing_start = 1 + 2 * n_trials
+    for i in range(n_trials):
+        if 2 + 2 * i >= len(row):
+            break
+        t = row[1 + 2 * i]
+        errors = _float_or_none(row[2 + 2 * i])
+        trial = {
+            "question_index": i,
+            "chosen_option": None,
+            "correct": 0 if errors else 1,
+            "elapsed": _float_or_none(t),
+        }
+        for k, (field, _) in enumerate(TIMING_FIELDS):
+            pos = timing_start + i * len(TIMING_FIELDS) + k
+            trial[field] = _float_or_none(row[pos]) if pos < len(row) else None
+        trials.append(trial)
+    return trials
+
+
+# -----------------------------
+# Wide CSV layout (one row per participant), generated from the store
+# -----------------------------
+def wide_headers(total_trials: int) -> List[str]:
+    cols = ["Participant ID"]
+    for i in range(1, total_trials + 1):
+        cols.append(f"Trial {i} Time")
+        cols.append(f"Trial {i} Errors")
+    for i in range(1, total_trials + 1):
+        for _, label in TIMING_FIELDS:
+            cols.append(f"Trial {i} {label}")
+    return cols
+
+
+def wide_row(
+    participant_id: int,
+    trial_times: List[Optional[float]],
+    trial_errors: List[int],
+    trial_timings: Optional[List[Optional[dict]]] = None,
+) -> list:
+    row = [participant_id]
+    for t, e in zip(trial_times, trial_errors):
+        row.append("" if t is None else float(t))
+        row.append(int(e))
+
+    # Timing columns only when this participant has any (older/fallback runs stay short).
+    if trial_timings and any(trial_timings):
+        for timing in trial_timings:
+            for field, _ in TIMING_FIELDS:
+                v = (timing or {}).get(field)
+                row.append("" if v is None else float(v))
+    return row
+
+
+def export_wide_csv(path: str, chart_type: str, csv_path: str, total_trials: int) -> str:
+    """Regenerate the per-chart wide CSV from the store (atomic replace)."""
+    timing_cols = ", ".join(field for field, _ in TIMING_FIELDS)
+    with closing(connect(path)) as conn:
+        cur = conn.execute(
+            f"""
+            SELECT t.participant_id, t.question_index, t.elapsed, 1 - t.correct, {timing_cols}
+            FROM trials t
+            JOIN participants p USING (chart_type, participant_id)
+            WHERE t.chart_type = ?
+            ORDER BY t.participant_id, t.question_index
+            """,
+            (chart_type,),
+        )
+        records = cur.fetchall()
+
+    tmp_path = csv_path + ".tmp"
+    os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(wide_headers(total_trials))
+
+        def flush(pid, times, errors, timings):
+            if pid is not None:
+                w.writerow(wide_row(pid, times, errors, timings))
+
+        current, times, errors, timings = None, [], [], []
+        for pid, _, elapsed, error, *timing_values in records:
+            if pid != current:
+                flush(current, times, errors, timings)
+                current, times, errors, timings = pid, [], [], []
+            times.append(elapsed)
+            errors.append(error)
+            timing = dict(zip((field for field, _ in TIMING_FIELDS), timing_values))
+            timings.append(timing if any(v is not None for v in timing_values) else None)
+        flush(current, times, errors, timings)
+
+    os.replace(tmp_path, csv_path)
+    return csv_path
@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from model import results_store, xlsx_export
+
+
+# -----------------------------
+# Asynchronous, durable results writer
+# submit() appends the participant to a JSONL journal beside the results
+# database and fsyncs it: once it returns, the row survives a crash. A single
+# writer thread drains the journal into SQLite in batches (one transaction per
+# database for everything queued, from every session), then rewrites the
+# journal without the committed entries and queues the CSV/XLSX export.
+# Entries left in a journal by a crash are replayed by recover() (writes are
+# idempotent: INSERT OR REPLACE on the trial key). A database whose commit
+# fails is retried with exponential backoff; its entries stay journaled.
+# Assumes one app process writes a given results database (the packaged app).
+# -----------------------------
+BATCH_LINGER_SECONDS = 0.2
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+
+def journal_path(db_path: str) -> str:
+    return db_path + ".journal.jsonl"
+
+
+def _fsync_dir(path: str) -> None:
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _ResultsWriter:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = {}      # db_path -> [entry, ...] (journaled, not yet committed)
+        self._recovered = set()
+        self._failures = {}     # db_path -> consecutive failed commits
+        self._retry_at = {}     # db_path -> time.time() before which it is not retried
+        self._busy = False
+        self._thread = None
+        self.last_error = None
+
+    # ---- journal ----
+    def _rewrite_journal(self, db_path: str) -> None:
+        path = journal_path(db_path)
+        entries = self._pending.get(db_path, [])
+        if not entries:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_dir(path)
+
+    def _recover_locked(self, db_path: str) -> int:
+        if db_path in self._recovered:
+            return 0
+        self._recovered.add(db_path)
+
+        path = journal_path(db_path)
+        if not os.path.exists(path):
+            return 0
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Torn tail from a crash mid-append: that submit never returned.
+                    continue
+        self._pending.setdefault(db_path, []).extend(entries)
+        return len(entries)
+
+    # ---- API ----
+    def recover(self, db_path: str) -> int:
+        db_path = os.path.abspath(db_path)
+        with self._cond:
+            n = self._recover_locked(db_path)
+            if n:
+                self._start_locked()
+                self._cond.notify()
+            return n
+
+    def submit(self, db_path: str, entry: dict) -> str:
+        db_path = os.path.abspath(db_path)
+        entry = dict(entry, entry_id=str(uuid.uuid4()), submitted_at=time.time())
+        line = json.dumps(entry) + "\n"
+
+        with self._cond:
+            self._recover_locked(db_path)
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            with open(journal_path(db_path), "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.setdefault(db_path, []).append(entry)
+            self._start_locked()
+            self._cond.notify()
+        return entry["entry_id"]
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until everything journaled so far is committed (or timeout)."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._busy or any(self._pending.values()):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 1.0)
+        return True
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return sum(len(v) for v in self._pending.values())
+
+    # ---- worker ----
+    def _start_locked(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="results-writer", daemon=True)
+            self._thread.start()
+
+    def _due_locked(self):
+        """(databases ready to commit, seconds until the next one is) — backoff aware."""
+        now = time.time()
+        waiting = [db for db, entries in self._pending.items() if entries]
+        due = [db for db in waiting if self._retry_at.get(db, 0.0) <= now]
+        if due or not waiting:
+            return due, None
+        return due, max(min(self._retry_at[db] for db in waiting) - now, 0.0)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                due, wait = self._due_locked()
+                while not due:
+                    self._cond.wait(wait)
+                    due, wait = self._due_locked()
+                self._busy = True
+
+            try:
+                # Let a burst of completions land in the same transaction.
+                time.sleep(BATCH_LINGER_SECONDS)
+
+                with self._cond:
+                    batches = {db: list(self._pending[db]) for db in due if self._pending.get(db)}
+
+                for db_path, entries in batches.items():
+                    self._commit(db_path, entries)
+            except Exception as e:
+                # Never let the worker die: whatever is still pending stays journaled.
+                self.last_error = f"{type(e).__name__}: {e}"
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _commit(self, db_path: str, entries: list) -> None:
+        try:
+            results_store.record_participants(
+                db_path,
+                [(e["chart_type"], e["participant_id"], e["trials"], e.get("finished_at")) for e in entries],
+            )
+        except Exception as e:
+            # Keep them journaled; retry this database later, backing off.
+            self.last_error = f"{type(e).__name__}: {e}"
+            with self._cond:
+                n = self._failures[db_path] = self._failures.get(db_path, 0) + 1
+                delay = min(RETRY_BASE_SECONDS * 2 ** (n - 1), RETRY_MAX_SECONDS)
+                self._retry_at[db_path] = time.time() + delay
+            return
+
+        done = {e["entry_id"] for e in entries}
+        with self._cond:
+            self._failures.pop(db_path, None)
+            self._retry_at.pop(db_path, None)
+            self._pending[db_path] = [e for e in self._pending[db_path] if e["entry_id"] not in done]
+            # If this raises, the journal still lists committed entries; replaying
+            # them is harmless (idempotent writes).
+            self._rewrite_journal(db_path)
+
+        self._queue_exports(db_path, entries)
+
+    @staticmethod
+    def _queue_exports(db_path: str, entries: list) -> None:
+        seen = set()
+        for e in entries:
+            csv_path = e.get("csv_path")
+            if not csv_path or csv_path in seen:
+                continue
+            seen.add(csv_path)
+            chart_type, total_trials = e["chart_type"], int(e.get("total_trials") or len(e["trials"]))
+            xlsx_export.request_export(
+                csv_path,
+                refresh=lambda c=chart_type, p=csv_path, n=total_trials: results_store.export_wide_csv(db_path, c, p, n),
+            )
+
+
+_writer = _ResultsWriter()
+
+
+def submit_participant(
+    db_path: str,
+    chart_type: str,
+    participant_id: int,
+    trials: list,
+    csv_path: str = None,
+    total_trials: int = None,
+) -> str:
+    """Durably queue one finished participant; returns once the journal is fsynced."""
+    return _writer.submit(
+        db_path,
+        {
+            "chart_type": chart_type,
+            "participant_id": int(participant_id),
+            "trials": trials,
+            "finished_at": time.time(),
+            "csv_path": csv_path,
+            "total_trials": total_trials,
+        },
+    )
+
+
+def recover(db_path: str) -> int:
+    """Replay entries a previous process journaled but never committed."""
+    return _writer.recover(db_path)
+
+
+def flush_all(timeout: float = 30.0) -> bool:
+    """Shutdown hook: commit everything journaled, then give the exports a moment."""
+    ok = _writer.flush(timeout)
+    xlsx_export.wait_idle(timeout=5.0)
+    return ok
+
+
+def pending_count() -> int:
+    return _writer.pending_count()
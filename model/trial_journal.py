@@ -0,0 +1,92 @@
+import json
+import os
+import time
+from typing import Optional
+
+
+# -----------------------------
+# Per-participant trial journal (write-ahead)
+# Each run gets a small JSONL file under results/runs/. The first line holds
+# the run metadata; every answered trial is appended as it happens (one
+# write + flush, no fsync: a browser refresh, dropped websocket or app crash
+# cannot lose it, only an OS crash can). If the participant's page reloads
+# mid-run, the quiz rebuilds its state from the file and continues at the next
+# unanswered question. The file is removed once the run has been handed to the
+# results writer.
+# -----------------------------
+RUNS_FOLDER = "runs"
+CHART_TYPES = ("heatmap", "treemap")
+
+
+def run_path(results_dir: str, chart_type: str, participant_id: int) -> str:
+    """
+    Journal file of one run. The parts may come from the URL, so anything but a
+    known chart type and a positive participant id raises ValueError, and so
+    does a path that would resolve outside <results_dir>/runs.
+    """
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"unknown chart type: {chart_type!r}")
+    if isinstance(participant_id, bool) or not isinstance(participant_id, int) or participant_id <= 0:
+        raise ValueError(f"invalid participant id: {participant_id!r}")
+
+    runs_dir = os.path.realpath(os.path.join(results_dir, RUNS_FOLDER))
+    path = os.path.realpath(os.path.join(runs_dir, f"{chart_type}_p{participant_id}.jsonl"))
+    if os.path.dirname(path) != runs_dir:
+        raise ValueError(f"run journal outside {runs_dir}: {path}")
+    return path
+
+
+def _append(path: str, record: dict, fsync: bool = False) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
+
+def start_run(path: str, meta: dict) -> None:
+    """(Re)start a run: truncate and write the metadata line."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(dict(meta, type="start", started_at=time.time())) + "\n")
+        f.flush()
+
+
+def record_phase(path: str, phase: str) -> None:
+    _append(path, {"type": "phase", "phase": phase})
+
+
+def record_trial(path: str, trial: dict, fsync: bool = False) -> None:
+    _append(path, dict(trial, type="trial"), fsync=fsync)
+
+
+def load_run(path: str) -> Optional[dict]:
+    """{"meta", "phase", "trials"} for an unfinished run, or None."""
+    if not path or not os.path.exists(path):
+        return None
+
+    meta, phase, trials = None, None, []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn last line
+            kind = rec.pop("type", None)
+            if kind == "start":
+                meta, phase, trials = rec, None, []
+            elif kind == "phase":
+                phase = rec.get("phase")
+            elif kind == "trial":
+                trials.append(rec)
+
+    if meta is None:
+        return None
+    return {"meta": meta, "phase": phase, "trials": trials}
+
+
+def finish_run(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,142 @@
+import csv
+import os
+import threading
+import time
+
+from model.file_locks import is_file_locked
+
+
+# -----------------------------
+# Background XLSX export
+# Completing a participant only *requests* an export (optionally with a
+# `refresh` callable that first regenerates the CSV itself, e.g. from the
+# results store). A single daemon worker
+# coalesces requests (several completions -> one workbook write per CSV),
+# streams the CSV into an openpyxl write-only workbook (rows are never held as
+# cells in memory), swaps it in atomically, and keeps retrying while the target
+# is open/locked (e.g. in Excel) until it can be written.
+# -----------------------------
+COALESCE_SECONDS = 0.5
+RETRY_SECONDS = 5.0
+
+
+def xlsx_path_for(csv_path: str) -> str:
+    base, _ = os.path.splitext(csv_path)
+    return base + ".xlsx"
+
+
+def write_xlsx_from_csv(csv_path: str, xlsx_path: str = None) -> str:
+    """Stream the CSV into a fresh write-only workbook and atomically replace the XLSX."""
+    from openpyxl import Workbook
+
+    xlsx_path = xlsx_path or xlsx_path_for(csv_path)
+    tmp_path = xlsx_path + ".tmp"
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Results")
+
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            ws.append(row)
+
+    wb.save(tmp_path)
+    wb.close()
+
+    os.replace(tmp_path, xlsx_path)
+    return xlsx_path
+
+
+class _ExportWorker:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = {}   # csv_path -> earliest time to try
+        self._status = {}    # csv_path -> dict(state, updated_at, error)
+        self._refresh = {}   # csv_path -> callable regenerating the CSV before the XLSX
+        self._thread = None
+
+    def request(self, csv_path: str, refresh=None) -> None:
+        csv_path = os.path.abspath(csv_path)
+        with self._cond:
+            if refresh is not None:
+                self._refresh[csv_path] = refresh
+            due = time.time() + COALESCE_SECONDS
+            self._pending[csv_path] = min(self._pending.get(csv_path, due), due)
+            self._status[csv_path] = dict(self._status.get(csv_path, {}), state="pending")
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="xlsx-export", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def status(self, csv_path: str) -> dict:
+        with self._cond:
+            return dict(self._status.get(os.path.abspath(csv_path), {"state": "idle"}))
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until nothing is pending (tests / shutdown). Locked files keep it busy."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 1.0)
+        return True
+
+    def _next_due(self):
+        now = time.time()
+        due = [(t, p) for p, t in self._pending.items() if t <= now]
+        if due:
+            return min(due)[1], 0.0
+        return None, (min(self._pending.values()) - now) if self._pending else None
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                csv_path, wait = self._next_due()
+                while csv_path is None:
+                    self._cond.wait(wait)
+                    csv_path, wait = self._next_due()
+                # Claim it: requests arriving during the write schedule one more pass.
+                del self._pending[csv_path]
+
+                refresh = self._refresh.get(csv_path)
+
+            state, error = self._export(csv_path, refresh)
+
+            with self._cond:
+                if state == "locked" and csv_path not in self._pending:
+                    self._pending[csv_path] = time.time() + RETRY_SECONDS
+                self._status[csv_path] = {"state": state, "updated_at": time.time(), "error": error}
+                self._cond.notify_all()
+
+    @staticmethod
+    def _export(csv_path: str, refresh=None):
+        xlsx_path = xlsx_path_for(csv_path)
+        if is_file_locked(xlsx_path) or (refresh is not None and is_file_locked(csv_path)):
+            return "locked", None
+        try:
+            if refresh is not None:
+                refresh()
+            write_xlsx_from_csv(csv_path, xlsx_path)
+            return "ok", None
+        except PermissionError:
+            return "locked", None
+        except Exception as e:
+            return "failed", f"{type(e).__name__}: {e}"
+
+
+_worker = _ExportWorker()
+
+
+def request_export(csv_path: str, refresh=None) -> None:
+    """Queue a (coalesced) XLSX rebuild for this CSV; returns immediately."""
+    _worker.request(csv_path, refresh)
+
+
+def export_status(csv_path: str) -> dict:
+    """{"state": idle|pending|ok|locked|failed, ...} for this CSV's XLSX."""
+    return _worker.status(csv_path)
+
+
+def wait_idle(timeout: float = None) -> bool:
+    return _worker.wait_idle(timeout)
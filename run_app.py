@@ -1,3 +1,4 @@
+import atexit
 import os
 import sys
 import threading
@@ -16,9 +17,17 @@ def open_browser():
     webbrowser.open("http://localhost:8501")
 
 
+def flush_results_on_exit():
+    """Commit journaled participant results before the process exits (if the app loaded the writer)."""
+    writer = sys.modules.get("model.results_writer")
+    if writer is not None:
+        writer.flush_all(timeout=30.0)
+
+
 if __name__ == "__main__":
 
     threading.Timer(1.5, open_browser).start()
+    atexit.register(flush_results_on_exit)
 
     main_script = resource_path("main.py")
 
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from model import analytics, results_store
+
+TRIALS = 4
+
+
+def _trials(elapsed: float, client_rt=None) -> list:
+    timings = [None if client_rt is None else {"client_rt": client_rt}] * TRIALS
+    return results_store.trial_rows([elapsed] * TRIALS, [0] * TRIALS, trial_timings=timings)
+
+
+def test_fetch_since_returns_only_new_rowids(tmp_path):
+    db_path = results_store.db_path(str(tmp_path))
+    results_store.record_participant(db_path, "heatmap", 1, _trials(2.0))
+
+    max_rowid, first, _ = analytics._fetch_since(db_path, 0)
+    assert len(first) == TRIALS
+
+    assert analytics._fetch_since(db_path, max_rowid) == (max_rowid, None, set())
+
+    results_store.record_participant(db_path, "treemap", 1, _trials(3.0))
+    newer_rowid, new, _ = analytics._fetch_since(db_path, max_rowid)
+    assert newer_rowid > max_rowid
+    assert len(new) == TRIALS
+    assert set(new["chart_type"]) == {"treemap"}
+
+
+def test_refresh_merges_new_and_replaced_trials(tmp_path):
+    db_path = results_store.db_path(str(tmp_path))
+    results_store.record_participant(db_path, "heatmap", 1, _trials(2.0))
+    results_store.record_participant(db_path, "heatmap", 2, _trials(4.0))
+
+    entry = analytics._refresh_db(db_path)
+    assert len(entry["trials"]) == 2 * TRIALS
+    assert analytics._refresh_db(db_path) is entry  # unchanged files: no query
+
+    # A replaced participant (INSERT OR REPLACE -> new rowids) plus a new one.
+    results_store.record_participant(db_path, "heatmap", 1, _trials(1.0, client_rt=0.8))
+    results_store.record_participant(db_path, "heatmap", 3, _trials(5.0))
+    refreshed = analytics._refresh_db(db_path)
+
+    trials = refreshed["trials"]
+    assert len(trials) == 3 * TRIALS
+    assert refreshed["max_rowid"] > entry["max_rowid"]
+    by_pid = trials.groupby("participant_id")["elapsed"].mean()
+    assert by_pid.to_dict() == {1: 1.0, 2: 4.0, 3: 5.0}
+    assert trials.loc[trials["participant_id"] == 1, "client_rt"].tolist() == [0.8] * TRIALS
+
+
+def test_summary_compares_charts_on_server_time(tmp_path):
+    results_dir = str(tmp_path)
+    db_path = results_store.db_path(results_dir)
+    for pid, (elapsed, client_rt) in enumerate([(2.0, 1.0), (2.5, 1.5), (3.0, None)], start=1):
+        results_store.record_participant(db_path, "heatmap", pid, _trials(elapsed, client_rt))
+    for pid, elapsed in enumerate([4.0, 4.5], start=1):
+        results_store.record_participant(db_path, "treemap", pid, _trials(elapsed))
+
+    summary = analytics.summarize(results_dir)
+
+    assert summary["time_test"]["n"] == (3, 2)
+    assert summary["client_rt_test"]["n"] == (2, 0)
+    per_chart = summary["per_chart"].set_index("chart_type")
+    assert per_chart.loc["heatmap", "participants_client_rt"] == 2
+    assert per_chart.loc["heatmap", "mean"] == 2.5
+    assert pd.isna(per_chart.loc["treemap", "mean_client_rt"])
+    assert analytics.summarize(results_dir) is summary  # memoized until the results change
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.bounded_cache import bounded_cache
+
+
+def _matrix_builder():
+    calls = []
+
+    @bounded_cache(max_entries=4)
+    def build(key):
+        calls.append(key)
+        return pd.DataFrame(
+            {"1999": [50.0, 60.0], "2000": [55.0, np.nan]},
+            index=pd.Index(["pop", "rock"], name="genre"),
+        )
+
+    return build, calls
+
+
+def test_mutating_a_returned_frame_does_not_corrupt_other_hits():
+    build, calls = _matrix_builder()
+    expected = build("k").copy(deep=True)
+
+    # One session scribbles over its result in every way pandas allows...
+    mine = build("k")
+    mine.iloc[0, 0] = -1.0
+    mine.loc["rock", "2000"] = -2.0
+    mine["2001"] = 0.0
+    mine.fillna(0, inplace=True)
+    mine.sort_values("1999", ascending=False, inplace=True)
+    mine.rename(columns={"1999": "x"}, inplace=True)
+    mine.index.name = "changed"
+
+    # ...another session's hit is still the original value.
+    theirs = build("k")
+    pd.testing.assert_frame_equal(theirs, expected)
+    assert theirs is not mine
+    assert calls == ["k"]
+
+
+def test_cached_frame_data_is_read_only():
+    build, _ = _matrix_builder()
+    build("k")
+
+    (stored, _), = build.cache._entries.values()
+    assert not stored.to_numpy().flags.writeable
+    assert all(not b.values.flags.writeable for b in stored._mgr.blocks)
+
+
+def test_cached_arrays_are_read_only():
+    @bounded_cache(max_entries=4)
+    def build(key):
+        return {"sums": np.arange(3.0)}
+
+    value = build("k")
+    with pytest.raises(ValueError):
+        value["sums"][0] = 1.0
+    assert build("k")["sums"].tolist() == [0.0, 1.0, 2.0]
@@ -0,0 +1,65 @@
+import json
+import threading
+
+from controller import prefetch
+from model import datasets as ds
+from view import heatmap, treemap
+
+
+def _write_csv(tmp_path) -> str:
+    path = tmp_path / "songs.csv"
+    path.write_text(
+        "artist,song,year,popularity,genre\n"
+        'a,s1,2000,50,pop\nb,s2,2001,60,"pop, rock"\nc,s3,2001,40,rock\nd,s4,2002,70,hip hop\n',
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def _as_json(fig):
+    return json.loads(fig.to_json())
+
+
+def test_restyled_treemap_matches_a_full_build(tmp_path):
+    handle = ds.open_dataset(_write_csv(tmp_path))
+    typography = (22, 12, "Courier New, monospace")
+
+    restyled = treemap.build_treemap_chart(handle, 2000, 2002, (), *typography)
+    nodes = treemap.build_treemap_nodes(handle, 2000, 2002, ())
+    assert _as_json(restyled) == _as_json(treemap.build_treemap_figure(nodes, *typography))
+
+
+def test_cached_figures_are_handed_out_as_copies(tmp_path):
+    handle = ds.open_dataset(_write_csv(tmp_path))
+    for build in (heatmap.build_heatmap_chart, treemap.build_treemap_chart):
+        first = build(handle, 2000, 2002, ("pop",), *treemap.DEFAULT_TYPOGRAPHY)
+        expected = _as_json(first)
+        first.update_layout(title="mutated by a caller")
+
+        second = build(handle, 2000, 2002, ("pop",), *treemap.DEFAULT_TYPOGRAPHY)
+        assert second is not first
+        assert _as_json(second) == expected
+
+
+def test_prefetch_is_queued_once_per_dataset(tmp_path, monkeypatch):
+    handle = ds.open_dataset(_write_csv(tmp_path))
+    submitted = []
+    monkeypatch.setattr(prefetch, "_prefetch_plan", lambda dataset: [])
+    monkeypatch.setattr(prefetch, "_submit", lambda dataset, plan: submitted.append(dataset))
+
+    barrier = threading.Barrier(8)
+
+    def session():
+        barrier.wait()
+        prefetch.warm_question_charts(handle)
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert submitted == [handle]
+
+    ds.invalidate_caches()
+    prefetch.warm_question_charts(handle)
+    assert submitted == [handle, handle]
@@ -0,0 +1,24 @@
+import pytest
+
+from view import choice_buttons_component as cbc
+
+
+def test_trial_timing_breakdown():
+    payload = {"client_rt_ms": 1500.0, "server_sent_ts": 100.2, "shown_epoch_ms": 100_400.0, "clicked_epoch_ms": 101_900.0}
+
+    timing = cbc.trial_timing(payload, question_start_ts=100.0, received_ts=102.0)
+
+    assert timing["client_rt"] == pytest.approx(1.5)
+    assert timing["server_render"] == pytest.approx(0.2)
+    assert timing["to_browser"] == pytest.approx(0.2)
+    assert timing["click_to_server"] == pytest.approx(0.1)
+
+
+def test_click_before_visibility_stamp_has_no_client_rt():
+    payload = {"client_rt_ms": None, "server_sent_ts": 100.2, "shown_epoch_ms": None, "clicked_epoch_ms": 101_900.0}
+
+    timing = cbc.trial_timing(payload, question_start_ts=100.0, received_ts=102.0)
+
+    assert timing["client_rt"] is None
+    assert timing["to_browser"] is None
+    assert timing["click_to_server"] == pytest.approx(0.1)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from model import datasets as ds
+
+
+def _write_fractional_csv(tmp_path, n_rows: int = 20_000) -> str:
+    rng = np.random.default_rng(0)
+    genres = np.array(["pop", "rock", "hip hop", "pop, rock"])
+    df = pd.DataFrame({
+        "artist": [f"a{i}" for i in range(n_rows)],
+        "song": [f"s{i}" for i in range(n_rows)],
+        "year": rng.integers(1998, 2021, size=n_rows),
+        "popularity": rng.uniform(0, 100, size=n_rows).round(7),
+        "genre": genres[rng.integers(0, len(genres), size=n_rows)],
+    })
+    path = tmp_path / "songs.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def _baseline_means(csv_path: str) -> pd.DataFrame:
+    raw = pd.read_csv(csv_path)
+    raw["genre"] = raw["genre"].str.split(",")
+    raw = raw.explode("genre")
+    raw["genre"] = raw["genre"].str.strip()
+    means = raw.groupby(["genre", "year"])["popularity"].mean().unstack("year")
+    means.columns = [str(c) for c in means.columns]
+    return means
+
+
+def test_fractional_popularity_means_match_float64_baseline(tmp_path):
+    path = _write_fractional_csv(tmp_path)
+    handle = ds.open_dataset(path)
+
+    cube = ds.build_dataset_cube(handle)
+    assert cube.sums.dtype == np.float64
+
+    matrix = cube.mean_matrix(1998, 2020, ())
+    baseline = _baseline_means(path).reindex(index=matrix.index, columns=matrix.columns)
+    np.testing.assert_allclose(matrix.to_numpy(), baseline.to_numpy(), rtol=1e-12)
+
+
+def test_cube_sidecar_keeps_float64_sums(tmp_path):
+    path = _write_fractional_csv(tmp_path, n_rows=500)
+    handle = ds.open_dataset(path)
+
+    built = ds.build_dataset_cube(handle)
+    reloaded = ds.build_dataset_cube(handle)  # from the .cube.npz sidecar
+
+    assert reloaded.sums.dtype == np.float64
+    np.testing.assert_array_equal(reloaded.sums, built.sums)
+    np.testing.assert_array_equal(reloaded.counts, built.counts)
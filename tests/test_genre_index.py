@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from model import datasets as ds
+from model.cube import build_cube, build_cube_from_index
+
+
+def _write_csv(tmp_path, body: str) -> str:
+    path = tmp_path / "songs.csv"
+    path.write_text("artist,song,year,popularity,genre\n" + body, encoding="utf-8")
+    return str(path)
+
+
+def _assert_same_cube(a, b):
+    assert a.genres == b.genres
+    assert a.first_year == b.first_year
+    np.testing.assert_array_equal(a.sums, b.sums)
+    np.testing.assert_array_equal(a.counts, b.counts)
+
+
+def test_empty_genre_row_does_not_crash(tmp_path):
+    path = _write_csv(tmp_path, "a,s1,2000,50,\n")
+
+    index = ds.read_genre_index(ds.open_dataset(path))
+
+    assert index.n_songs == 1
+    assert index.genres == ()
+    assert index.indptr.tolist() == [0, 0]
+    _assert_same_cube(build_cube_from_index(index), build_cube(ds._parse_csv(path)))
+
+
+def test_index_cube_matches_exploded_cube(tmp_path):
+    path = _write_csv(
+        tmp_path,
+        'a,s1,2000,50,\nb,s2,2001,60,"pop, rock"\nc,s3,2001,,pop\nd,s4,2003,70,rock\n',
+    )
+
+    index = ds.read_genre_index(ds.open_dataset(path))
+
+    assert index.indptr.tolist() == [0, 0, 2, 3, 4]
+    _assert_same_cube(build_cube_from_index(index), build_cube(ds._parse_csv(path)))
+
+
+def test_bitmask_is_an_alias_for_csr():
+    # Fresh interpreter: STORAGE_MODE is read once at import
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, TREEMAP_DATASET_STORAGE="bitmask")
+    out = subprocess.run(
+        [sys.executable, "-c", "from model import datasets; print(datasets.STORAGE_MODE)"],
+        cwd=root, env=env, capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.strip() == "csr"
@@ -0,0 +1,55 @@
+import multiprocessing
+import threading
+
+from model import participant_ids
+
+ALLOCATIONS = 40
+
+
+def _allocate_in_process(csv_path: str, out) -> None:
+    out.put([participant_ids.next_participant_id(csv_path) for _ in range(ALLOCATIONS)])
+
+
+def test_two_processes_racing_never_share_an_id(tmp_path):
+    csv_path = str(tmp_path / "performance_heatmap.csv")
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_allocate_in_process, args=(csv_path, out)) for _ in range(2)]
+    for p in procs:
+        p.start()
+    ids = out.get(timeout=60) + out.get(timeout=60)
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+
+    assert sorted(ids) == list(range(1, 2 * ALLOCATIONS + 1))
+
+
+def test_threads_racing_never_share_an_id(tmp_path):
+    csv_path = str(tmp_path / "performance_treemap.csv")
+    ids, lock = [], threading.Lock()
+
+    def allocate():
+        mine = [participant_ids.next_participant_id(csv_path) for _ in range(ALLOCATIONS)]
+        with lock:
+            ids.extend(mine)
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(ids) == list(range(1, 4 * ALLOCATIONS + 1))
+
+
+def test_counter_is_seeded_once_from_the_csv(tmp_path):
+    csv_path = tmp_path / "performance_heatmap.csv"
+    csv_path.write_text("Participant,Trial 1 Time\n3,1.0\n17,2.0\n", encoding="utf-8")
+
+    assert participant_ids.next_participant_id(str(csv_path)) == 18
+
+    # Later CSV rows do not re-seed the counter (it already owns the sequence).
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("40,1.0\n")
+    assert participant_ids.next_participant_id(str(csv_path)) == 19
@@ -0,0 +1,29 @@
+import time
+
+from model import datasets as ds
+from model import prebuild
+
+
+def _wait(job, timeout=30.0):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.02)
+    assert job.done
+
+
+def test_failed_prebuild_reports_error_and_restarts(tmp_path):
+    csv_path = tmp_path / "no_genre.csv"
+    csv_path.write_text("year,popularity\n2000,1\n")
+    handle = ds.open_dataset(str(csv_path))
+
+    job = prebuild.start_prebuild(handle)
+    _wait(job)
+    snap = job.snapshot()
+    assert snap["done"] and snap["error"] and snap["message"] == "Failed"
+    assert prebuild.get_job(handle.fingerprint) is job
+
+    # A failed job is replaced rather than returned again, so "Retry" rebuilds
+    retry = prebuild.start_prebuild(handle)
+    assert retry is not job
+    _wait(retry)
+    assert prebuild.get_job(handle.fingerprint) is retry
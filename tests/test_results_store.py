@@ -0,0 +1,59 @@
+import csv
+import sqlite3
+
+from model import results_store
+
+TRIALS = 3
+
+
+def _write_wide_csv(path, rows: dict) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(results_store.wide_headers(TRIALS))
+        for participant_id, (times, errors) in rows.items():
+            w.writerow(results_store.wide_row(participant_id, times, errors))
+
+
+def _counts(db_path) -> tuple:
+    with sqlite3.connect(db_path) as conn:
+        return (
+            conn.execute("SELECT COUNT(*) FROM participants").fetchone()[0],
+            conn.execute("SELECT COUNT(*) FROM trials").fetchone()[0],
+        )
+
+
+def test_migrate_csv_once_is_idempotent(tmp_path):
+    db_path = str(tmp_path / results_store.DB_FILE_NAME)
+    csv_path = tmp_path / "performance_heatmap.csv"
+    _write_wide_csv(csv_path, {1: ([1.0, 2.0, 3.0], [0, 1, 0]), 2: ([1.5, None, 2.5], [0, 0, 1])})
+
+    assert results_store.migrate_csv_once(db_path, "heatmap", str(csv_path)) == 2
+    assert _counts(db_path) == (2, 2 * TRIALS)
+
+    # Second run (e.g. the next participant's start): nothing imported twice,
+    # even after the CSV gained a row.
+    _write_wide_csv(csv_path, {1: ([1.0, 2.0, 3.0], [0, 1, 0]), 2: ([1.5, None, 2.5], [0, 0, 1]), 3: ([1.0] * 3, [0] * 3)})
+    assert results_store.migrate_csv_once(db_path, "heatmap", str(csv_path)) == 0
+    assert _counts(db_path) == (2, 2 * TRIALS)
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT question_index, correct, elapsed FROM trials WHERE participant_id = 2 ORDER BY question_index"
+        ).fetchall()
+    assert rows == [(0, 1, 1.5), (1, 1, None), (2, 0, 2.5)]
+
+
+def test_migration_keeps_participants_already_in_the_store(tmp_path):
+    db_path = str(tmp_path / results_store.DB_FILE_NAME)
+    csv_path = tmp_path / "performance_treemap.csv"
+    app_trials = results_store.trial_rows([9.0] * TRIALS, [0] * TRIALS, chosen_options=[1] * TRIALS)
+    results_store.record_participant(db_path, "treemap", 1, app_trials)
+    _write_wide_csv(csv_path, {1: ([1.0] * TRIALS, [1] * TRIALS), 2: ([2.0] * TRIALS, [0] * TRIALS)})
+
+    assert results_store.migrate_csv_once(db_path, "treemap", str(csv_path)) == 1
+
+    with sqlite3.connect(db_path) as conn:
+        sources = dict(conn.execute("SELECT participant_id, source FROM participants"))
+        kept = conn.execute("SELECT DISTINCT elapsed, chosen_option FROM trials WHERE participant_id = 1").fetchall()
+    assert sources == {1: "app", 2: "csv"}
+    assert kept == [(9.0, 1)]
@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+from model import results_store, results_writer
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    monkeypatch.setattr(results_writer, "BATCH_LINGER_SECONDS", 0.0)
+    monkeypatch.setattr(results_writer, "RETRY_BASE_SECONDS", 0.05)
+    return results_writer._ResultsWriter()
+
+
+def _trials(n: int = 3) -> list:
+    return results_store.trial_rows([1.5] * n, [0] * n)
+
+
+def _entry(participant_id: int) -> dict:
+    return {"chart_type": "heatmap", "participant_id": participant_id, "trials": _trials(), "finished_at": 1.0}
+
+
+def _stored(db_path) -> list:
+    with sqlite3.connect(db_path) as conn:
+        return [r[0] for r in conn.execute("SELECT participant_id FROM participants ORDER BY participant_id")]
+
+
+def test_failed_commit_is_retried_with_backoff(writer, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "results.sqlite3")
+    real = results_store.record_participants
+    calls = []
+
+    def flaky(path, participants):
+        calls.append(len(participants))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        real(path, participants)
+
+    monkeypatch.setattr(results_store, "record_participants", flaky)
+    writer.submit(db_path, _entry(1))
+
+    assert writer.flush(timeout=5)
+    assert calls == [1, 1]
+    assert writer.last_error.startswith("OperationalError")
+    assert _stored(db_path) == [1]
+    assert writer.pending_count() == 0
+
+
+def test_journal_rewrite_error_does_not_kill_the_worker(writer, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "results.sqlite3")
+    real = writer._rewrite_journal
+    failed = []
+
+    def broken_once(path):
+        if not failed:
+            failed.append(path)
+            raise OSError("disk full")
+        real(path)
+
+    monkeypatch.setattr(writer, "_rewrite_journal", broken_once)
+    writer.submit(db_path, _entry(1))
+    assert writer.flush(timeout=5)
+    assert writer.last_error == "OSError: disk full"
+
+    # Still alive: the next submit is committed and the journal is compacted.
+    writer.submit(db_path, _entry(2))
+    assert writer.flush(timeout=5)
+    assert _stored(db_path) == [1, 2]
+    assert not (tmp_path / "results.sqlite3.journal.jsonl").exists()
+
+
+def _crashed_writer_journal(db_path, monkeypatch, participant_ids) -> None:
+    """Journal as a process leaves it when it dies after submit() but before any commit."""
+    crashed = results_writer._ResultsWriter()
+    monkeypatch.setattr(crashed, "_start_locked", lambda: None)  # worker never runs
+    for participant_id in participant_ids:
+        crashed.submit(db_path, _entry(participant_id))
+
+
+def test_recover_commits_a_journal_left_without_commit(writer, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "results.sqlite3")
+    _crashed_writer_journal(db_path, monkeypatch, [1, 2])
+    journal = tmp_path / "results.sqlite3.journal.jsonl"
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('{"chart_type": "heatmap", "partic')  # torn tail: that submit never returned
+
+    assert writer.recover(db_path) == 2
+    assert writer.flush(timeout=5)
+    assert _stored(db_path) == [1, 2]
+    assert not journal.exists()
+
+    # Recovery runs once per database per process.
+    assert writer.recover(db_path) == 0
+
+
+def test_replaying_already_committed_entries_is_harmless(writer, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "results.sqlite3")
+    _crashed_writer_journal(db_path, monkeypatch, [1])
+    # Crash window: committed, but the journal was not rewritten yet.
+    results_store.record_participants(db_path, [("heatmap", 1, _trials(), 1.0)])
+
+    writer.submit(db_path, _entry(2))  # the first submit recovers the journal too
+    assert writer.flush(timeout=5)
+
+    assert _stored(db_path) == [1, 2]
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM trials").fetchone()[0] == 2 * len(_trials())
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+from model import trial_journal
+
+
+def test_run_path_stays_under_runs(tmp_path):
+    path = trial_journal.run_path(str(tmp_path), "heatmap", 7)
+    assert path == os.path.join(os.path.realpath(tmp_path / "runs"), "heatmap_p7.jsonl")
+
+
+@pytest.mark.parametrize(
+    "chart_type, participant_id",
+    [
+        ("../../x", 1),
+        ("heatmap/../../x", 1),
+        ("Heatmap", 1),
+        ("", 1),
+        ("heatmap", 0),
+        ("heatmap", -3),
+        ("heatmap", "1"),
+        ("heatmap", True),
+        ("heatmap", 1.5),
+    ],
+)
+def test_run_path_rejects_untrusted_parts(tmp_path, chart_type, participant_id):
+    with pytest.raises(ValueError):
+        trial_journal.run_path(str(tmp_path), chart_type, participant_id)
+
+
+def test_run_path_rejects_symlinked_journal(tmp_path):
+    runs = tmp_path / "runs"
+    runs.mkdir()
+    outside = tmp_path / "outside.jsonl"
+    outside.write_text("")
+    os.symlink(outside, runs / "treemap_p1.jsonl")
+
+    with pytest.raises(ValueError):
+        trial_journal.run_path(str(tmp_path), "treemap", 1)
+
+
+def _trial(i: int) -> dict:
+    return {"question_index": i, "elapsed": 1.0 + i, "error": i % 2, "choice": i, "timing": None, "stamps": [10.0 + i, 11.0 + i]}
+
+
+def test_load_run_resumes_after_the_last_answered_trial(tmp_path):
+    path = trial_journal.run_path(str(tmp_path), "heatmap", 3)
+    trial_journal.start_run(path, {"participant_id": 3, "chart_type": "heatmap", "csv_path": "x.csv"})
+    trial_journal.record_phase(path, "quiz")
+    trial_journal.record_trial(path, _trial(0))
+    trial_journal.record_trial(path, _trial(1), fsync=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "trial", "question_in')  # torn by the crash
+
+    run = trial_journal.load_run(path)
+
+    assert run["meta"]["participant_id"] == 3
+    assert run["meta"]["csv_path"] == "x.csv"
+    assert run["phase"] == "quiz"
+    assert [t["question_index"] for t in run["trials"]] == [0, 1]
+    assert run["trials"][1] == _trial(1)
+
+
+def test_practice_only_run_has_no_trials(tmp_path):
+    path = trial_journal.run_path(str(tmp_path), "treemap", 1)
+    trial_journal.start_run(path, {"participant_id": 1})
+
+    run = trial_journal.load_run(path)
+
+    assert run["phase"] is None
+    assert run["trials"] == []
+
+
+def test_restart_and_finish(tmp_path):
+    path = trial_journal.run_path(str(tmp_path), "heatmap", 5)
+    trial_journal.start_run(path, {"participant_id": 5})
+    trial_journal.record_trial(path, _trial(0))
+
+    # Start over: the old trials are gone.
+    trial_journal.start_run(path, {"participant_id": 5, "restarted": True})
+    run = trial_journal.load_run(path)
+    assert run["meta"]["restarted"] is True
+    assert run["trials"] == []
+
+    trial_journal.finish_run(path)
+    assert trial_journal.load_run(path) is None
+    trial_journal.finish_run(path)  # already gone: no error
+
+
+def test_journal_without_start_line_is_ignored(tmp_path):
+    path = trial_journal.run_path(str(tmp_path), "heatmap", 9)
+    os.makedirs(os.path.dirname(path))
+    trial_journal.record_trial(path, _trial(0))
+
+    assert trial_journal.load_run(path) is None
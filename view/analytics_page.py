@@ -0,0 +1,120 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from model import analytics
+from view import fixed_sidebar
+from view.quiz import RESULTS_DIR
+
+
+# -----------------------------
+# Results analytics page (?page=analytics, only with TREEMAP_ANALYTICS=1)
+# Reads the collected results (see model.analytics) and compares heatmap vs
+# treemap. The body is a fragment that re-checks the results every few
+# seconds; the summary is only recomputed when the store/CSVs changed.
+# Participants reach the app through the same URL, so the page is off unless
+# the study machine turns it on.
+# -----------------------------
+REFRESH_SECONDS = 5
+
+_TIME_FORMAT = "{:.3f}"
+_RATE_FORMAT = "{:.1%}"
+
+
+def render_analytics_page() -> None:
+    fixed_sidebar.configure_sidebar(
+        page_title="Treemap vs Heatmap · Results",
+        layout="wide",
+        expanded=False,
+        lock=False,
+        width_px=500,
+    )
+
+    st.title("Results: Treemap vs Heatmap")
+    st.caption(
+        "Times are in seconds. The charts are compared on the server-measured time, which every participant "
+        "has; the browser-measured reaction time is compared separately, over the participants that have it. "
+        f"Updates automatically every {REFRESH_SECONDS}s as participants finish."
+    )
+    _analytics_body()
+
+
+def _test_line(label: str, test: dict) -> str:
+    n_heat, n_tree = test["n"]
+    if pd.isna(test["p"]):
+        return f"**{label}:** not enough participants yet (heatmap n={n_heat}, treemap n={n_tree}; need ≥2 each)."
+    verdict = "significant" if test["p"] < 0.05 else "not significant"
+    return (
+        f"**{label}:** t = {test['t']:.3f}, df ≈ {test['df']:.1f}, p = {test['p']:.4f} "
+        f"({verdict} at α = 0.05; {test['method']}; heatmap n={n_heat}, treemap n={n_tree})"
+    )
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def _analytics_body() -> None:
+    summary = analytics.summarize(RESULTS_DIR)
+    participants = summary["participants"]
+
+    if participants.empty:
+        st.info("No results yet. They appear here as soon as the first participant finishes.")
+        return
+
+    # ---- headline ----
+    per_chart = summary["per_chart"].set_index("chart_type")
+    cols = st.columns(len(analytics.CHART_TYPES))
+    for col, chart_type in zip(cols, analytics.CHART_TYPES):
+        with col:
+            st.subheader(chart_type.capitalize())
+            if chart_type not in per_chart.index:
+                st.caption("No participants yet.")
+                continue
+            row = per_chart.loc[chart_type]
+            a, b, c, d = st.columns(4)
+            a.metric("Participants", int(row["participants"]))
+            b.metric("Mean time (s)", _TIME_FORMAT.format(row["mean"]))
+            c.metric(
+                "Browser RT (s)",
+                "–" if pd.isna(row["mean_client_rt"]) else _TIME_FORMAT.format(row["mean_client_rt"]),
+                help=f"{int(row['participants_client_rt'])} of {int(row['participants'])} participants have browser timing",
+            )
+            d.metric("Error rate", _RATE_FORMAT.format(row["error_rate"]))
+
+    st.markdown("#### Heatmap vs treemap (per-participant means, Welch's t-test)")
+    st.markdown(_test_line("Response time (server-measured, all participants)", summary["time_test"]))
+    st.markdown(_test_line("Reaction time (browser-measured, participants with it)", summary["client_rt_test"]))
+    st.markdown(_test_line("Error rate", summary["error_test"]))
+
+    # ---- distributions ----
+    fig = px.box(
+        participants,
+        x="chart_type",
+        y="mean_time",
+        points="all",
+        color="chart_type",
+        labels={"chart_type": "Chart", "mean_time": "Mean time per participant (s)"},
+    )
+    fig.update_layout(showlegend=False, height=360, margin=dict(l=10, r=10, t=10, b=10))
+    st.plotly_chart(fig, width="stretch")
+
+    # ---- tables ----
+    st.markdown("#### Per chart")
+    st.dataframe(summary["per_chart"], hide_index=True, width="stretch")
+
+    st.markdown("#### Per question")
+    per_trial = summary["per_trial"].copy()
+    per_trial["question_index"] = per_trial["question_index"] + 1
+    st.dataframe(
+        per_trial.rename(columns={"question_index": "question"}),
+        hide_index=True,
+        width="stretch",
+    )
+
+    st.markdown("#### Per participant")
+    st.dataframe(participants, hide_index=True, width="stretch")
+
+    st.download_button(
+        "Download all trials (CSV)",
+        data=summary["trials"].to_csv(index=False).encode("utf-8"),
+        file_name="all_trials.csv",
+        mime="text/csv",
+    )
@@ -0,0 +1,185 @@
+import time
+
+import streamlit as st
+
+# -----------------------------
+# V2 component: quiz answer buttons with client-side timing (JS-only, inline)
+# The browser stamps the moment the question became visible (after paint) and
+# the click with performance.now(), so the reaction time excludes server render
+# and websocket latency. Epoch stamps (performance.timeOrigin + now) are sent
+# too, so Python can split the remaining overhead into "to browser" and
+# "back to server" (meaningful when browser and server share a clock, i.e. the
+# study machine runs both). The server stamp is taken once per question, so a
+# full rerun while the question is up does not move it.
+# -----------------------------
+
+HTML = """
+<div id="choices" class="choices"></div>
+"""
+
+CSS = """
+.choices {
+  display: flex;
+  flex-direction: column;
+  gap: 0.5rem;
+  font-family: var(--font-family);
+  font-size: var(--font-size);
+}
+
+.choices button {
+  width: 100%;
+  min-height: 2.5rem;
+  padding: 0.25rem 0.75rem;
+  font: inherit;
+  color: #31333f;
+  background: #ffffff;
+  border: 1px solid rgba(49, 51, 63, 0.2);
+  border-radius: 0.5rem;
+  cursor: pointer;
+}
+
+.choices button:hover:enabled {
+  border-color: #ff4b4b;
+  color: #ff4b4b;
+}
+
+.choices button:disabled {
+  cursor: not-allowed;
+  opacity: 0.5;
+}
+"""
+
+JS = r"""
+export default function(component) {
+  const { data, parentElement, setTriggerValue } = component;
+
+  const style = data?.style || {};
+  const runId = String(data?.run_id ?? "no-run-id");
+  const choices = Array.isArray(data?.choices) ? data.choices : [];
+  const serverSentTs = Number(data?.server_sent_ts ?? 0);
+
+  const globalStore = (window.__stChoiceButtons = window.__stChoiceButtons || {});
+  const store = (globalStore[runId] = globalStore[runId] || {});
+
+  const hostEl = (parentElement && parentElement.host) ? parentElement.host : parentElement;
+  if (hostEl && hostEl.style) {
+    hostEl.style.setProperty("--font-family", style.font_family || "Arial, Helvetica, sans-serif");
+    hostEl.style.setProperty("--font-size", style.font_size || "14px");
+  }
+
+  const root = parentElement?.shadowRoot || parentElement;
+  const wrap = root?.querySelector ? root.querySelector("#choices") : null;
+
+  const epoch = (t) => performance.timeOrigin + t;
+
+  // "Visible" = the frame after the buttons were first painted.
+  if (store.shownAt == null && !store.shownPending) {
+    store.shownPending = true;
+    requestAnimationFrame(() => requestAnimationFrame(() => {
+      store.shownAt = performance.now();
+      store.shownPending = false;
+    }));
+  }
+
+  function answer(idx) {
+    if (store.answered) return;
+    const clickedAt = performance.now();
+    store.answered = true;
+    // Clicked before the visibility stamp landed: no client RT (Python falls back).
+    const shownAt = store.shownAt;
+    for (const b of wrap.querySelectorAll("button")) b.disabled = true;
+
+    setTriggerValue("answer", {
+      run_id: runId,
+      choice: idx,
+      client_rt_ms: shownAt == null ? null : clickedAt - shownAt,
+      server_sent_ts: serverSentTs,
+      shown_epoch_ms: shownAt == null ? null : epoch(shownAt),
+      clicked_epoch_ms: epoch(clickedAt),
+    });
+  }
+
+  if (wrap && wrap.dataset.runId !== runId) {
+    wrap.dataset.runId = runId;
+    wrap.textContent = "";
+    choices.forEach((text, idx) => {
+      const b = document.createElement("button");
+      b.type = "button";
+      b.textContent = String(text);
+      b.addEventListener("click", () => answer(idx));
+      wrap.appendChild(b);
+    });
+  }
+
+  if (wrap) {
+    const disabled = Boolean(data?.disabled) || Boolean(store.answered);
+    for (const b of wrap.querySelectorAll("button")) b.disabled = disabled;
+  }
+
+  return () => {};
+}
+"""
+
+# Register ONCE (important: don’t re-register per-call)
+_choice_buttons = st.components.v2.component(
+    "quiz_choice_buttons",
+    html=HTML,
+    css=CSS,
+    js=JS,
+)
+
+# (run_id, time.time() when this question's buttons were first handed to the browser)
+_SENT_KEY = "_choice_buttons_sent"
+
+
+def choice_buttons(
+    choices: list,
+    *,
+    key: str,
+    run_id: str,
+    disabled: bool = False,
+    style: dict | None = None,
+):
+    """
+    Answer buttons for one question.
+    - key/run_id: MUST change per question (fresh visibility stamp)
+    Returns the click payload (dict) on the rerun triggered by a click, else None.
+    """
+    sent = st.session_state.get(_SENT_KEY)
+    if not sent or sent[0] != run_id:
+        sent = st.session_state[_SENT_KEY] = (run_id, time.time())
+
+    result = _choice_buttons(
+        data={
+            "choices": [str(c) for c in choices],
+            "run_id": run_id,
+            "disabled": bool(disabled),
+            "server_sent_ts": sent[1],
+            "style": style or {},
+        },
+        key=key,
+        on_answer_change=lambda: None,
+    )
+    return (result or {}).get("answer")
+
+
+def trial_timing(payload: dict, question_start_ts, received_ts: float) -> dict:
+    """
+    Latency decomposition for one trial (seconds):
+      client_rt        click - visible, on the browser clock (the participant's time)
+      server_render    question run start -> buttons handed to the browser
+      to_browser       buttons handed over -> visible (rest of the run, websocket, paint)
+      click_to_server  click -> click handled by Python
+    A part that could not be measured (e.g. a click before the visibility stamp)
+    is None, never 0.
+    """
+    sent_ts = float(payload.get("server_sent_ts") or 0.0)
+    shown_ts = float(payload.get("shown_epoch_ms") or 0.0) / 1000.0
+    clicked_ts = float(payload.get("clicked_epoch_ms") or 0.0) / 1000.0
+    client_rt_ms = payload.get("client_rt_ms")
+    return {
+        "client_rt": None if client_rt_ms is None else float(client_rt_ms) / 1000.0,
+        "server_render": (sent_ts - question_start_ts) if (question_start_ts and sent_ts) else None,
+        "to_browser": (shown_ts - sent_ts) if (sent_ts and shown_ts) else None,
+        "click_to_server": (received_ts - clicked_ts) if clicked_ts else None,
+    }
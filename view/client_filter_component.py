@@ -0,0 +1,444 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import streamlit as st
+
+from model import datasets as ds
+from model.bounded_cache import bounded_cache
+from model.datasets import DatasetHandle
+from view.fragments import rerun_fragment
+
+# -----------------------------
+# V2 component: client-side filtering (JS-only, inline)
+# The full genre × year sum/count matrix (plus the genre/year option lists) is
+# shipped to the browser ONCE per session and dataset: session state remembers
+# which dataset fingerprint this session's browser already holds, and later
+# reruns send only the filter state and styling. Year/genre filtering and chart
+# building (heatmap or treemap, via plotly.js) then happen entirely in the
+# browser. Python only hears about the final filter state (debounced) so it can
+# persist it to the URL. A browser that lost the matrix asks for it again.
+# -----------------------------
+
+# plotly.js is served by Streamlit's static file serving (server.enableStaticServing)
+# from <app dir>/static, written there once from the installed plotly package.
+_STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+_PLOTLY_JS_NAME = "plotly.min.js"
+PLOTLY_JS_URL = f"app/static/{_PLOTLY_JS_NAME}"
+
+# Python waits this long after the last click before being told the filter state.
+NOTIFY_DEBOUNCE_MS = 1200
+
+# Fingerprint of the dataset whose matrix this session's browser already has.
+_SENT_KEY = "_client_filter_sent"
+
+HTML = """
+<div class="cf-wrap">
+  <div class="cf-section-title">📅 Year Range</div>
+  <div class="cf-years">
+    <select id="cf-from"></select>
+    <span id="cf-dash" class="cf-dash">—</span>
+    <select id="cf-to"></select>
+  </div>
+  <div id="cf-warning" class="cf-warning"></div>
+
+  <div class="cf-section-title">Genre</div>
+  <div class="cf-box">
+    <div class="cf-buttons">
+      <button id="cf-all" type="button">Select All</button>
+      <button id="cf-none" type="button">Clear All</button>
+    </div>
+    <div id="cf-genres" class="cf-genres"></div>
+  </div>
+
+  <div id="cf-title" class="cf-section-title"></div>
+  <div id="cf-chart" class="cf-chart"></div>
+</div>
+"""
+
+CSS = """
+.cf-wrap { font-family: var(--cf-font-family); font-size: var(--cf-font-size); color: #31333f; }
+.cf-section-title { font-weight: 600; font-size: 1.25em; margin: 0.75rem 0 0.5rem 0; }
+.cf-years { display: flex; align-items: center; gap: 0.5rem; }
+.cf-years select { font: inherit; padding: 0.25rem 0.5rem; border-radius: 0.4rem; border: 1px solid #d0d3d9; }
+.cf-dash { padding: 0 0.25rem; }
+.cf-warning { color: #9c6500; min-height: 1.2em; margin-top: 0.25rem; }
+.cf-box { border: 1px solid rgba(49, 51, 63, 0.2); border-radius: 0.5rem; padding: 0.75rem; }
+.cf-buttons { display: flex; gap: 0.5rem; margin-bottom: 0.75rem; }
+.cf-buttons button {
+  flex: 1; font: inherit; padding: 0.35rem 0.75rem; border-radius: 0.5rem;
+  border: 1px solid rgba(49, 51, 63, 0.2); background: #fff; cursor: pointer;
+}
+.cf-buttons button:hover { border-color: #ff4b4b; color: #ff4b4b; }
+.cf-genres { display: grid; grid-template-columns: repeat(2, minmax(0, 1fr)); gap: 0.15rem 1rem; }
+.cf-genres label { display: flex; align-items: center; gap: 0.4rem; cursor: pointer; }
+.cf-chart { width: 100%; min-height: 700px; }
+"""
+
+JS = r"""
+export default function(component) {
+  const { data, parentElement, setStateValue, setTriggerValue } = component;
+  const root = parentElement?.shadowRoot || parentElement;
+  const $ = (sel) => (root?.querySelector ? root.querySelector(sel) : null);
+
+  const style = data?.style || {};
+  const datasetKey = String(data?.dataset_key ?? "no-dataset");
+
+  const globalStore = (window.__stClientFilter = window.__stClientFilter || {});
+  const store = (globalStore[datasetKey] = globalStore[datasetKey] || {});
+
+  // ---- matrix + option lists: sent once per dataset, kept here afterwards ----
+  if (data?.static) {
+    store.static = data.static;
+    store.staticRequested = false;
+  }
+  if (!store.static) {
+    if (!store.staticRequested) {
+      store.staticRequested = true;
+      setTriggerValue("need_static", true);
+    }
+    return () => {};
+  }
+  const cube = store.static.cube || {};
+
+  // ---- filter state: adopt Python's only when Python itself changed it ----
+  const pyFilter = JSON.stringify(data?.filter || {});
+  if (store.lastPyFilter !== pyFilter) {
+    store.lastPyFilter = pyFilter;
+    const f = data?.filter || {};
+    store.from = Number(f.from);
+    store.to = Number(f.to);
+    store.genres = new Set(f.genres || []);
+  }
+  store.override = data?.override || null;
+  store.chartType = String(data?.chart_type || "Heatmap");
+
+  const hostEl = (parentElement && parentElement.host) ? parentElement.host : parentElement;
+  if (hostEl && hostEl.style) {
+    hostEl.style.setProperty("--cf-font-family", style.font_family || "Arial, Helvetica, sans-serif");
+    hostEl.style.setProperty("--cf-font-size", `${Number(style.font_size || 16)}px`);
+  }
+
+  const genres = cube.genres || [];                 // cube row order
+  const genreIndex = new Map(genres.map((g, i) => [g, i]));
+  const displayGenres = store.static.genre_list || genres; // checkbox order
+  const firstYear = Number(cube.first_year || 0);
+  const nYears = (cube.sums && cube.sums[0]) ? cube.sums[0].length : 0;
+  const yearOptions = store.static.year_options || [];
+
+  // ---- build controls once per mount ----
+  const fromEl = $("#cf-from"), toEl = $("#cf-to"), genresEl = $("#cf-genres");
+  if (fromEl && !fromEl.dataset.init) {
+    fromEl.dataset.init = "1";
+    for (const sel of [fromEl, toEl]) {
+      for (const y of yearOptions) {
+        const o = document.createElement("option");
+        o.value = String(y); o.textContent = String(y);
+        sel.appendChild(o);
+      }
+    }
+    fromEl.addEventListener("change", () => { store.from = Number(fromEl.value); if (isSingle()) store.to = store.from; update(); });
+    toEl.addEventListener("change", () => { store.to = Number(toEl.value); update(); });
+
+    for (const g of displayGenres) {
+      const label = document.createElement("label");
+      const box = document.createElement("input");
+      box.type = "checkbox"; box.value = g;
+      box.addEventListener("change", () => {
+        if (box.checked) store.genres.add(g); else store.genres.delete(g);
+        update();
+      });
+      label.appendChild(box);
+      label.appendChild(document.createTextNode(g));
+      genresEl.appendChild(label);
+    }
+    $("#cf-all").addEventListener("click", () => { store.genres = new Set(displayGenres); update(); });
+    $("#cf-none").addEventListener("click", () => { store.genres = new Set(); update(); });
+  }
+
+  function isSingle() {
+    return store.override && store.override.mode === "single";
+  }
+
+  function syncControls() {
+    if (!fromEl) return;
+    fromEl.value = String(store.from);
+    toEl.value = String(store.to);
+    toEl.style.display = isSingle() ? "none" : "";
+    $("#cf-dash").style.display = isSingle() ? "none" : "";
+    for (const box of genresEl.querySelectorAll("input")) box.checked = store.genres.has(box.value);
+    $("#cf-title").textContent = `Genre Popularity ${store.chartType}`;
+  }
+
+  // ---- means for the current filter (mirrors model.cube.GenreYearCube) ----
+  function selection() {
+    const lo = Math.max(store.from - firstYear, 0);
+    const hi = Math.min(store.to - firstYear + 1, nYears);
+    let rows = [];
+    if (store.genres.size) {
+      for (const g of store.genres) if (genreIndex.has(g)) rows.push(genreIndex.get(g));
+      rows.sort((a, b) => a - b);
+    } else {
+      rows = genres.map((_, i) => i);
+    }
+    return { lo, hi: Math.max(hi, lo), rows };
+  }
+
+  function heatmapFigure() {
+    const { lo, hi, rows } = selection();
+    const keepCols = [];
+    for (let c = lo; c < hi; c++) if (rows.some((r) => cube.counts[r][c] > 0)) keepCols.push(c);
+    const keepRows = rows.filter((r) => keepCols.some((c) => cube.counts[r][c] > 0));
+    const z = keepRows.map((r) => keepCols.map((c) => (cube.counts[r][c] > 0 ? cube.sums[r][c] / cube.counts[r][c] : null)));
+
+    const fs = Number(style.font_size || 16), hs = Number(style.hover_font_size || 16), ff = style.font_family;
+    return {
+      data: [{
+        type: "heatmap",
+        x: keepCols.map((c) => String(firstYear + c)),
+        y: keepRows.map((r) => genres[r]),
+        z,
+        colorscale: "Sunset",
+        colorbar: {
+          title: { text: "Avg Popularity", font: { size: Math.max(11, fs + 1), family: ff } },
+          tickfont: { size: Math.max(10, fs), family: ff },
+        },
+        hovertemplate: "Year: %{x}<br>Genre: %{y}<br>Avg Popularity: %{z:.1f}<extra></extra>",
+        hoverongaps: false,
+        hoverlabel: { font: { size: hs, family: ff } },
+      }],
+      layout: {
+        title: { text: "Average Song Popularity by Genre and Year", font: { size: Math.max(12, fs + 2), family: ff } },
+        xaxis: { type: "category", title: { text: "Year", font: { size: Math.max(11, fs + 1), family: ff } }, tickfont: { size: Math.max(10, fs), family: ff } },
+        yaxis: { title: { text: "Genre", font: { size: Math.max(11, fs + 1), family: ff } }, tickfont: { size: Math.max(10, fs), family: ff } },
+        width: 1000, height: 700,
+        font: { size: fs, family: ff },
+        hoverlabel: { font: { size: hs, family: ff } },
+      },
+    };
+  }
+
+  function treemapFigure() {
+    const { lo, hi, rows } = selection();
+    const fs = Number(style.font_size || 16), hs = Number(style.hover_font_size || 16), ff = style.font_family;
+    const typography = { font: { size: fs, family: ff }, hoverlabel: { font: { size: hs, family: ff } } };
+
+    const cells = [];  // year-major, then genre (cube row) order
+    for (let c = lo; c < hi; c++) {
+      for (const r of rows) {
+        const n = cube.counts[r][c];
+        if (n > 0) cells.push({ year: firstYear + c, genre: genres[r], value: cube.sums[r][c] / n });
+      }
+    }
+    if (!cells.length) {
+      return {
+        data: [],
+        layout: Object.assign({
+          title: { text: "Treemap (Year → Genre)" },
+          annotations: [{ text: "No data for the selected filters.", showarrow: false }],
+          margin: { t: 50, l: 25, r: 25, b: 25 },
+        }, typography),
+      };
+    }
+
+    const yearsSorted = [...new Set(cells.map((x) => x.year))].sort((a, b) => a - b);
+    const yearPos = new Map(yearsSorted.map((y, i) => [y, i]));
+    const totals = new Map(yearsSorted.map((y) => [y, 0]));
+    for (const x of cells) totals.set(x.year, totals.get(x.year) + x.value);
+    // Stable sorts: ties keep chronological / alphabetical order (as in Python).
+    const yearLayout = [...yearsSorted].sort((a, b) => totals.get(b) - totals.get(a));
+    const rank = new Map(yearLayout.map((y, i) => [y, i]));
+    const genreNodes = [...cells].sort((a, b) => (rank.get(a.year) - rank.get(b.year)) || (b.value - a.value));
+
+    const containers = data?.palettes?.year_container || [];
+    const genrePalette = data?.palettes?.genre || [];
+    let rootTotal = 0;
+    for (const v of totals.values()) rootTotal += v;
+
+    const ids = ["root"], labels = [`All Years (${yearsSorted[0]}–${yearsSorted[yearsSorted.length - 1]})`];
+    const parents = [""], values = [rootTotal], colors = [data?.palettes?.root || "#444444"];
+    const lineColors = ["white"], lineWidths = [3], textColors = ["white"];
+    for (const y of yearLayout) {
+      ids.push(`year:${y}`); labels.push(String(y)); parents.push("root"); values.push(totals.get(y));
+      colors.push(containers[yearPos.get(y) % containers.length]);
+      lineColors.push("rgba(0,0,0,0.6)"); lineWidths.push(4); textColors.push("rgb(50,50,50)");
+    }
+    for (const x of genreNodes) {
+      ids.push(`year:${x.year}|genre:${x.genre}`); labels.push(x.genre); parents.push(`year:${x.year}`); values.push(x.value);
+      colors.push(genrePalette[yearPos.get(x.year) % genrePalette.length]);
+      lineColors.push("rgba(255,255,255,0.9)"); lineWidths.push(1.5); textColors.push("rgb(55,55,55)");
+    }
+
+    return {
+      data: [{
+        type: "treemap", ids, labels, parents, values,
+        branchvalues: "total", sort: false,
+        tiling: { packing: "squarify", pad: 4 },
+        marker: { colors, line: { color: lineColors, width: lineWidths } },
+        textfont: { color: textColors, size: Math.max(10, fs) },
+        textinfo: "label",
+        hovertemplate: "<b>%{label}</b><br>Avg. Popularity: %{value:.1f}<extra></extra>",
+        hoverlabel: { font: { size: hs, family: ff } },
+      }],
+      layout: Object.assign({ title: { text: "Treemap (Year → Genre) — Ordered by value" }, width: 1000, height: 700 }, typography),
+    };
+  }
+
+  // ---- plotly.js (loaded once per page from Streamlit's static route) ----
+  function ensurePlotly() {
+    if (window.Plotly) return Promise.resolve(window.Plotly);
+    if (!window.__stClientFilterPlotly) {
+      window.__stClientFilterPlotly = new Promise((resolve, reject) => {
+        const s = document.createElement("script");
+        s.src = String(data?.plotly_url || "app/static/plotly.min.js");
+        s.onload = () => resolve(window.Plotly);
+        s.onerror = () => { window.__stClientFilterPlotly = null; reject(new Error("plotly.js failed to load")); };
+        document.head.appendChild(s);
+      });
+    }
+    return window.__stClientFilterPlotly;
+  }
+
+  function draw() {
+    const chartEl = $("#cf-chart");
+    const warn = $("#cf-warning");
+    if (!chartEl) return;
+    if (!isSingle() && store.from > store.to) {
+      warn.textContent = "Invalid year range. Try to pick another year";
+      return;
+    }
+    warn.textContent = "";
+    const fig = store.chartType === "Treemap" ? treemapFigure() : heatmapFigure();
+    ensurePlotly()
+      .then((Plotly) => Plotly.react(chartEl, fig.data, fig.layout, { responsive: true }))
+      .catch(() => { chartEl.textContent = "Chart library could not be loaded."; });
+  }
+
+  // ---- tell Python the final state (debounced; one rerun after the burst) ----
+  function notify() {
+    if (store.notifyTimer) clearTimeout(store.notifyTimer);
+    store.notifyTimer = setTimeout(() => {
+      store.notifyTimer = null;
+      const payload = {
+        from: store.from,
+        to: isSingle() ? store.from : store.to,
+        genres: displayGenres.filter((g) => store.genres.has(g)),
+      };
+      store.lastPyFilter = JSON.stringify(payload);
+      setStateValue("filters", payload);
+    }, Number(data?.debounce_ms ?? 1200));
+  }
+
+  function update() {
+    syncControls();
+    draw();
+    notify();
+  }
+
+  syncControls();
+  draw();
+
+  return () => {};
+}
+"""
+
+# Register ONCE (important: don’t re-register per-call)
+_client_filter = st.components.v2.component(
+    "client_filtered_chart",
+    html=HTML,
+    css=CSS,
+    js=JS,
+    isolate_styles=False,  # plotly.js injects its styles into the document head
+)
+
+
+def ensure_plotly_static() -> bool:
+    """Write plotly.min.js into the static dir once (from the installed plotly package)."""
+    target = _STATIC_DIR / _PLOTLY_JS_NAME
+    if target.exists():
+        return True
+    try:
+        from plotly.offline import get_plotlyjs
+
+        _STATIC_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_text(get_plotlyjs(), encoding="utf-8")
+        os.replace(tmp, target)
+        return True
+    except Exception:
+        return False
+
+
+@bounded_cache(max_entries=4)
+def _static_payload(dataset: DatasetHandle, genre_list: tuple, year_options: tuple) -> dict:
+    """Per-dataset part of the component data, serialized once for every session."""
+    cube = ds.load_cube(dataset)
+    return {
+        "cube": {
+            "genres": list(cube.genres),
+            "first_year": int(cube.first_year),
+            "sums": np.round(cube.sums, 6).tolist(),
+            "counts": cube.counts.tolist(),
+        },
+        "genre_list": list(genre_list),
+        "year_options": list(year_options),
+    }
+
+
+def render(
+    dataset: DatasetHandle,
+    chart_type: str,
+    genre_list: list,
+    year_options: list,
+    style: dict,
+    palettes: dict,
+    on_change_func=None,
+) -> None:
+    """
+    Filters + chart rendered in the browser. When the client reports a new final
+    filter state, it is copied into session state and on_change_func is called
+    (URL persistence).
+    """
+    ensure_plotly_static()
+
+    y1, y2 = st.session_state.get("year_range", (year_options[0], year_options[-1]))
+    data = {
+        "dataset_key": dataset.fingerprint,
+        "filter": {"from": int(y1), "to": int(y2), "genres": list(st.session_state.get("genres", []))},
+        "override": st.session_state.get("year_filter_override"),
+        "chart_type": chart_type,
+        "style": style,
+        "palettes": palettes,
+        "plotly_url": PLOTLY_JS_URL,
+        "debounce_ms": NOTIFY_DEBOUNCE_MS,
+    }
+    if st.session_state.get(_SENT_KEY) != dataset.fingerprint:
+        data["static"] = _static_payload(dataset, tuple(genre_list), tuple(year_options))
+        st.session_state[_SENT_KEY] = dataset.fingerprint
+
+    result = _client_filter(
+        data=data,
+        key=f"client_filter_{dataset.fingerprint[:16]}",
+        on_filters_change=lambda: None,
+        on_need_static_change=lambda: None,
+    )
+
+    if (result or {}).get("need_static"):
+        # The browser lost the matrix (e.g. a remount in a fresh window): send it again.
+        st.session_state.pop(_SENT_KEY, None)
+        rerun_fragment()
+
+    filters = (result or {}).get("filters")
+    if not filters:
+        return
+
+    new_range = (int(filters["from"]), int(filters["to"]))
+    new_genres = list(filters.get("genres") or [])
+    if new_range == tuple(st.session_state.get("year_range", ())) and new_genres == st.session_state.get("genres"):
+        return
+
+    st.session_state.year_range = new_range
+    st.session_state.year_from, st.session_state.year_to = new_range
+    st.session_state.genres = new_genres
+    if on_change_func:
+        on_change_func()
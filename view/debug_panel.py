@@ -0,0 +1,183 @@
+import functools
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from model import instrumentation, profiling
+from model.bounded_cache import cache_stats
+
+# -----------------------------
+# Hidden debug panel (?debug=1)
+# Turns on per-rerun phase timing for this session (TREEMAP_PERF=1 turns it on
+# for every session) and shows the timings and cache counters in the sidebar.
+# ?profile=K profiles this session's next K reruns (see model.profiling); the
+# parameter is removed from the URL once read, so a reload does not re-arm it.
+# -----------------------------
+DEBUG_QUERY_PARAM = "debug"
+PROFILE_QUERY_PARAM = "profile"
+_STATE_KEY = "_debug_panel"
+_PROFILE_KEY = "_profile_remaining"
+_SNAPSHOT_KEY = "_profile_snapshot"
+
+_profiles_dir = None
+
+
+def configure(perf_dir: str) -> None:
+    """Folder for the timing log and, under it, the profiles."""
+    global _profiles_dir
+    instrumentation.configure(perf_dir)
+    _profiles_dir = os.path.join(perf_dir, profiling.PROFILES_FOLDER)
+
+
+def sync_from_url() -> None:
+    """Call once per full run, before anything is timed."""
+    st.session_state[_STATE_KEY] = st.query_params.get(DEBUG_QUERY_PARAM) == "1"
+
+    if PROFILE_QUERY_PARAM in st.query_params:
+        try:
+            reruns = max(int(st.query_params.get(PROFILE_QUERY_PARAM) or 1), 0)
+        except ValueError:
+            reruns = 1
+        st.session_state[_PROFILE_KEY] = reruns
+        st.query_params.pop(PROFILE_QUERY_PARAM, None)
+
+
+def panel_enabled() -> bool:
+    return bool(st.session_state.get(_STATE_KEY))
+
+
+def timing_enabled() -> bool:
+    return panel_enabled() or os.environ.get("TREEMAP_PERF") == "1"
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+def rerun(kind: str):
+    """Rerun record for this session (a phase when one is already open)."""
+    if not instrumentation.active() and not timing_enabled():
+        return instrumentation.rerun(kind, enabled=False)
+    return instrumentation.rerun(kind, enabled=True, session=_session_id())
+
+
+@contextmanager
+def profiled(kind: str):
+    """Profile this rerun if this session (or TREEMAP_PROFILE) asked for it."""
+    remaining = st.session_state.get(_PROFILE_KEY, 0)
+    if remaining <= 0 and not profiling.env_pending():
+        yield
+        return
+
+    with profiling.profile(_profiles_dir or profiling.PROFILES_FOLDER, _profile_meta(kind)) as running:
+        # Nested in a profiled page run (fragment body): the outer profile covers it.
+        if running:
+            if remaining > 0:
+                st.session_state[_PROFILE_KEY] = remaining - 1
+            else:
+                profiling.take_env_slot()
+        yield
+
+
+def _profile_meta(kind: str) -> dict:
+    """Session + interaction context: what this rerun did differently from the last profiled one."""
+    snapshot = {
+        k: v for k, v in st.session_state.to_dict().items()
+        if not str(k).startswith("_") and isinstance(v, (str, int, float, bool, type(None)))
+    }
+    previous = st.session_state.get(_SNAPSHOT_KEY) or {}
+    st.session_state[_SNAPSHOT_KEY] = snapshot
+    return {
+        "session": _session_id(),
+        "kind": kind,
+        "query_params": st.query_params.to_dict(),
+        "chart": snapshot.get("chart_type_radio"),
+        "quiz_phase": snapshot.get("quiz_phase"),
+        "quiz_q_idx": snapshot.get("quiz_q_idx"),
+        "changed": sorted(k for k in snapshot if previous and previous.get(k) != snapshot[k]),
+    }
+
+
+def timed_rerun(kind: str):
+    """Decorator for fragment bodies: a fragment rerun gets its own record (and profile)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profiled(kind), rerun(kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# -----------------------------
+# Panel
+# -----------------------------
+def _records_frame(records: list) -> pd.DataFrame:
+    rows = []
+    for r in records:
+        row = {"kind": r["kind"], "total_ms": r["total_ms"]}
+        row.update({f"{k} ms": v for k, v in r["phases"].items()})
+        row.update(r["values"])
+        misses = sum(c["misses"] for c in r["cache"].values())
+        row["cache hits/misses"] = f"{sum(c['hits'] for c in r['cache'].values())}/{misses}"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _phase_percentiles(records: list) -> pd.DataFrame:
+    samples = {}
+    for r in records:
+        samples.setdefault("total", []).append(r["total_ms"])
+        for k, v in r["phases"].items():
+            samples.setdefault(k, []).append(v)
+    rows = [
+        {"phase": k, "n": len(v), "p50 ms": pd.Series(v).quantile(0.5), "p95 ms": pd.Series(v).quantile(0.95)}
+        for k, v in samples.items()
+    ]
+    return pd.DataFrame(rows)
+
+
+def render() -> None:
+    if not panel_enabled():
+        return
+
+    with st.sidebar.expander("Debug: performance", expanded=False):
+        mine = instrumentation.recent(session_id=_session_id(), limit=20)
+        st.caption(f"Last {len(mine)} reruns of this session (newest first)")
+        if mine:
+            st.dataframe(_records_frame(mine), hide_index=True, width="stretch")
+
+        everyone = instrumentation.recent(limit=instrumentation.RING_SIZE)
+        st.caption(f"All sessions, last {len(everyone)} reruns")
+        if everyone:
+            st.dataframe(_phase_percentiles(everyone), hide_index=True, width="stretch")
+
+        st.caption("Caches (process-wide)")
+        caches = [
+            {k: s[k] for k in ("name", "hits", "misses", "hit_rate")}
+            for s in cache_stats()
+        ] + instrumentation.tracked_cache_stats()
+        st.dataframe(pd.DataFrame(caches), hide_index=True, width="stretch")
+
+        if instrumentation.log_path():
+            st.caption(f"Log: `{instrumentation.log_path()}`")
+
+        _profiles_section()
+
+
+def _profiles_section() -> None:
+    remaining = st.session_state.get(_PROFILE_KEY, 0)
+    st.caption(
+        f"Profiler: {profiling.profiler_name()}. "
+        + (f"Profiling the next {remaining} rerun(s)." if remaining else "Add ?profile=K to profile the next K reruns.")
+    )
+    for meta in profiling.recent(session_id=_session_id(), limit=3):
+        st.markdown(
+            f"**{meta['kind']}** · {meta['duration_s'] * 1000:.0f} ms · "
+            f"changed: {', '.join(meta['changed']) or '–'}  \n`{meta['file']}`"
+        )
+        st.dataframe(pd.DataFrame(meta["hotspots"]), hide_index=True, width="stretch")
@@ -0,0 +1,14 @@
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+
+def rerun_fragment() -> None:
+    """
+    st.rerun(scope="fragment") from inside an @st.fragment. Only allowed during a
+    fragment rerun, so when the fragment is running as part of a full page run
+    this falls back to a full rerun.
+    """
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
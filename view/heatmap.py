@@ -2,6 +2,11 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objs as go
 
+from model import datasets as ds
+from model import instrumentation
+from model.bounded_cache import bounded_cache
+from model.datasets import DatasetHandle
+
 
 def _font_family_css(font_family_label: str) -> str:
     mapping = {
@@ -12,26 +17,69 @@ def _font_family_css(font_family_label: str) -> str:
     return mapping.get(font_family_label, mapping["Sans Serif"])
 
 
-@st.cache_data(show_spinner=False)
-def build_heatmap_matrix(df: pd.DataFrame, start_year: int, end_year: int, selected_genres_tuple: tuple):
-    df = df[(df["year"] >= start_year) & (df["year"] <= end_year)]
-    if selected_genres_tuple:
-        df = df[df["genre"].isin(list(selected_genres_tuple))]
+@bounded_cache(max_entries=256, max_bytes=64 * 1024 * 1024, key=ds.filter_cache_key)
+def build_heatmap_matrix(dataset: DatasetHandle, start_year: int, end_year: int, selected_genres_tuple: tuple) -> pd.DataFrame:
+    cube = ds.load_cube(dataset)
+    return cube.mean_matrix(start_year, end_year, selected_genres_tuple)
 
-    heatmap_df = df.groupby(["genre", "year"], as_index=False)["popularity"].mean()
-    heatmap_df["year"] = heatmap_df["year"].astype(str)
 
-    return heatmap_df.pivot(index="genre", columns="year", values="popularity")
+# -----------------------------
+# Heatmap figures (cached on filters + typography, bounded LRU)
+# Typography is baked into the trace (colorbar, axes), so each typography is
+# its own entry. Cached figures are shared across sessions, so callers get an
+# unvalidated copy, never the cached object.
+# -----------------------------
+DEFAULT_TYPOGRAPHY = (16, 16, _font_family_css("Sans Serif"))
 
 
-def render(df: pd.DataFrame, year_range: tuple, selected_genres: list) -> go.Figure:
-    start_year, end_year = year_range
-    heatmap_matrix = build_heatmap_matrix(df, start_year, end_year, tuple(selected_genres))
+def _figure_cache_key(dataset, start_year, end_year, selected_genres_tuple, *typography):
+    return ds.filter_cache_key(dataset, start_year, end_year, selected_genres_tuple), typography
+
+
+@bounded_cache(max_entries=64, max_bytes=128 * 1024 * 1024, key=_figure_cache_key)
+def _cached_heatmap_figure(
+    dataset: DatasetHandle,
+    start_year: int,
+    end_year: int,
+    selected_genres_tuple: tuple,
+    font_size: int,
+    hover_font_size: int,
+    font_family: str,
+) -> go.Figure:
+    with instrumentation.phase("matrix_build"):
+        heatmap_matrix = build_heatmap_matrix(dataset, start_year, end_year, selected_genres_tuple)
+    return build_heatmap_figure(heatmap_matrix, font_size, hover_font_size, font_family)
+
+
+def build_heatmap_chart(
+    dataset: DatasetHandle,
+    start_year: int,
+    end_year: int,
+    selected_genres_tuple: tuple,
+    font_size: int,
+    hover_font_size: int,
+    font_family: str,
+) -> go.Figure:
+    """Heatmap figure for filters + typography (safe to call from background threads)."""
+    fig = _cached_heatmap_figure(
+        dataset, start_year, end_year, selected_genres_tuple, font_size, hover_font_size, font_family
+    )
+    return go.Figure(fig, _validate=False)
+
 
+def render(dataset: DatasetHandle, year_range: tuple, selected_genres: list) -> go.Figure:
+    start_year, end_year = year_range
     font_size = int(st.session_state.get("font_size_px", 16))
     hover_font_size = int(st.session_state.get("hover_font_size_px", 16))
     font_family = _font_family_css(st.session_state.get("font_family", "Sans Serif"))
 
+    with instrumentation.phase("figure"):
+        return build_heatmap_chart(
+            dataset, start_year, end_year, tuple(selected_genres), font_size, hover_font_size, font_family
+        )
+
+
+def build_heatmap_figure(heatmap_matrix: pd.DataFrame, font_size: int, hover_font_size: int, font_family: str) -> go.Figure:
     axis_tick_size = max(10, font_size)
     axis_title_size = max(11, font_size + 1)
     chart_title_size = max(12, font_size + 2)
@@ -10,7 +10,12 @@ from typing import List, Optional
 import streamlit as st
 from streamlit_scroll_to_top import scroll_to_here
 
+from model import instrumentation, participant_ids, results_store, results_writer, trial_journal, xlsx_export
+from model.file_locks import is_file_locked
 from view import js_timer_component  # your existing JS timer component
+from view import choice_buttons_component
+from view import debug_panel
+from view.fragments import rerun_fragment
 
 
 # ---------------------------
@@ -47,6 +52,9 @@ FADE_SECONDS = 0.5
 
 RESULTS_DIR = FilePathConfig.generate_complete_file_path(folder_name="results", strip_count=0)
 
+# URL query param naming the participant whose run is in progress ("<chart>-<id>")
+PARTICIPANT_QUERY_PARAM = "participant"
+
 # ---------------------------
 # Year filter override (driven by question text)
 # Convention (recommended):
@@ -91,6 +99,35 @@ def _set_year_override_from_question(question_text: str):
     st.session_state.year_filter_override = _parse_year_override(question_text)
 
 
+def _override_is_single(override) -> bool:
+    return bool(override) and override.get("mode") == "single"
+
+
+def _upcoming_year_override():
+    """Year override the sidebar will set on its next run, from the (already advanced) quiz state."""
+    phase = st.session_state.get("quiz_phase", "idle")
+    if not st.session_state.get("quiz_started") or phase in ("idle", "get_ready"):
+        return None
+    if phase == "practice":
+        idx, questions = st.session_state.get("practice_q_idx", 0), PRACTICE_QUESTIONS
+    else:
+        idx, questions = st.session_state.get("quiz_q_idx", 0), QUESTIONS
+    if idx >= len(questions):
+        return None
+    return _parse_year_override(questions[idx]["q"].split("\n\n")[0])
+
+
+def _rerun_quiz():
+    """
+    Rerun only the quiz sidebar, unless the next question switches the year
+    filter between single-year and range mode (the filters/chart then change too).
+    """
+    current = st.session_state.get("year_filter_override")
+    if _override_is_single(current) != _override_is_single(_upcoming_year_override()):
+        st.rerun()
+    rerun_fragment()
+
+
 # ---------------------------
 # Practice Questions (UNTIMED)
 # ---------------------------
@@ -194,6 +231,10 @@ def _results_csv_path() -> str:
     return os.path.join(RESULTS_DIR, f"performance_{suffix}.csv")
 
 
+def _results_db_path() -> str:
+    return results_store.db_path(RESULTS_DIR)
+
+
 def _results_xlsx_path_from_csv(csv_path: str) -> str:
     base, _ = os.path.splitext(csv_path)
     return base + ".xlsx"
@@ -203,40 +244,36 @@ def _results_xlsx_path_from_csv(csv_path: str) -> str:
 # CSV helpers
 # ============================================================
 def _headers(total_trials: int) -> List[str]:
-    cols = ["Participant ID"]
-    for i in range(1, total_trials + 1):
-        cols.append(f"Trial {i} Time")
-        cols.append(f"Trial {i} Errors")
-    return cols
+    return results_store.wide_headers(total_trials)
 
 
 def ensure_csv_file(csv_path: str, total_trials: int) -> None:
     os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
-    if os.path.exists(csv_path):
+    headers = _headers(total_trials)
+    if not os.path.exists(csv_path):
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(headers)
         return
 
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(_headers(total_trials))
-
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        current = next(csv.reader(f), [])
+    if current == headers or current != headers[: len(current)]:
+        return
 
-def get_next_participant_id(csv_path: str) -> int:
-    if not os.path.exists(csv_path):
-        return 1
+    # Older file (no timing columns yet): rewrite the header line only.
+    tmp_path = csv_path + ".tmp"
+    with open(csv_path, "r", encoding="utf-8", newline="") as src, open(tmp_path, "w", newline="", encoding="utf-8") as dst:
+        next(src, None)
+        csv.writer(dst).writerow(headers)
+        for line in src:
+            dst.write(line)
+    os.replace(tmp_path, csv_path)
 
-    ids: List[int] = []
-    with open(csv_path, "r", encoding="utf-8", newline="") as f:
-        r = csv.reader(f)
-        next(r, None)  # header
-        for row in r:
-            if not row:
-                continue
-            try:
-                ids.append(int(row[0]))
-            except Exception:
-                continue
 
-    return (max(ids) + 1) if ids else 1
+def get_next_participant_id(csv_path: str) -> int:
+    """O(1), lock-protected allocation (counter file beside the CSV)."""
+    return participant_ids.next_participant_id(csv_path)
 
 
 def append_participant_result_csv(
@@ -244,14 +281,12 @@ def append_participant_result_csv(
     participant_id: int,
     trial_times: List[Optional[float]],
     trial_errors: List[int],
+    trial_timings: Optional[List[Optional[dict]]] = None,
 ) -> None:
     if len(trial_times) != len(trial_errors):
         raise ValueError("trial_times and trial_errors must be the same length")
 
-    row = [participant_id]
-    for t, e in zip(trial_times, trial_errors):
-        row.append("" if t is None else float(t))
-        row.append(int(e))
+    row = results_store.wide_row(participant_id, trial_times, trial_errors, trial_timings)
 
     with open(csv_path, "a", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
@@ -259,49 +294,8 @@ def append_participant_result_csv(
 
 
 def is_workbook_open_or_locked(path: str) -> bool:
-    """
-    Returns True if the target XLSX is likely open/locked (Excel commonly locks files on Windows).
-    Cross-platform best-effort:
-      - Windows: try opening + exclusive byte-range lock via msvcrt
-      - Unix: try flock exclusive non-blocking
-    """
-    if not path or not os.path.exists(path):
-        return False
-
-    try:
-        # If the OS denies opening for write at all, it's locked.
-        f = open(path, "a")
-    except PermissionError:
-        return True
-    except Exception:
-        # Unknown edge case; assume not locked to avoid false positives.
-        return False
-
-    try:
-        if os.name == "nt":
-            import msvcrt
-            try:
-                # lock 1 byte non-blocking
-                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
-                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
-                return False
-            except OSError:
-                return True
-        else:
-            import fcntl
-            try:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                return False
-            except BlockingIOError:
-                return True
-            except OSError:
-                return True
-    finally:
-        try:
-            f.close()
-        except Exception:
-            pass
+    """Returns True if the target XLSX is likely open/locked (Excel commonly locks files on Windows)."""
+    return is_file_locked(path)
 
 
 # ============================================================
@@ -309,29 +303,11 @@ def is_workbook_open_or_locked(path: str) -> bool:
 # ============================================================
 def convert_csv_to_xlsx(csv_path: str) -> str:
     """
-    Rebuilds XLSX from the CSV on every participant completion.
-    This avoids in-place editing of an existing workbook (simpler + safer).
+    Synchronous rebuild of the XLSX from the CSV (write-only, streamed).
+    The quiz itself queues xlsx_export.request_export instead.
     If the XLSX is open in Excel, Windows will lock it and this can fail.
     """
-    from openpyxl import Workbook
-
-    xlsx_path = _results_xlsx_path_from_csv(csv_path)
-    tmp_path = xlsx_path + ".tmp"
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Results"
-
-    with open(csv_path, "r", encoding="utf-8", newline="") as f:
-        r = csv.reader(f)
-        for row in r:
-            ws.append(row)
-
-    wb.save(tmp_path)
-    wb.close()
-
-    os.replace(tmp_path, xlsx_path)
-    return xlsx_path
+    return xlsx_export.write_xlsx_from_csv(csv_path, _results_xlsx_path_from_csv(csv_path))
 
 
 # ============================================================
@@ -392,6 +368,8 @@ def reset_quiz():
 
     st.session_state.trial_times = []
     st.session_state.trial_errors = []
+    st.session_state.trial_timings = []
+    st.session_state.trial_stamps = []
     st.session_state.saved_to_disk = False
     st.session_state.converted_to_xlsx = False
 
@@ -414,9 +392,29 @@ def _prepare_participant_run():
     """
     csv_path = _results_csv_path()
     st.session_state.results_csv_path = csv_path
-
-    ensure_csv_file(csv_path, TOTAL_QUESTIONS)
-    st.session_state.participant_id = get_next_participant_id(csv_path)
+    st.session_state.results_chart_type = _datamap_suffix()
+
+    with instrumentation.phase("results_io"):
+        ensure_csv_file(csv_path, TOTAL_QUESTIONS)
+        # First run against the store: bring the existing CSV participants over once,
+        # and commit anything a previous (crashed) process journaled but never stored.
+        results_store.migrate_csv_once(_results_db_path(), st.session_state.results_chart_type, csv_path)
+        results_writer.recover(_results_db_path())
+        st.session_state.participant_id = get_next_participant_id(csv_path)
+
+        # Write-ahead trial journal + participant in the URL, so a reload can resume this run
+        journal_path = trial_journal.run_path(RESULTS_DIR, st.session_state.results_chart_type, st.session_state.participant_id)
+        trial_journal.start_run(
+            journal_path,
+            {
+                "participant_id": st.session_state.participant_id,
+                "chart_type": st.session_state.results_chart_type,
+                "chart": st.session_state.get("chart_type_radio", "Heatmap"),
+                "csv_path": csv_path,
+            },
+        )
+    st.session_state.run_journal_path = journal_path
+    st.query_params[PARTICIPANT_QUERY_PARAM] = f"{st.session_state.results_chart_type}-{st.session_state.participant_id}"
 
     st.session_state.run_prepared = True
 
@@ -427,7 +425,7 @@ def _begin_get_ready_phase():
 
     st.session_state.quiz_ready_key = f"quiz_ready_timer_{uuid.uuid4()}"
     st.session_state.quiz_ready_run_id = str(uuid.uuid4())
-    st.rerun()
+    _rerun_quiz()
 
 
 def start_flow():
@@ -441,7 +439,7 @@ def start_flow():
     st.session_state.quiz_phase = "practice"
     reset_practice()
 
-    st.rerun()
+    _rerun_quiz()
 
 
 def choose(choice_idx: int):
@@ -460,21 +458,75 @@ def ensure_question_state_for_current_idx():
     if st.session_state.get("quiz_q_start_for_idx") != cur:
         st.session_state.quiz_q_start_for_idx = cur
         st.session_state.quiz_q_start_ts = time.time()
+        st.session_state.quiz_q_run_id = str(uuid.uuid4())
 
         # unlock inputs for the new question
         st.session_state.quiz_input_locked = False
 
 
-def _record_trial(elapsed: Optional[float], error: int) -> None:
+def _record_trial(elapsed: Optional[float], error: int, timing: Optional[dict] = None, choice_idx: Optional[int] = None) -> None:
+    stamps = (st.session_state.get("quiz_q_start_ts"), time.time())
     st.session_state.trial_times.append(None if elapsed is None else float(elapsed))
     st.session_state.trial_errors.append(int(error))
+    st.session_state.trial_timings.append(timing)
+    st.session_state.trial_stamps.append(stamps)
+
+    journal_path = st.session_state.get("run_journal_path")
+    if journal_path:
+        with instrumentation.phase("results_io"):
+            trial_journal.record_trial(
+                journal_path,
+                {
+                    "question_index": st.session_state.quiz_q_idx,
+                    "elapsed": st.session_state.trial_times[-1],
+                    "error": int(error),
+                    "choice": choice_idx,
+                    "timing": timing,
+                    "stamps": stamps,
+                },
+            )
+
+
+def _render_timed_choices(q: dict) -> None:
+    """Main-quiz answers via the client-timed buttons (see choice_buttons_component)."""
+    typo = _quiz_typography()
+    run_id = st.session_state.quiz_q_run_id
+
+    answer = choice_buttons_component.choice_buttons(
+        q["choices"],
+        key=f"quiz_choices_{run_id}",
+        run_id=run_id,
+        disabled=st.session_state.quiz_input_locked,
+        style={"font_family": typo["font_family"], "font_size": f"{typo['font_size']}px"},
+    )
+
+    # backend debounce + ignore a late click from a previous question
+    if not answer or answer.get("run_id") != run_id or st.session_state.quiz_input_locked:
+        return
+
+    received_ts = time.time()
+    st.session_state.quiz_input_locked = True
+    st.session_state.quiz_scroll_ticks = 2
+
+    # server-side duration kept as before; the client RT + breakdown go beside it
+    start_ts = st.session_state.get("quiz_q_start_ts")
+    elapsed = (received_ts - start_ts) if start_ts else None
+    timing = choice_buttons_component.trial_timing(answer, start_ts, received_ts)
+
+    choice_idx = int(answer["choice"])
+    error = 0 if choice_idx == q["correct"] else 1
+    _record_trial(elapsed, error, timing, choice_idx)
+
+    choose(choice_idx)
+    _rerun_quiz()
 
 
 def _save_and_convert_if_needed():
     """
     After ONE participant completes the quiz:
-      1) append row to CSV (fast + safe)
-      2) convert the CSV -> XLSX (rebuild workbook each time)
+      1) durably journal the trials (fsync) for the background results writer
+      2) the writer commits them to the SQLite store and queues the CSV/XLSX export
+    Nothing here waits on the database or the workbook.
     """
     if st.session_state.saved_to_disk:
         return
@@ -482,83 +534,53 @@ def _save_and_convert_if_needed():
     st.session_state.saved_to_disk = True  # prevent rerun loops
 
     csv_path = st.session_state.get("results_csv_path") or _results_csv_path()
+    chart_type = st.session_state.get("results_chart_type") or _datamap_suffix()
+
+    with instrumentation.phase("results_io"):
+        results_writer.submit_participant(
+            _results_db_path(),
+            chart_type,
+            st.session_state.participant_id,
+            results_store.trial_rows(
+                st.session_state.trial_times,
+                st.session_state.trial_errors,
+                chosen_options=st.session_state.quiz_answers,
+                trial_timings=st.session_state.trial_timings,
+                trial_stamps=st.session_state.trial_stamps,
+            ),
+            csv_path=csv_path,
+            total_trials=TOTAL_QUESTIONS,
+        )
 
-    # 1) Save row to CSV
-    append_participant_result_csv(
-        csv_path,
-        st.session_state.participant_id,
-        st.session_state.trial_times,
-        st.session_state.trial_errors,
-    )
+        # Durably handed over: the resume journal and the URL marker are no longer needed
+        if st.session_state.get("run_journal_path"):
+            trial_journal.finish_run(st.session_state.run_journal_path)
+            st.session_state.run_journal_path = None
+    st.query_params.pop(PARTICIPANT_QUERY_PARAM, None)
 
-    # 2) Convert CSV -> XLSX (after each participant)
-    xlsx_path = _results_xlsx_path_from_csv(csv_path)
+    st.session_state.results_xlsx_path = _results_xlsx_path_from_csv(csv_path)
 
-    # proactively detect Excel lock/open workbook
-    if is_workbook_open_or_locked(xlsx_path):
-        st.session_state.converted_to_xlsx = False
-        st.session_state.results_xlsx_path = xlsx_path
-        st.session_state.xlsx_open = True
-        st.warning(
-            "Saved to CSV, but the XLSX looks OPEN/LOCKED (probably open in Excel).\n"
-            "Close the XLSX file, then the next participant will update it."
-        )
-        return
 
-    try:
-        xlsx_path = convert_csv_to_xlsx(csv_path)
-        st.session_state.converted_to_xlsx = True
-        st.session_state.results_xlsx_path = xlsx_path
-        st.session_state.xlsx_open = False
-    except PermissionError:
-        st.session_state.converted_to_xlsx = False
-        st.session_state.results_xlsx_path = xlsx_path
-        st.session_state.xlsx_open = True
+def _warn_if_results_locked():
+    """
+    Excel lock/open workbook notice. The export worker probes the files off the
+    script thread (and retries while they are locked); this only reads its status.
+    """
+    csv_path = st.session_state.get("results_csv_path") or _results_csv_path()
+    state = xlsx_export.export_status(csv_path).get("state")
+
+    st.session_state.converted_to_xlsx = state == "ok"
+    st.session_state.xlsx_open = state == "locked"
+    if st.session_state.xlsx_open:
         st.warning(
-            "Saved to CSV, but could not update the XLSX because it is likely open in Excel.\n"
-            "Close the XLSX file, then the next participant will update it."
+            "Saved, but the CSV/XLSX looks OPEN/LOCKED (probably open in Excel).\n"
+            "It will be updated automatically once the file is closed."
         )
 
 
 def _is_file_locked(path: str) -> bool:
-    """
-    Best-effort lock check:
-    - Windows: tries a non-blocking 1-byte lock via msvcrt
-    - Unix: tries flock non-blocking
-    Returns True if the file exists and appears locked/open (e.g., open in Excel).
-    """
-    if not path or not os.path.exists(path):
-        return False
-
-    try:
-        f = open(path, "a")
-    except PermissionError:
-        return True
-    except Exception:
-        return False
-
-    try:
-        if os.name == "nt":
-            import msvcrt
-            try:
-                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
-                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
-                return False
-            except OSError:
-                return True
-        else:
-            import fcntl
-            try:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                return False
-            except (BlockingIOError, OSError):
-                return True
-    finally:
-        try:
-            f.close()
-        except Exception:
-            pass
+    """Best-effort lock check (see model.file_locks)."""
+    return is_file_locked(path)
 
 
 def _check_results_files_unlocked_or_warn() -> bool:
@@ -641,12 +663,68 @@ def _render_practice_sidebar():
 
             # optional: autoscroll to top for the next question
             st.session_state.quiz_scroll_ticks = 2
-            st.rerun()
+            _rerun_quiz()
 
 
 # ============================================================
 # Main render
 # ============================================================
+def _resume_unfinished_run() -> None:
+    """
+    Fresh session (e.g. after F5) with a participant in the URL: rebuild the run
+    from its trial journal and continue at the next unanswered question.
+    """
+    if st.session_state.quiz_started:
+        return
+
+    ref = st.query_params.get(PARTICIPANT_QUERY_PARAM)
+    if not ref:
+        return
+    try:
+        # Untrusted (URL): run_path only accepts a known chart type and a positive id.
+        chart_type, participant_id = str(ref).rsplit("-", 1)
+        participant_id = int(participant_id)
+        journal_path = trial_journal.run_path(RESULTS_DIR, chart_type, participant_id)
+    except ValueError:
+        st.query_params.pop(PARTICIPANT_QUERY_PARAM, None)
+        return
+
+    run = trial_journal.load_run(journal_path)
+    if run is None:
+        st.query_params.pop(PARTICIPANT_QUERY_PARAM, None)
+        return
+
+    meta = run["meta"]
+    st.session_state.participant_id = participant_id
+    st.session_state.results_chart_type = chart_type
+    st.session_state.results_csv_path = meta.get("csv_path") or _results_csv_path()
+    st.session_state.chart_type_radio = meta.get("chart", st.session_state.get("chart_type_radio", "Heatmap"))
+    st.session_state.run_journal_path = journal_path
+    st.session_state.run_prepared = True
+    st.session_state.quiz_started = True
+
+    trials = sorted(run["trials"], key=lambda t: t["question_index"])
+    if run["phase"] != "quiz" and not trials:
+        # Still in the (untimed) practice block: just start it over.
+        st.session_state.quiz_phase = "practice"
+        reset_practice()
+        return
+
+    reset_quiz()
+    for t in trials:
+        st.session_state.trial_times.append(t.get("elapsed"))
+        st.session_state.trial_errors.append(int(t.get("error", 0)))
+        st.session_state.trial_timings.append(t.get("timing"))
+        st.session_state.trial_stamps.append(tuple(t.get("stamps") or (None, None)))
+        st.session_state.quiz_answers.append(t.get("choice"))
+    st.session_state.quiz_q_idx = len(trials)
+
+    # Short countdown before the next timed question
+    st.session_state.quiz_phase = "get_ready"
+    st.session_state.quiz_ready_key = f"quiz_ready_timer_{uuid.uuid4()}"
+    st.session_state.quiz_ready_run_id = str(uuid.uuid4())
+
+
 def render_quiz():
     # ---------------------------
     # State init
@@ -671,10 +749,14 @@ def render_quiz():
 
     st.session_state.setdefault("trial_times", [])
     st.session_state.setdefault("trial_errors", [])
+    st.session_state.setdefault("trial_timings", [])
+    st.session_state.setdefault("trial_stamps", [])
     st.session_state.setdefault("saved_to_disk", False)
     st.session_state.setdefault("converted_to_xlsx", False)
 
     st.session_state.setdefault("quiz_input_locked", False)
+    # Answer buttons stamp visible/click times in the browser; False = plain st.button fallback
+    st.session_state.setdefault("quiz_client_timing", True)
     st.session_state.setdefault("quiz_scroll_ticks", 0)
     st.session_state.setdefault("quiz_q_start_ts", None)
     st.session_state.setdefault("quiz_q_start_for_idx", None)
@@ -682,156 +764,176 @@ def render_quiz():
     st.session_state.setdefault("results_csv_path", None)
     st.session_state.setdefault("results_xlsx_path", None)
     st.session_state.setdefault("xlsx_open", False)
+    st.session_state.setdefault("run_journal_path", None)
+
+    _resume_unfinished_run()
 
-    # --- Autoscroll to top (render for 2 reruns for reliability) ---
+    with st.sidebar:
+        _quiz_sidebar()
+
+
+@st.fragment
+@debug_panel.timed_rerun("quiz_sidebar")
+def _quiz_sidebar():
+    """
+    The quiz reruns on its own: answering only re-executes this sidebar, not the
+    filters/chart (see _rerun_quiz for when the whole page is rerun instead).
+    """
+    # --- Autoscroll the sidebar to top (render for 2 reruns for reliability) ---
     if st.session_state.get("quiz_scroll_ticks", 0) > 0:
         scroll_to_here(0, key=f"quiz_scroll_{uuid.uuid4()}")
         st.session_state.quiz_scroll_ticks -= 1
 
-    with st.sidebar:
-        st.header("Quiz")
-
-        # ------------------------------------------------------------
-        # Idle (Start)
-        # ------------------------------------------------------------
-        if not st.session_state.quiz_started or st.session_state.quiz_phase == "idle":
-            _clear_year_override()
-            st.info("Click **Start** to begin.")
-
-            if st.button("Start", key="quiz_start", width='stretch'):
-                # Check locks BEFORE starting / creating files / assigning participant id
-                if not _check_results_files_unlocked_or_warn():
-                    st.stop()
-
-                start_flow()
-
-            return
-
-        # ------------------------------------------------------------
-        # Practice (UNTIMED)
-        # ------------------------------------------------------------
-        if st.session_state.quiz_phase == "practice":
-            _render_practice_sidebar()
-            return
-
-        # ------------------------------------------------------------
-        # Get Ready
-        # ------------------------------------------------------------
-        if st.session_state.quiz_phase == "get_ready":
-            _clear_year_override()
-            st.markdown(
-                "<h1 style='font-size:30px; text-align:center;'>Get Ready!</h1>",
-                unsafe_allow_html=True,
-            )
+    st.header("Quiz")
 
-            ready_style = dict(js_timer_component.TIMER_STYLE)
-            ready_style["show_bar"] = False
-            ready_style["seconds_only"] = True
-            ready_style["align"] = "center"
-            ready_style["font_size"] = "80px"
-            ready_style["font_color"] = "#31333f"
-
-            result, _ = js_timer_component.countdown(
-                3,
-                key=st.session_state.quiz_ready_key,
-                run_id=st.session_state.quiz_ready_run_id,
-                style=ready_style,
-            )
+    # ------------------------------------------------------------
+    # Idle (Start)
+    # ------------------------------------------------------------
+    if not st.session_state.quiz_started or st.session_state.quiz_phase == "idle":
+        _clear_year_override()
+        st.info("Click **Start** to begin.")
+
+        if st.button("Start", key="quiz_start", width='stretch'):
+            # Check locks BEFORE starting / creating files / assigning participant id
+            if not _check_results_files_unlocked_or_warn():
+                st.stop()
+
+            start_flow()
+
+        return
+
+    # ------------------------------------------------------------
+    # Practice (UNTIMED)
+    # ------------------------------------------------------------
+    if st.session_state.quiz_phase == "practice":
+        _render_practice_sidebar()
+        return
+
+    # ------------------------------------------------------------
+    # Get Ready
+    # ------------------------------------------------------------
+    if st.session_state.quiz_phase == "get_ready":
+        _clear_year_override()
+        st.markdown(
+            "<h1 style='font-size:30px; text-align:center;'>Get Ready!</h1>",
+            unsafe_allow_html=True,
+        )
+
+        ready_style = dict(js_timer_component.TIMER_STYLE)
+        ready_style["show_bar"] = False
+        ready_style["seconds_only"] = True
+        ready_style["align"] = "center"
+        ready_style["font_size"] = "80px"
+        ready_style["font_color"] = "#31333f"
+
+        result, _ = js_timer_component.countdown(
+            3,
+            key=st.session_state.quiz_ready_key,
+            run_id=st.session_state.quiz_ready_run_id,
+            style=ready_style,
+        )
+
+        done = (result or {}).get("done")
+        if done and done.get("finished") is True:
+            st.session_state.quiz_phase = "quiz"
+            if st.session_state.get("run_journal_path"):
+                trial_journal.record_phase(st.session_state.run_journal_path, "quiz")
+            _rerun_quiz()
+        return
+
+    # ------------------------------------------------------------
+    # Finished (AUTO SAVE + AUTO CONVERT AFTER 1 PARTICIPANT)
+    # ------------------------------------------------------------
+    if st.session_state.quiz_q_idx >= TOTAL_QUESTIONS:
+        _clear_year_override()
+        _save_and_convert_if_needed()
+        _warn_if_results_locked()
 
-            done = (result or {}).get("done")
-            if done and done.get("finished") is True:
-                st.session_state.quiz_phase = "quiz"
-                st.rerun()
-            return
-
-        # ------------------------------------------------------------
-        # Finished (AUTO SAVE + AUTO CONVERT AFTER 1 PARTICIPANT)
-        # ------------------------------------------------------------
-        if st.session_state.quiz_q_idx >= TOTAL_QUESTIONS:
-            _clear_year_override()
-            _save_and_convert_if_needed()
-
-            flash_css()
-            st.success("Quiz finished!")
-
-            chart = st.session_state.get("chart_type_radio", "Heatmap")
-            # st.write(f"Participant ID: **{st.session_state.participant_id}**")
-            st.write(f"Datamap: **{chart}**")
-            # st.write(f"CSV: `{st.session_state.get('results_csv_path') or _results_csv_path()}`")
-
-            xlsx_path = st.session_state.get("results_xlsx_path") or _results_xlsx_path_from_csv(
-                st.session_state.get("results_csv_path") or _results_csv_path()
-            )
-            # st.write(f"XLSX: `{xlsx_path}`")
-
-            # if st.session_state.converted_to_xlsx:
-            #     st.caption("✅ XLSX updated after this participant.")
-            # else:
-            #     st.caption("⚠️ XLSX not updated (probably open in Excel). CSV is saved.")
-
-            # st.write(f"Score: **{sum_correct_answers()} / {TOTAL_QUESTIONS}**")
-            # st.write(f"Total errors: **{sum_wrong_answers()}**")
-
-            c1, c2 = st.columns(2)
-            with c1:
-                if st.button("Restart", key="quiz_restart", width='stretch'):
-                    # restart full flow (Practice -> Get Ready -> Main)
-                    st.session_state.quiz_started = False
-                    st.session_state.quiz_phase = "idle"
-                    st.session_state.run_prepared = False
-                    st.rerun()
-
-            with c2:
-                if st.button("Close", key="quiz_close", width='stretch'):
-                    st.session_state.quiz_started = False
-                    st.session_state.quiz_phase = "idle"
-                    st.session_state.run_prepared = False
-                    st.rerun()
-            return
-
-        # ------------------------------------------------------------
-        # Main Quiz Questions (TIMED)
-        # ------------------------------------------------------------
-        ensure_question_state_for_current_idx()
         flash_css()
+        st.success("Quiz finished!")
 
-        q = QUESTIONS[st.session_state.quiz_q_idx]
-        q_text = q["q"].split("\n\n")
-        main = q_text[0]
-        focus = q_text[1] if len(q_text) > 1 else ""
+        chart = st.session_state.get("chart_type_radio", "Heatmap")
+        # st.write(f"Participant ID: **{st.session_state.participant_id}**")
+        st.write(f"Datamap: **{chart}**")
+        # st.write(f"CSV: `{st.session_state.get('results_csv_path') or _results_csv_path()}`")
 
-        _set_year_override_from_question(main)  # parse ONLY the first line
-        _render_quiz_question(main, focus)
+        xlsx_path = st.session_state.get("results_xlsx_path") or _results_xlsx_path_from_csv(
+            st.session_state.get("results_csv_path") or _results_csv_path()
+        )
+        # st.write(f"XLSX: `{xlsx_path}`")
+
+        # if st.session_state.converted_to_xlsx:
+        #     st.caption("✅ XLSX updated after this participant.")
+        # else:
+        #     st.caption("⚠️ XLSX not updated (probably open in Excel). CSV is saved.")
+
+        # st.write(f"Score: **{sum_correct_answers()} / {TOTAL_QUESTIONS}**")
+        # st.write(f"Total errors: **{sum_wrong_answers()}**")
+
+        c1, c2 = st.columns(2)
+        with c1:
+            if st.button("Restart", key="quiz_restart", width='stretch'):
+                # restart full flow (Practice -> Get Ready -> Main)
+                st.session_state.quiz_started = False
+                st.session_state.quiz_phase = "idle"
+                st.session_state.run_prepared = False
+                _rerun_quiz()
+
+        with c2:
+            if st.button("Close", key="quiz_close", width='stretch'):
+                st.session_state.quiz_started = False
+                st.session_state.quiz_phase = "idle"
+                st.session_state.run_prepared = False
+                _rerun_quiz()
+        return
 
-        st.markdown("<div style='height: 40px;'></div>", unsafe_allow_html=True)
+    # ------------------------------------------------------------
+    # Main Quiz Questions (TIMED)
+    # ------------------------------------------------------------
+    ensure_question_state_for_current_idx()
+    flash_css()
 
-        # Debounced buttons: disable immediately after first click
-        for i, text in enumerate(q["choices"]):
-            clicked = st.button(
-                text,
-                key=f"quiz_choice_{st.session_state.quiz_q_idx}_{i}",
-                width='stretch',
-                disabled=st.session_state.quiz_input_locked,
-            )
+    q = QUESTIONS[st.session_state.quiz_q_idx]
+    q_text = q["q"].split("\n\n")
+    main = q_text[0]
+    focus = q_text[1] if len(q_text) > 1 else ""
+
+    _set_year_override_from_question(main)  # parse ONLY the first line
+    _render_quiz_question(main, focus)
 
-            if clicked:
-                # backend debounce (in case UI disable lags)
-                if st.session_state.quiz_input_locked:
-                    continue
+    st.markdown("<div style='height: 40px;'></div>", unsafe_allow_html=True)
 
-                # lock immediately so rapid extra clicks do nothing
-                st.session_state.quiz_input_locked = True
+    if st.session_state.quiz_client_timing:
+        _render_timed_choices(q)
+        return
+
+    # Debounced buttons: disable immediately after first click
+    for i, text in enumerate(q["choices"]):
+        clicked = st.button(
+            text,
+            key=f"quiz_choice_{st.session_state.quiz_q_idx}_{i}",
+            width='stretch',
+            disabled=st.session_state.quiz_input_locked,
+        )
 
-                # autoscroll to top (rendered for 2 consecutive reruns for reliability)
-                st.session_state.quiz_scroll_ticks = 2
+        if clicked:
+            # backend debounce (in case UI disable lags)
+            if st.session_state.quiz_input_locked:
+                continue
+
+            # lock immediately so rapid extra clicks do nothing
+            st.session_state.quiz_input_locked = True
+
+            # autoscroll to top (rendered for 2 consecutive reruns for reliability)
+            st.session_state.quiz_scroll_ticks = 2
 
-                # duration measured in Python
-                start_ts = st.session_state.get("quiz_q_start_ts")
-                elapsed = (time.time() - start_ts) if start_ts else None
+            # duration measured in Python
+            start_ts = st.session_state.get("quiz_q_start_ts")
+            elapsed = (time.time() - start_ts) if start_ts else None
 
-                correct_idx = QUESTIONS[st.session_state.quiz_q_idx]["correct"]
-                error = 0 if i == correct_idx else 1
-                _record_trial(elapsed, error)
+            correct_idx = QUESTIONS[st.session_state.quiz_q_idx]["correct"]
+            error = 0 if i == correct_idx else 1
+            _record_trial(elapsed, error, choice_idx=i)
 
-                choose(i)
-                st.rerun()
+            choose(i)
+            _rerun_quiz()
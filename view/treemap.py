@@ -1,7 +1,13 @@
+import numpy as np
 import streamlit as st
-import pandas as pd
 import plotly.graph_objs as go
 
+from model import datasets as ds
+from model import instrumentation
+from model.bounded_cache import bounded_cache
+from model.cube import GenreYearCube
+from model.datasets import DatasetHandle
+
 
 def _font_family_css(font_family_label: str) -> str:
     mapping = {
@@ -13,11 +19,130 @@ def _font_family_css(font_family_label: str) -> str:
 
 
 # -----------------------------
-# Treemap builder w/ filters
+# Treemap colours
+# Years are coloured by chronological position (stable across filters),
+# genres inherit a stronger shade of their year's colour.
+# -----------------------------
+ROOT_ID = "root"
+ROOT_FILL_COLOR = "#444444"
+
+YEAR_CONTAINER_PALETTE = np.array([
+    "rgb(255, 235, 215)",
+    "rgb(215, 245, 230)",
+    "rgb(220, 230, 255)",
+    "rgb(255, 245, 210)",
+    "rgb(235, 230, 245)",
+    "rgb(230, 245, 255)",
+    "rgb(245, 235, 255)",
+    "rgb(240, 240, 240)",
+], dtype=object)
+
+GENRE_PALETTE = np.array([
+    "rgb(255, 176, 113)",
+    "rgb(145, 227, 186)",
+    "rgb(145, 175, 255)",
+    "rgb(255, 226, 128)",
+    "rgb(181, 163, 218)",
+    "rgb(140, 210, 240)",
+    "rgb(220, 170, 240)",
+    "rgb(200, 200, 200)",
+], dtype=object)
+
+
+# -----------------------------
+# Treemap data layer (cached on filters only, bounded LRU)
+# Returns the hierarchical node arrays, or None when the filters match nothing.
+# Typography is NOT part of the cache key: see build_treemap_figure below.
 # -----------------------------
-@st.cache_data(show_spinner=False)
-def build_treemap_figure(
-    df: pd.DataFrame,
+@bounded_cache(max_entries=256, max_bytes=64 * 1024 * 1024, key=ds.filter_cache_key)
+def build_treemap_nodes(
+    dataset: DatasetHandle,
+    start_year: int,
+    end_year: int,
+    selected_genres_tuple: tuple,
+):
+    return nodes_from_cube(ds.load_cube(dataset), start_year, end_year, selected_genres_tuple)
+
+
+def nodes_from_cube(cube: GenreYearCube, start_year: int, end_year: int, selected_genres_tuple: tuple):
+    """
+    Array-based node builder. Node order: root, years (largest total first),
+    then each year's genres (largest first), grouped in the same year order.
+    """
+    # Mean popularity per (year, genre) cell, year-major then genre
+    years, genres, values = cube.mean_cells(start_year, end_year, selected_genres_tuple)
+
+    # Handle empty result
+    if len(values) == 0:
+        return None
+
+    # Chronological position of each cell's year (drives colours only)
+    years_sorted, year_pos = np.unique(years, return_inverse=True)
+    n_years = len(years_sorted)
+
+    # Totals per year, then ORDER BY VALUE (largest → smallest)
+    year_totals = np.bincount(year_pos, weights=values, minlength=n_years)
+    year_layout = np.argsort(-year_totals, kind="stable")
+    year_rank = np.empty(n_years, dtype=np.int64)
+    year_rank[year_layout] = np.arange(n_years)
+
+    # One sort for every genre node: by year layout rank, then value desc
+    order = np.lexsort((-values, year_rank[year_pos]))
+    g_year_pos = year_pos[order]
+    g_labels = genres[order].astype(str)
+
+    year_labels = years_sorted.astype(str)
+    year_ids = np.char.add("year:", year_labels)
+    g_parents = year_ids[g_year_pos]
+    g_ids = np.char.add(np.char.add(g_parents, "|genre:"), g_labels)
+
+    n_genres = len(order)
+    root_label = f"All Years ({years_sorted[0]}–{years_sorted[-1]})"
+
+    ids = np.concatenate([[ROOT_ID], year_ids[year_layout], g_ids]).astype(object)
+    labels = np.concatenate([[root_label], year_labels[year_layout], g_labels]).astype(object)
+    parents = np.concatenate([[""], np.full(n_years, ROOT_ID), g_parents]).astype(object)
+    node_values = np.concatenate([[year_totals.sum()], year_totals[year_layout], values[order]])
+
+    node_colors = np.concatenate([
+        [ROOT_FILL_COLOR],
+        YEAR_CONTAINER_PALETTE[year_layout % len(YEAR_CONTAINER_PALETTE)],
+        GENRE_PALETTE[g_year_pos % len(GENRE_PALETTE)],
+    ])
+
+    def _per_level(root, year, genre):
+        return np.concatenate([[root], np.repeat(year, n_years), np.repeat(genre, n_genres)])
+
+    return dict(
+        ids=ids,
+        labels=labels,
+        parents=parents,
+        values=node_values,
+        node_colors=node_colors,
+        line_colors=_per_level("white", "rgba(0,0,0,0.6)", "rgba(255,255,255,0.9)").astype(object),
+        line_widths=_per_level(3, 4, 1.5),
+        node_text_colors=_per_level("white", "rgb(50,50,50)", "rgb(55,55,55)").astype(object),
+    )
+
+
+# -----------------------------
+# Treemap style layer
+# Building the go.Treemap is the expensive step (Plotly validates every node
+# array), so figures are cached too, keyed on filters + typography. Only the
+# default typography is ever built from nodes; any other typography is an
+# unvalidated copy of that figure, restyled. Cached figures are shared across
+# sessions, so callers get an unvalidated copy, never the cached object.
+# -----------------------------
+DEFAULT_TYPOGRAPHY = (16, 16, _font_family_css("Sans Serif"))
+
+
+def _figure_cache_key(dataset, start_year, end_year, selected_genres_tuple, *typography):
+    return ds.filter_cache_key(dataset, start_year, end_year, selected_genres_tuple), typography
+
+
+@bounded_cache(max_entries=64, max_bytes=128 * 1024 * 1024, key=_figure_cache_key)
+def _cached_treemap_figure(
+    dataset: DatasetHandle,
     start_year: int,
     end_year: int,
     selected_genres_tuple: tuple,
@@ -25,152 +150,59 @@ def build_treemap_figure(
     hover_font_size: int,
     font_family: str,
 ) -> go.Figure:
+    typography = (font_size, hover_font_size, font_family)
+    if typography != DEFAULT_TYPOGRAPHY:
+        base = _cached_treemap_figure(dataset, start_year, end_year, selected_genres_tuple, *DEFAULT_TYPOGRAPHY)
+        return _apply_typography(go.Figure(base, _validate=False), *typography)
 
-    # Filter years
-    df = df[(df["year"] >= start_year) & (df["year"] <= end_year)]
+    with instrumentation.phase("nodes_build"):
+        nodes = build_treemap_nodes(dataset, start_year, end_year, selected_genres_tuple)
+    return build_treemap_figure(nodes, *typography)
 
-    # Filter genres (optional)
-    if selected_genres_tuple:
-        df = df[df["genre"].isin(list(selected_genres_tuple))]
 
+def build_treemap_chart(
+    dataset: DatasetHandle,
+    start_year: int,
+    end_year: int,
+    selected_genres_tuple: tuple,
+    font_size: int,
+    hover_font_size: int,
+    font_family: str,
+) -> go.Figure:
+    """Treemap figure for filters + typography (safe to call from background threads)."""
+    fig = _cached_treemap_figure(
+        dataset, start_year, end_year, selected_genres_tuple, font_size, hover_font_size, font_family
+    )
+    return go.Figure(fig, _validate=False)
+
+
+def build_treemap_figure(nodes, font_size: int, hover_font_size: int, font_family: str) -> go.Figure:
     # Handle empty result
-    if df.empty:
+    if nodes is None:
         fig = go.Figure()
         fig.update_layout(
             title="Treemap (Year → Genre)",
             annotations=[dict(text="No data for the selected filters.", showarrow=False)],
             margin=dict(t=50, l=25, r=25, b=25),
-            font=dict(size=font_size, family=font_family),
-            hoverlabel=dict(font=dict(size=hover_font_size, family=font_family)),
         )
-        return fig
-
-    # Keep stable chronological order ONLY for colors
-    years_sorted = sorted(df["year"].unique().tolist())
-
-    # Aggregate mean popularity
-    yg = df.groupby(["year", "genre"], as_index=False)["popularity"].mean()
-
-    # Totals per year
-    year_totals = yg.groupby("year", as_index=False)["popularity"].sum()
-
-    # ---- ORDER BY VALUE (largest → smallest) ----
-    year_totals_layout = year_totals.sort_values("popularity", ascending=False)
-
-    labels, parents, values, ids = [], [], [], []
-
-    ROOT_ID = "root"
-    root_label = f"All Years ({years_sorted[0]}–{years_sorted[-1]})"
-
-    ids.append(ROOT_ID)
-    labels.append(root_label)
-    parents.append("")
-    values.append(float(year_totals["popularity"].sum()))
-
-    # Year nodes
-    for _, r in year_totals_layout.iterrows():
-        y = int(r["year"])
-        y_id = f"year:{y}"
-        ids.append(y_id)
-        labels.append(str(y))
-        parents.append(ROOT_ID)
-        values.append(float(r["popularity"]))
-
-    # Genre nodes (largest → smallest within year)
-    for y in year_totals_layout["year"].astype(int).tolist():
-        yg_y = yg[yg["year"] == y].sort_values("popularity", ascending=False)
-        for _, r in yg_y.iterrows():
-            g = str(r["genre"])
-            g_id = f"year:{y}|genre:{g}"
-            ids.append(g_id)
-            labels.append(g)
-            parents.append(f"year:{y}")
-            values.append(float(r["popularity"]))
-
-    root_fill_color = "#444444"
-
-    year_container_palette = [
-        "rgb(255, 235, 215)",
-        "rgb(215, 245, 230)",
-        "rgb(220, 230, 255)",
-        "rgb(255, 245, 210)",
-        "rgb(235, 230, 245)",
-        "rgb(230, 245, 255)",
-        "rgb(245, 235, 255)",
-        "rgb(240, 240, 240)",
-    ]
-
-    genre_palette = [
-        "rgb(255, 176, 113)",
-        "rgb(145, 227, 186)",
-        "rgb(145, 175, 255)",
-        "rgb(255, 226, 128)",
-        "rgb(181, 163, 218)",
-        "rgb(140, 210, 240)",
-        "rgb(220, 170, 240)",
-        "rgb(200, 200, 200)",
-    ]
-
-    year_to_container = {
-        str(y): year_container_palette[i % len(year_container_palette)]
-        for i, y in enumerate(years_sorted)
-    }
-
-    year_to_genre = {
-        str(y): genre_palette[i % len(genre_palette)]
-        for i, y in enumerate(years_sorted)
-    }
-
-    node_colors = []
-    for node_id, p, lbl in zip(ids, parents, labels):
-        if node_id == ROOT_ID:
-            node_colors.append(root_fill_color)
-        elif p == ROOT_ID:
-            node_colors.append(year_to_container.get(str(lbl)))
-        else:
-            year = p.replace("year:", "")
-            node_colors.append(year_to_genre.get(year))
-
-    line_colors = []
-    line_widths = []
-
-    for node_id, p in zip(ids, parents):
-        if node_id == ROOT_ID:
-            line_colors.append("white")
-            line_widths.append(3)
-        elif p == ROOT_ID:
-            line_colors.append("rgba(0,0,0,0.6)")
-            line_widths.append(4)
-        else:
-            line_colors.append("rgba(255,255,255,0.9)")
-            line_widths.append(1.5)
-
-    node_text_colors = []
-    for node_id, p in zip(ids, parents):
-        if node_id == ROOT_ID:
-            node_text_colors.append("white")
-        elif p == ROOT_ID:
-            node_text_colors.append("rgb(50,50,50)")
-        else:
-            node_text_colors.append("rgb(55,55,55)")
+        return _apply_typography(fig, font_size, hover_font_size, font_family)
 
     fig = go.Figure(
         go.Treemap(
-            ids=ids,
-            labels=labels,
-            parents=parents,
-            values=values,
+            ids=nodes["ids"],
+            labels=nodes["labels"],
+            parents=nodes["parents"],
+            values=nodes["values"],
             branchvalues="total",
             sort=False,
             tiling=dict(packing="squarify", pad=4),
             marker=dict(
-                colors=node_colors,
-                line=dict(color=line_colors, width=line_widths),
+                colors=nodes["node_colors"],
+                line=dict(color=nodes["line_colors"], width=nodes["line_widths"]),
             ),
-            textfont=dict(color=node_text_colors, size=max(10, font_size)),
+            textfont=dict(color=nodes["node_text_colors"]),
             textinfo="label",
             hovertemplate="<b>%{label}</b><br>Avg. Popularity: %{value:.1f}<extra></extra>",
-            hoverlabel=dict(font=dict(size=hover_font_size, family=font_family)),
         )
     )
 
@@ -178,29 +210,33 @@ def build_treemap_figure(
         title="Treemap (Year → Genre) — Ordered by value",
         width=1000,
         height=700,
-        font=dict(size=font_size, family=font_family),
-        hoverlabel=dict(font=dict(size=hover_font_size, family=font_family)),
     )
 
-    fig.update_traces(hoverlabel=dict(font=dict(size=hover_font_size, family=font_family)))
+    return _apply_typography(fig, font_size, hover_font_size, font_family)
 
+
+def _apply_typography(fig: go.Figure, font_size: int, hover_font_size: int, font_family: str) -> go.Figure:
+    fig.update_layout(
+        font=dict(size=font_size, family=font_family),
+        hoverlabel=dict(font=dict(size=hover_font_size, family=font_family)),
+    )
+    fig.update_traces(
+        textfont=dict(size=max(10, font_size)),
+        hoverlabel=dict(font=dict(size=hover_font_size, family=font_family)),
+    )
     return fig
 
 
 # -----------------------------
 # Streamlit render()
 # -----------------------------
-def render(df: pd.DataFrame, year_range: tuple, selected_genres: list) -> go.Figure:
+def render(dataset: DatasetHandle, year_range: tuple, selected_genres: list) -> go.Figure:
     start_year, end_year = year_range
     font_size = int(st.session_state.get("font_size_px", 16))
     hover_font_size = int(st.session_state.get("hover_font_size_px", 16))
     font_family = _font_family_css(st.session_state.get("font_family", "Sans Serif"))
-    return build_treemap_figure(
-        df,
-        start_year,
-        end_year,
-        tuple(selected_genres),
-        font_size,
-        hover_font_size,
-        font_family,
-    )
+
+    with instrumentation.phase("figure"):
+        return build_treemap_chart(
+            dataset, start_year, end_year, tuple(selected_genres), font_size, hover_font_size, font_family
+        )
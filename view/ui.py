@@ -1,11 +1,18 @@
+import hashlib
 import os
 from pathlib import Path
 
 import streamlit as st
 import plotly.graph_objs as go
 
+from model import datasets as ds
+from model import instrumentation, prebuild
+from view import debug_panel
 from view import fixed_sidebar
 from view import quiz
+from view import treemap
+from view import client_filter_component
+from view.fragments import rerun_fragment
 
 # -----------------------------
 # Dataset uploader (persisted to disk)
@@ -19,15 +26,43 @@ def _get_persist_path() -> Path:
 
 
 
-def _persist_uploaded_csv(uploaded_file) -> None:
+_UPLOAD_COPY_CHUNK_BYTES = 1 << 20
+
+
+def _persist_uploaded_csv(uploaded_file):
+    """
+    Stream the upload to a temp file beside the target in 1 MiB chunks, hashing
+    as it goes, then atomically rename it into place. Returns the new
+    DatasetHandle, or None when the upload is byte-identical to the current file.
+    """
     persist_path = _get_persist_path()
     persist_path.parent.mkdir(parents=True, exist_ok=True)
-    persist_path.write_bytes(uploaded_file.getvalue())
+    tmp_path = persist_path.with_name(persist_path.name + ".upload.tmp")
+
+    h = hashlib.sha256()
+    uploaded_file.seek(0)
+    with open(tmp_path, "wb") as f:
+        for chunk in iter(lambda: uploaded_file.read(_UPLOAD_COPY_CHUNK_BYTES), b""):
+            h.update(chunk)
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    digest = h.hexdigest()
+
+    if persist_path.exists() and ds.open_dataset(str(persist_path)).fingerprint == digest:
+        tmp_path.unlink(missing_ok=True)
+        return None
+
+    os.replace(tmp_path, persist_path)
+    return ds.register_fingerprint(str(persist_path), digest)
 
 
 
 def dataset_uploader() -> None:
-    """Uploader UI. When a CSV is uploaded, save it and force a full rerun."""
+    """
+    Uploader UI. A new upload is hashed + persisted, every dataset cache is
+    invalidated, and parsing/aggregation starts on a background thread.
+    """
     uploaded = st.file_uploader(
         "Dataset (CSV)",
         type=["csv"],
@@ -38,12 +73,19 @@ def dataset_uploader() -> None:
     if uploaded is None:
         return
 
-    fingerprint = (uploaded.name, getattr(uploaded, "size", None))
-    if st.session_state.get("_dataset_last_upload") == fingerprint:
+    # file_id is unique per upload, so reruns with the same upload are free.
+    upload_id = getattr(uploaded, "file_id", None) or (uploaded.name, getattr(uploaded, "size", None))
+    if st.session_state.get("_dataset_last_upload") == upload_id:
+        return
+
+    st.session_state["_dataset_last_upload"] = upload_id
+    handle = _persist_uploaded_csv(uploaded)
+    if handle is None:
+        st.toast("This dataset is already loaded.")
         return
 
-    st.session_state["_dataset_last_upload"] = fingerprint
-    _persist_uploaded_csv(uploaded)
+    ds.invalidate_caches()
+    prebuild.start_prebuild(handle)
 
     for k in ["genres", "genres_ms"]:
         if k in st.session_state:
@@ -141,6 +183,12 @@ def settings_expander(on_change_func=None, expanded=False, show_chart_type=True)
                 key="chart_type_radio",
                 on_change=on_change_func,
             )
+            st.checkbox(
+                "Filter in the browser",
+                key="client_filtering",
+                help="Ship the aggregated data once and redraw the chart client-side on every filter change.",
+                on_change=on_change_func,
+            )
             st.divider()
 
         typography_settings()
@@ -169,6 +217,58 @@ def render_no_data_page() -> None:
         settings_expander(expanded=True, show_chart_type=False)
 
 
+def render_dataset_loading_page(job) -> None:
+    """Shown while a freshly uploaded dataset is parsed/aggregated in the background."""
+    fixed_sidebar.configure_sidebar(
+        page_title="Treemap vs Heatmap",
+        layout="wide",
+        expanded=True,
+        lock=False,
+        width_px=500,
+    )
+
+    _inject_typography_css()
+
+    st.title("Treemap vs Heatmap")
+    _dataset_prebuild_progress(job)
+
+
+def render_dataset_failed_page(job) -> None:
+    """Shown when the background prebuild of the uploaded dataset raised."""
+    fixed_sidebar.configure_sidebar(
+        page_title="Treemap vs Heatmap",
+        layout="wide",
+        expanded=True,
+        lock=False,
+        width_px=500,
+    )
+
+    _inject_typography_css()
+
+    st.title("Treemap vs Heatmap")
+    st.error(f"The dataset could not be prepared. {job.error}")
+    st.caption("Retry, or upload a corrected CSV in the settings below.")
+
+    if st.button("Retry", key="dataset_prebuild_retry"):
+        prebuild.start_prebuild(job.handle)
+        st.rerun()
+
+    spacer, controls = st.columns([6, 1])
+    with controls:
+        settings_expander(expanded=True, show_chart_type=False)
+
+
+@st.fragment(run_every=0.5)
+def _dataset_prebuild_progress(job) -> None:
+    snap = job.snapshot()
+    if snap["done"]:
+        # Full rerun: main() renders either the app or the failure page
+        st.rerun()
+
+    st.progress(snap["progress"], text=f"Preparing dataset… {snap['message']}")
+    st.caption(f"{snap['elapsed']:.1f}s")
+
+
 # -----------------------------
 # Year filter (selectboxes)
 # -----------------------------
@@ -328,7 +428,7 @@ def genre_filters(
                     for g in genres_sorted:
                         st.session_state[f"genre_{g}"] = True
                     _update_final_and_fire()
-                    st.rerun()
+                    rerun_fragment()
 
             with c2:
                 if st.button("Clear All", width='stretch'):
@@ -336,7 +436,7 @@ def genre_filters(
                     for g in genres_sorted:
                         st.session_state[f"genre_{g}"] = False
                     _update_final_and_fire()
-                    st.rerun()
+                    rerun_fragment()
 
             st.divider()
 
@@ -374,7 +474,29 @@ def genre_filters(
 # Page renderer
 # -----------------------------
 
-def render_page(fig: go.Figure, on_change_func, genre_list: list) -> None:
+def _client_filtered_chart(dataset, on_change_func, genre_list: list) -> None:
+    """Filters + chart as one browser-side component (no rerun per click)."""
+    _init_typography_state()
+    client_filter_component.render(
+        dataset,
+        chart_type=st.session_state.chart_type_radio,
+        genre_list=sorted(genre_list, key=lambda s: str(s).lower()),
+        year_options=list(range(1998, 2021)),
+        style={
+            "font_size": int(st.session_state.get("font_size_px", 16)),
+            "hover_font_size": int(st.session_state.get("hover_font_size_px", 16)),
+            "font_family": _font_family_css(st.session_state.get("font_family", "Sans Serif")),
+        },
+        palettes={
+            "root": treemap.ROOT_FILL_COLOR,
+            "year_container": treemap.YEAR_CONTAINER_PALETTE.tolist(),
+            "genre": treemap.GENRE_PALETTE.tolist(),
+        },
+        on_change_func=on_change_func,
+    )
+
+
+def render_page(build_figure, on_change_func, genre_list: list, dataset=None) -> None:
     fixed_sidebar.configure_sidebar(
         page_title="Treemap vs Heatmap",
         layout="wide",
@@ -393,8 +515,24 @@ def render_page(fig: go.Figure, on_change_func, genre_list: list) -> None:
     st.title("Treemap vs Heatmap")
     st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
 
+    _filters_and_chart(build_figure, on_change_func, genre_list, dataset)
+
+    # Settings stay outside the fragment: chart type / typography / upload rerun the whole page.
+    sp1, sp2, sp3 , controls = st.columns([0.5, 0.5, 0.5, 1])
+    with controls:
+        settings_expander(on_change_func=on_change_func, expanded=False, show_chart_type=True)
+
+
+@st.fragment
+@debug_panel.timed_rerun("filters_and_chart")
+def _filters_and_chart(build_figure, on_change_func, genre_list: list, dataset=None) -> None:
+    """Filter widgets + chart rerun together, without the quiz sidebar or settings."""
     st.subheader("Filters")
 
+    if st.session_state.get("client_filtering", False) and dataset is not None:
+        _client_filtered_chart(dataset, on_change_func, genre_list)
+        return
+
     year_selectbox(on_change_func)
 
     genre_filters(
@@ -408,8 +546,10 @@ def render_page(fig: go.Figure, on_change_func, genre_list: list) -> None:
     st.markdown("<div style='margin-top: 10px;'></div>", unsafe_allow_html=True)
     st.subheader(f"Genre Popularity {chart_type}")
 
-    st.plotly_chart(fig, width="stretch")
-
-    sp1, sp2, sp3 , controls = st.columns([0.5, 0.5, 0.5, 1])
-    with controls:
-        settings_expander(on_change_func=on_change_func, expanded=False, show_chart_type=True)
+    fig = build_figure()
+    if instrumentation.active():
+        # Extra serialization, only while timing: payload size sent to the browser.
+        with instrumentation.phase("figure_json"):
+            instrumentation.value("figure_bytes", len(fig.to_json()))
+    with instrumentation.phase("plotly_chart"):
+        st.plotly_chart(fig, width="stretch")